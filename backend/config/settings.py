@@ -172,3 +172,17 @@ else:
 ML_SERVICE_URL = os.getenv('ML_SERVICE_URL', 'http://ml_service:5000')
 ML_SERVICE_TIMEOUT = int(os.getenv('ML_SERVICE_TIMEOUT', '30'))
 ML_SERVICE_MAX_RETRIES = int(os.getenv('ML_SERVICE_MAX_RETRIES', '3'))
+# Pooled keep-alive connections to the ML service, and a circuit breaker that
+# fails fast after ML_SERVICE_CIRCUIT_FAILURES consecutive errors
+ML_SERVICE_POOL_SIZE = int(os.getenv('ML_SERVICE_POOL_SIZE', '10'))
+ML_SERVICE_CIRCUIT_FAILURES = int(os.getenv('ML_SERVICE_CIRCUIT_FAILURES', '5'))
+ML_SERVICE_CIRCUIT_RESET_SECONDS = float(os.getenv('ML_SERVICE_CIRCUIT_RESET_SECONDS', '30'))
+# Forward upload bytes to the ML service instead of having it fetch the stored image
+ML_SERVICE_DIRECT_UPLOAD = os.getenv('ML_SERVICE_DIRECT_UPLOAD', 'False') == 'True'
+UPLOAD_STORAGE_WORKERS = int(os.getenv('UPLOAD_STORAGE_WORKERS', '4'))
+# Background workers for asynchronous prediction jobs (POST /upload/?async=true)
+PREDICTION_JOB_WORKERS = int(os.getenv('PREDICTION_JOB_WORKERS', '4'))
+# Maximum slices per study upload (POST /upload/batch/)
+BATCH_UPLOAD_MAX_FILES = int(os.getenv('BATCH_UPLOAD_MAX_FILES', '64'))
+# DICOM uploads (one file may hold a whole multi-frame series)
+DICOM_UPLOAD_MAX_SIZE = int(os.getenv('DICOM_UPLOAD_MAX_SIZE', str(100 * 1024 * 1024)))
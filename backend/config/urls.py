@@ -5,10 +5,12 @@ from django.contrib import admin
 from django.urls import path, include
 from django.conf import settings
 from django.conf.urls.static import static
+from predictions.views import prometheus_metrics
 
 urlpatterns = [
     path('admin/', admin.site.urls),
     path('api/v1/', include('predictions.urls')),
+    path('metrics', prometheus_metrics, name='prometheus-metrics'),
 ]
 
 # Serve media files in development/local storage mode
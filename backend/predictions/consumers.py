@@ -7,6 +7,7 @@ from django.core.cache import cache
 from channels.db import database_sync_to_async
 from django.contrib.auth.models import User
 from .models import ChatRoom, Message
+from . import unread
 
 
 class ChatConsumer(AsyncWebsocketConsumer):
@@ -221,6 +222,7 @@ class ChatConsumer(AsyncWebsocketConsumer):
     def save_message(self, content):
         """Save message to database."""
         room = ChatRoom.objects.get(id=self.room_id)
+        # Creating the message also counts it as unread for the other members
         message = Message.objects.create(
             room=room,
             sender=self.user,
@@ -258,9 +260,7 @@ class ChatConsumer(AsyncWebsocketConsumer):
     @database_sync_to_async
     def mark_messages_read(self, message_ids):
         """Mark messages as read by current user."""
-        messages = Message.objects.filter(id__in=message_ids, room_id=self.room_id)
-        for msg in messages:
-            msg.read_by.add(self.user)
+        unread.mark_read(self.user, self.room_id, message_ids)
 
     @database_sync_to_async
     def get_room_member_ids(self):
@@ -317,3 +317,10 @@ class NotificationConsumer(AsyncWebsocketConsumer):
             'content': event.get('content'),
             'created_at': event.get('created_at'),
         }))
+
+    async def prediction_update(self, event):
+        # Result of an asynchronous prediction job
+        await self.send(text_data=json.dumps({
+            'type': 'prediction',
+            'transaction': event.get('transaction'),
+        }))
@@ -0,0 +1,39 @@
+"""
+DICOM upload helpers.
+
+The backend only reads DICOM headers; pixel data is decoded and windowed by
+the ML service.
+"""
+import pydicom
+
+# Part 10 files: 128-byte preamble, then the "DICM" prefix
+DICOM_MAGIC_OFFSET = 128
+DICOM_MAGIC = b'DICM'
+DICOM_CONTENT_TYPE = 'application/dicom'
+
+
+def is_dicom(upload) -> bool:
+    """Whether an uploaded file is a DICOM file, judged by its prefix rather than its name."""
+    position = upload.tell()
+    upload.seek(0)
+    head = upload.read(DICOM_MAGIC_OFFSET + len(DICOM_MAGIC))
+    upload.seek(position)
+    return head[DICOM_MAGIC_OFFSET:] == DICOM_MAGIC
+
+
+def frame_count(upload) -> int:
+    """
+    Number of frames in a DICOM upload, read from its header only.
+    
+    Raises:
+        ValueError: If the header has no image dimensions
+    """
+    position = upload.tell()
+    upload.seek(0)
+    try:
+        dataset = pydicom.dcmread(upload, stop_before_pixels=True)
+    finally:
+        upload.seek(position)
+    if 'Rows' not in dataset or 'Columns' not in dataset:
+        raise ValueError("DICOM file has no image dimensions")
+    return int(dataset.get('NumberOfFrames', 1) or 1)
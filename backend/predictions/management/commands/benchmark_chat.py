@@ -0,0 +1,110 @@
+"""
+Management command to measure message-list latency on a large chat room
+Usage: python manage.py benchmark_chat --members 20 --messages 100000 --iterations 30
+
+Seeds one room with --members users and --messages messages, has every
+member read all but the last --unread messages, then times the message list
+endpoint (first and last page) as one of the members and prints latency
+percentiles, queries per request and read-state rows as JSON. The room and
+its users are removed afterwards unless --keep is given.
+"""
+import json
+import statistics
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from predictions.models import ChatReadState, ChatRoom, Message
+from predictions.unread import mark_read
+from predictions.views import MessageListCreateView
+
+USERNAME_PREFIX = 'bench_chat_user_'
+ROOM_NAME = 'Chat Benchmark Room'
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+class Command(BaseCommand):
+    help = 'Time the chat message list on a large seeded room'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--members', type=int, default=20)
+        parser.add_argument('--messages', type=int, default=100000)
+        parser.add_argument('--unread', type=int, default=30, help='Messages left unread by every member')
+        parser.add_argument('--page-size', type=int, default=50)
+        parser.add_argument('--iterations', type=int, default=30)
+        parser.add_argument('--keep', action='store_true', help='Keep the seeded room and users')
+
+    def handle(self, *args, **options):
+        self._cleanup()
+        users, room = self._seed(options)
+        try:
+            view = MessageListCreateView.as_view()
+            factory = APIRequestFactory()
+            last_page = -(-options['messages'] // options['page_size'])
+            results = {}
+            for label, page in (('first_page', 1), ('last_page', last_page)):
+                latencies = []
+                for _ in range(options['iterations']):
+                    request = factory.get(
+                        f'/api/v1/chat/rooms/{room.id}/messages/',
+                        {'page': page, 'page_size': options['page_size']},
+                    )
+                    force_authenticate(request, user=users[0])
+                    with CaptureQueriesContext(connection) as queries:
+                        started = time.perf_counter()
+                        response = view(request, room_id=room.id)
+                        response.render()
+                        latencies.append((time.perf_counter() - started) * 1000)
+                results[label] = {
+                    'p50_ms': round(statistics.median(latencies), 2),
+                    'p95_ms': round(percentile(latencies, 95), 2),
+                    'queries': len(queries),
+                }
+            results['read_state_rows'] = ChatReadState.objects.filter(room=room).count()
+            results['messages'] = options['messages']
+            results['members'] = options['members']
+            self.stdout.write(json.dumps(results, indent=2))
+        finally:
+            if not options['keep']:
+                self._cleanup()
+
+    def _seed(self, options):
+        User = get_user_model()
+        users = [
+            User.objects.get_or_create(username=f'{USERNAME_PREFIX}{index}')[0]
+            for index in range(options['members'])
+        ]
+        room = ChatRoom.objects.create(name=ROOM_NAME, room_type='group', created_by=users[0])
+        room.members.set(users)
+
+        count = options['messages']
+        Message.objects.bulk_create(
+            [
+                Message(room=room, sender=users[index % len(users)], content=f'Benchmark message {index}')
+                for index in range(count)
+            ],
+            batch_size=5000,
+        )
+        # Planner statistics, as autovacuum would refresh them after a load this size
+        with connection.cursor() as cursor:
+            cursor.execute(f'ANALYZE {Message._meta.db_table}')
+        read_ids = list(
+            Message.objects.filter(room=room).order_by('created_at')
+            .values_list('id', flat=True)[:max(count - options['unread'], 0)]
+        )
+        for user in users:
+            mark_read(user, room.id, read_ids)
+        return users, room
+
+    def _cleanup(self):
+        ChatRoom.objects.filter(name=ROOM_NAME).delete()
+        get_user_model().objects.filter(username__startswith=USERNAME_PREFIX).delete()
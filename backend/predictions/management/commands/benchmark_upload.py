@@ -0,0 +1,97 @@
+"""
+Management command to measure upload latency with and without direct ML forwarding
+Usage: python manage.py benchmark_upload path/to/scan.jpg --username doctor1 --iterations 20
+
+Runs the upload endpoint against the configured ML service and storage in
+URL mode (store, then the ML service downloads the image) and in direct
+mode (bytes forwarded to the ML service while storage is written), and
+prints latency percentiles per mode as JSON. Created transactions, the
+benchmark patient and stored images are removed afterwards.
+"""
+import json
+import mimetypes
+import os
+import statistics
+import time
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management.base import BaseCommand, CommandError
+from django.test import override_settings
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from predictions.models import Patient, Transaction
+from predictions.views import upload_image
+
+BENCHMARK_PATIENT_NAME = 'Upload Benchmark Patient'
+BENCHMARK_MRN = 'BENCHMARK-UPLOAD'
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+class Command(BaseCommand):
+    help = 'Compare upload latency in URL mode and direct multipart mode'
+
+    def add_arguments(self, parser):
+        parser.add_argument('image', help='Path to a sample scan')
+        parser.add_argument('--username', required=True, help='User the uploads are made as')
+        parser.add_argument('--iterations', type=int, default=20)
+
+    def handle(self, *args, **options):
+        try:
+            user = get_user_model().objects.get(username=options['username'])
+        except get_user_model().DoesNotExist:
+            raise CommandError(f"User {options['username']} does not exist")
+
+        with open(options['image'], 'rb') as handle:
+            content = handle.read()
+        name = os.path.basename(options['image'])
+        content_type = mimetypes.guess_type(name)[0] or 'application/octet-stream'
+
+        factory = APIRequestFactory()
+        results = {}
+        for mode, direct in (('url', False), ('direct', True)):
+            totals, storage, ml_service = [], [], []
+            with override_settings(ML_SERVICE_DIRECT_UPLOAD=direct):
+                for _ in range(options['iterations']):
+                    request = factory.post('/api/v1/upload/', {
+                        'image': SimpleUploadedFile(name, content, content_type=content_type),
+                        'patient_name': BENCHMARK_PATIENT_NAME,
+                        'age': 40,
+                        'gender': 'O',
+                        'mrn': BENCHMARK_MRN,
+                    }, format='multipart')
+                    force_authenticate(request, user=user)
+                    started = time.perf_counter()
+                    response = upload_image(request)
+                    elapsed = time.perf_counter() - started
+                    if response.status_code != 201:
+                        raise CommandError(f"Upload failed in {mode} mode: {response.data}")
+
+                    # total_processing_time is rounded to 10 ms, too coarse to compare the modes
+                    totals.append(elapsed)
+                    storage.append(response.data['timings']['storage'])
+                    ml_service.append(response.data['timings']['ml_service'])
+                    self._cleanup(response.data)
+
+            results[mode] = {
+                'p50_total': round(statistics.median(totals), 3),
+                'p95_total': round(percentile(totals, 95), 3),
+                'mean_storage': round(statistics.mean(storage), 3),
+                'mean_ml_service': round(statistics.mean(ml_service), 3),
+            }
+
+        Patient.objects.filter(mrn=BENCHMARK_MRN, transactions__isnull=True).delete()
+        results['p50_saving'] = round(results['url']['p50_total'] - results['direct']['p50_total'], 3)
+        self.stdout.write(json.dumps(results, indent=2))
+
+    def _cleanup(self, data):
+        Transaction.objects.filter(id=data['id']).delete()
+        saved_path = data['image_url'].split(settings.MEDIA_URL, 1)[-1]
+        default_storage.delete(saved_path)
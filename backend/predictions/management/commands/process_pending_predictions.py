@@ -0,0 +1,44 @@
+"""
+Management command to finish asynchronous prediction jobs lost by a restart
+Usage: python manage.py process_pending_predictions [--stale-minutes 10]
+
+Background jobs live in the web process, so a restart drops queued work.
+This reruns pending transactions from their stored image URL, and first
+returns transactions stuck in 'processing' longer than --stale-minutes
+to 'pending'.
+"""
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from predictions.models import Transaction
+from predictions.views import run_prediction_job
+
+
+class Command(BaseCommand):
+    help = 'Run pending asynchronous predictions that were never picked up'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--stale-minutes', type=int, default=10)
+
+    def handle(self, *args, **options):
+        cutoff = timezone.now() - timezone.timedelta(minutes=options['stale_minutes'])
+        reset = Transaction.objects.filter(
+            status=Transaction.STATUS_PROCESSING,
+            uploaded_at__lt=cutoff,
+        ).update(status=Transaction.STATUS_PENDING)
+        if reset:
+            self.stdout.write(f'Reset {reset} stale processing jobs')
+
+        pending_ids = list(
+            Transaction.objects
+            .filter(status=Transaction.STATUS_PENDING, uploaded_at__lt=cutoff)
+            .order_by('uploaded_at')
+            .values_list('id', flat=True)
+        )
+        for transaction_id in pending_ids:
+            run_prediction_job(transaction_id)
+
+        completed = Transaction.objects.filter(id__in=pending_ids, status=Transaction.STATUS_COMPLETED).count()
+        self.stdout.write(self.style.SUCCESS(
+            f'Processed {len(pending_ids)} pending jobs ({completed} completed, {len(pending_ids) - completed} failed)'
+        ))
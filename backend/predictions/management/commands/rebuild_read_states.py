@@ -0,0 +1,23 @@
+"""
+Management command to rebuild the per-member chat unread counters
+Usage: python manage.py rebuild_read_states [--room <room_id> ...]
+
+Unread counts are kept up to date as messages are sent and read. This
+recomputes them from the message history and each member's read watermark,
+for all rooms or only the given ones, to repair drift (e.g. messages
+inserted with bulk_create). Members without a read state get one.
+"""
+from django.core.management.base import BaseCommand
+
+from predictions.unread import rebuild_read_states
+
+
+class Command(BaseCommand):
+    help = 'Recompute chat unread counts from message history and read watermarks'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--room', action='append', dest='rooms', help='Room id; may be repeated')
+
+    def handle(self, *args, **options):
+        written = rebuild_read_states(options['rooms'])
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt {written} read states'))
@@ -0,0 +1,159 @@
+"""
+Management command to seed a reproducible data set for load tests
+Usage: python manage.py seed_benchmark --seed 42 --patients 500 --transactions 5000 > fixtures.json
+
+Creates benchmark users (with API tokens), patients, completed transactions
+spread over the last days, and group chat rooms with message history. The
+same seed and sizes always give the same rows. Everything is marked with the
+"bench" prefix, and --reset removes a previous run first. The accounts, room
+ids and patient ids are printed as JSON for tests/load/load_test.py.
+"""
+import json
+import random
+import uuid
+from datetime import timedelta
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import transaction as db_transaction
+from django.utils import timezone
+from rest_framework.authtoken.models import Token
+
+from predictions.models import ChatRoom, Message, Patient, Transaction, UserProfile
+from predictions.unread import rebuild_read_states
+
+USERNAME_PREFIX = 'bench_user_'
+MRN_PREFIX = 'BENCH'
+ROOM_PREFIX = 'Bench room '
+IMAGE_URL_PREFIX = 'https://bench.invalid/scans/'
+
+DIAGNOSES = ['No Tumor', 'Glioma', 'Meningioma', 'Pituitary']
+FIRST_NAMES = ['Somchai', 'Malee', 'Anan', 'Suda', 'Niran', 'Ploy', 'Kittisak', 'Wanida']
+LAST_NAMES = ['Srisuk', 'Chaiyaporn', 'Thongdee', 'Boonmee', 'Kaewkam', 'Rattana']
+
+
+def seeded_uuid(rng):
+    return uuid.UUID(int=rng.getrandbits(128), version=4)
+
+
+class Command(BaseCommand):
+    help = 'Seed reproducible users, patients, transactions and chat history for load tests'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument('--users', type=int, default=5)
+        parser.add_argument('--patients', type=int, default=200)
+        parser.add_argument('--transactions', type=int, default=2000)
+        parser.add_argument('--rooms', type=int, default=10)
+        parser.add_argument('--messages', type=int, default=50, help='Messages per room')
+        parser.add_argument('--days', type=int, default=30, help='Transactions are spread over this many days')
+        parser.add_argument('--password', default='bench-password')
+        parser.add_argument('--reset', action='store_true', help='Remove rows of a previous run first')
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+        with db_transaction.atomic():
+            if options['reset']:
+                self._reset()
+            users = self._users(options['users'], options['password'])
+            patients = self._patients(rng, options['patients'], users)
+            self._transactions(rng, options['transactions'], options['days'], users, patients)
+            rooms = self._rooms(rng, options['rooms'], options['messages'], users, patients)
+
+        self.stdout.write(json.dumps({
+            'seed': options['seed'],
+            'password': options['password'],
+            'users': [
+                {'username': user.username, 'token': Token.objects.get_or_create(user=user)[0].key}
+                for user in users
+            ],
+            'patient_ids': [patient.id for patient in patients],
+            'room_ids': [str(room.id) for room in rooms],
+        }, indent=2))
+
+    def _reset(self):
+        Transaction.objects.filter(image_url__startswith=IMAGE_URL_PREFIX).delete()
+        ChatRoom.objects.filter(name__startswith=ROOM_PREFIX).delete()
+        Patient.objects.filter(mrn__startswith=MRN_PREFIX).delete()
+        User.objects.filter(username__startswith=USERNAME_PREFIX).delete()
+
+    def _users(self, count, password):
+        users = []
+        for index in range(count):
+            user, created = User.objects.get_or_create(username=f'{USERNAME_PREFIX}{index}')
+            if created:
+                user.set_password(password)
+                user.save()
+                UserProfile.objects.create(user=user, full_name=f'Bench User {index}', role='doctor')
+            users.append(user)
+        return users
+
+    def _patients(self, rng, count, users):
+        existing = set(Patient.objects.filter(mrn__startswith=MRN_PREFIX).values_list('mrn', flat=True))
+        patients = [
+            Patient(
+                mrn=f'{MRN_PREFIX}{index:08d}',
+                full_name=f'{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)} {index}',
+                phone=f'08{rng.randrange(10 ** 8):08d}',
+                age=rng.randint(1, 95),
+                gender=rng.choice('MFO'),
+                created_by=rng.choice(users),
+            )
+            for index in range(count)
+        ]
+        # Existing MRNs are skipped (after drawing their values, to keep the sequence),
+        # so re-running without --reset adds nothing
+        Patient.objects.bulk_create([patient for patient in patients if patient.mrn not in existing])
+        return list(Patient.objects.filter(mrn__startswith=MRN_PREFIX).order_by('mrn'))
+
+    def _transactions(self, rng, count, days, users, patients):
+        if Transaction.objects.filter(image_url__startswith=IMAGE_URL_PREFIX).exists():
+            return
+        now = timezone.now()
+        rows, uploaded = [], {}
+        for index in range(count):
+            row = Transaction(
+                id=seeded_uuid(rng),
+                user=rng.choice(users),
+                patient=rng.choice(patients) if patients else None,
+                image_url=f'{IMAGE_URL_PREFIX}{index:06d}.png',
+                diagnosis=rng.choice(DIAGNOSES),
+                confidence=round(rng.uniform(0.5, 1.0), 4),
+                model_version='bench',
+                processing_time=round(rng.uniform(0.2, 2.0), 3),
+            )
+            rows.append(row)
+            uploaded.setdefault(rng.randrange(max(days, 1)), []).append(row.id)
+        Transaction.objects.bulk_create(rows, batch_size=1000)
+        # uploaded_at is auto_now_add, so the spread over days is applied afterwards
+        for days_ago, ids in uploaded.items():
+            moment = now - timedelta(days=days_ago)
+            Transaction.objects.filter(id__in=ids).update(uploaded_at=moment, completed_at=moment)
+
+    def _rooms(self, rng, count, messages_per_room, users, patients):
+        existing = list(ChatRoom.objects.filter(name__startswith=ROOM_PREFIX).order_by('name'))
+        if existing:
+            return existing
+        rooms = []
+        for index in range(count):
+            room = ChatRoom.objects.create(
+                id=seeded_uuid(rng),
+                name=f'{ROOM_PREFIX}{index:03d}',
+                room_type='case' if patients and index % 2 else 'group',
+                patient=rng.choice(patients) if patients and index % 2 else None,
+                created_by=users[0],
+            )
+            room.members.set(users)
+            Message.objects.bulk_create([
+                Message(
+                    id=seeded_uuid(rng),
+                    room=room,
+                    sender=rng.choice(users),
+                    content=f'Benchmark message {number} in room {index}',
+                )
+                for number in range(messages_per_room)
+            ])
+            rooms.append(room)
+        # bulk_create skips Message.save, so unread counters are computed afterwards
+        rebuild_read_states([room.id for room in rooms])
+        return rooms
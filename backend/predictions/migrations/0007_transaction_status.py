@@ -0,0 +1,54 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('predictions', '0006_appointment_table'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='transaction',
+            name='diagnosis',
+            field=models.CharField(blank=True, max_length=100),
+        ),
+        migrations.AlterField(
+            model_name='transaction',
+            name='confidence',
+            field=models.FloatField(blank=True, null=True),
+        ),
+        migrations.AlterField(
+            model_name='transaction',
+            name='model_version',
+            field=models.CharField(blank=True, max_length=20),
+        ),
+        migrations.AlterField(
+            model_name='transaction',
+            name='processing_time',
+            field=models.FloatField(blank=True, help_text='Processing time in seconds', null=True),
+        ),
+        migrations.AddField(
+            model_name='transaction',
+            name='status',
+            field=models.CharField(
+                choices=[('pending', 'Pending'), ('processing', 'Processing'), ('completed', 'Completed'), ('failed', 'Failed')],
+                default='completed',
+                max_length=20
+            ),
+        ),
+        migrations.AddField(
+            model_name='transaction',
+            name='error',
+            field=models.TextField(blank=True, help_text='Failure reason for asynchronous predictions'),
+        ),
+        migrations.AddField(
+            model_name='transaction',
+            name='completed_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='transaction',
+            index=models.Index(fields=['status', 'uploaded_at'], name='transaction_status_idx'),
+        ),
+    ]
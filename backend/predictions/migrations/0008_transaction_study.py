@@ -0,0 +1,21 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('predictions', '0007_transaction_status'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='transaction',
+            name='study_id',
+            field=models.UUIDField(blank=True, db_index=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='transaction',
+            name='slice_index',
+            field=models.PositiveIntegerField(blank=True, null=True),
+        ),
+    ]
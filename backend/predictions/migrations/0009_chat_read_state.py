@@ -0,0 +1,61 @@
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+# Backfill from the message history; same result as predictions.unread.rebuild_read_states()
+BACKFILL_SQL = """
+INSERT INTO chat_read_states (room_id, user_id, unread_count, last_read_message_id, last_read_at)
+SELECT
+    member.chatroom_id,
+    member.user_id,
+    (
+        SELECT COUNT(*) FROM messages message
+        WHERE message.room_id = member.chatroom_id
+          AND message.sender_id <> member.user_id
+          AND NOT EXISTS (
+              SELECT 1 FROM messages_read_by read
+              WHERE read.message_id = message.id AND read.user_id = member.user_id
+          )
+    ),
+    last_read.id,
+    last_read.created_at
+FROM chat_rooms_members member
+LEFT JOIN LATERAL (
+    SELECT message.id, message.created_at FROM messages message
+    JOIN messages_read_by read ON read.message_id = message.id AND read.user_id = member.user_id
+    WHERE message.room_id = member.chatroom_id
+    ORDER BY message.created_at DESC
+    LIMIT 1
+) last_read ON TRUE
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('predictions', '0008_transaction_study'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ChatReadState',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('unread_count', models.PositiveIntegerField(default=0)),
+                ('last_read_at', models.DateTimeField(blank=True, null=True)),
+                ('last_read_message', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='predictions.message')),
+                ('room', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='read_states', to='predictions.chatroom')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='chat_read_states', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'db_table': 'chat_read_states',
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='chatreadstate',
+            constraint=models.UniqueConstraint(fields=('user', 'room'), name='read_state_user_room_uniq'),
+        ),
+        migrations.RunSQL(BACKFILL_SQL, migrations.RunSQL.noop),
+    ]
@@ -0,0 +1,52 @@
+from django.db import migrations
+
+
+# Every member gets a read state; the watermark moves up to the newest message they
+# marked read, and the unread count becomes the messages of others after it
+CONVERT_READ_BY_SQL = [
+    """
+    INSERT INTO chat_read_states (room_id, user_id, unread_count)
+    SELECT chatroom_id, user_id, 0 FROM chat_rooms_members
+    ON CONFLICT (user_id, room_id) DO NOTHING
+    """,
+    """
+    UPDATE chat_read_states state
+    SET (last_read_message_id, last_read_at) = (
+        SELECT message.id, message.created_at FROM messages message
+        JOIN messages_read_by read ON read.message_id = message.id
+        WHERE message.room_id = state.room_id AND read.user_id = state.user_id
+        ORDER BY message.created_at DESC
+        LIMIT 1
+    )
+    WHERE EXISTS (
+        SELECT 1 FROM messages message
+        JOIN messages_read_by read ON read.message_id = message.id
+        WHERE message.room_id = state.room_id AND read.user_id = state.user_id
+          AND (state.last_read_at IS NULL OR message.created_at > state.last_read_at)
+    )
+    """,
+    """
+    UPDATE chat_read_states state
+    SET unread_count = (
+        SELECT COUNT(*) FROM messages message
+        WHERE message.room_id = state.room_id
+          AND message.sender_id <> state.user_id
+          AND (state.last_read_at IS NULL OR message.created_at > state.last_read_at)
+    )
+    """,
+]
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('predictions', '0009_chat_read_state'),
+    ]
+
+    operations = [
+        migrations.RunSQL(CONVERT_READ_BY_SQL, migrations.RunSQL.noop),
+        migrations.RemoveField(
+            model_name='message',
+            name='read_by',
+        ),
+    ]
@@ -0,0 +1,40 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('predictions', '0010_read_watermarks'),
+    ]
+
+    operations = [
+        # Keyset pagination walks (owner, timestamp, id); each index replaces one on its prefix
+        migrations.RemoveIndex(
+            model_name='message',
+            name='room_created_idx',
+        ),
+        migrations.AddIndex(
+            model_name='message',
+            index=models.Index(fields=['room', 'created_at', 'id'], name='message_room_keyset_idx'),
+        ),
+        migrations.RemoveIndex(
+            model_name='transaction',
+            name='transaction_patient_idx',
+        ),
+        migrations.AddIndex(
+            model_name='transaction',
+            index=models.Index(fields=['patient', 'uploaded_at', 'id'], name='transaction_patient_keyset_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='transaction',
+            index=models.Index(fields=['user', 'uploaded_at', 'id'], name='transaction_user_keyset_idx'),
+        ),
+        migrations.RemoveIndex(
+            model_name='patient',
+            name='patient_created_by_idx',
+        ),
+        migrations.AddIndex(
+            model_name='patient',
+            index=models.Index(fields=['created_by', 'created_at', 'id'], name='patient_creator_keyset_idx'),
+        ),
+    ]
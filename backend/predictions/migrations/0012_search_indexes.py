@@ -0,0 +1,61 @@
+import django.contrib.postgres.indexes
+import django.contrib.postgres.search
+from django.db import migrations
+
+# Substring search (icontains, i.e. UPPER(col) LIKE UPPER('%q%')) can only use
+# trigram indexes on the same expression. pg_trgm ships with the Postgres
+# contrib modules; on servers without them the searches still work, unindexed.
+TRIGRAM_INDEXES = {
+    'patient_name_trgm_idx': ('patients', 'full_name'),
+    'patient_mrn_trgm_idx': ('patients', 'mrn'),
+    'patient_phone_trgm_idx': ('patients', 'phone'),
+    'transaction_diagnosis_trgm_idx': ('transactions', 'diagnosis'),
+}
+
+CREATE_TRIGRAM_INDEXES = """
+DO $$
+BEGIN
+    IF EXISTS (SELECT 1 FROM pg_available_extensions WHERE name = 'pg_trgm') THEN
+        CREATE EXTENSION IF NOT EXISTS pg_trgm;
+%s
+    END IF;
+END
+$$;
+""" % '\n'.join(
+    f'        CREATE INDEX IF NOT EXISTS {name} ON {table} USING gin (UPPER({column}::text) gin_trgm_ops);'
+    for name, (table, column) in TRIGRAM_INDEXES.items()
+)
+
+DROP_TRIGRAM_INDEXES = '\n'.join(f'DROP INDEX IF EXISTS {name};' for name in TRIGRAM_INDEXES)
+
+# 'simple' keeps words as written (no stemming or stop words): messages mix
+# clinical terms, names and languages the english configuration would mangle
+CREATE_SEARCH_TRIGGER = """
+CREATE TRIGGER messages_search_vector
+    BEFORE INSERT OR UPDATE OF content ON messages
+    FOR EACH ROW EXECUTE FUNCTION tsvector_update_trigger(search_vector, 'pg_catalog.simple', content);
+UPDATE messages SET search_vector = to_tsvector('pg_catalog.simple', content);
+"""
+
+DROP_SEARCH_TRIGGER = "DROP TRIGGER IF EXISTS messages_search_vector ON messages;"
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('predictions', '0011_keyset_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='message',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        migrations.RunSQL(CREATE_SEARCH_TRIGGER, DROP_SEARCH_TRIGGER),
+        migrations.AddIndex(
+            model_name='message',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['search_vector'], name='message_search_idx'),
+        ),
+        migrations.RunSQL(CREATE_TRIGRAM_INDEXES, DROP_TRIGRAM_INDEXES),
+    ]
@@ -0,0 +1,148 @@
+"""
+Pooled HTTP client and circuit breaker for backend -> ML service calls.
+"""
+import logging
+import threading
+import time
+
+import requests
+from django.conf import settings
+from requests.adapters import HTTPAdapter
+
+logger = logging.getLogger(__name__)
+
+
+class CircuitOpenError(requests.RequestException):
+    """
+    Raised without contacting the ML service while the circuit is open.
+    Not a ConnectionError, so the tenacity retry policy does not retry it.
+    """
+
+
+class CircuitBreaker:
+    """
+    Consecutive-failure circuit breaker.
+
+    After ``failure_threshold`` consecutive failures every call fails fast for
+    ``reset_timeout`` seconds. Then a single trial call is let through
+    (half-open); its outcome closes the circuit or opens it again.
+    """
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+
+    def __init__(self, failure_threshold=5, reset_timeout=30.0, clock=time.monotonic):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._clock = clock
+        self._state = self.CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._trial_in_flight = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self):
+        with self._lock:
+            return self._current_state()
+
+    def before_call(self):
+        """
+        Raise CircuitOpenError unless a call may go through now. Returns
+        True when the call is the half-open trial.
+        """
+        with self._lock:
+            state = self._current_state()
+            if state == self.CLOSED:
+                return False
+            if state == self.HALF_OPEN and not self._trial_in_flight:
+                self._trial_in_flight = True
+                return True
+        raise CircuitOpenError("ML service circuit is open, failing fast")
+
+    def record_success(self):
+        with self._lock:
+            if self._state != self.CLOSED:
+                logger.info("ML service circuit closed")
+            self._state = self.CLOSED
+            self._failures = 0
+            self._trial_in_flight = False
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            if self._state == self.HALF_OPEN or self._failures >= self.failure_threshold:
+                if self._state != self.OPEN:
+                    logger.warning(f"ML service circuit opened after {self._failures} consecutive failures")
+                self._state = self.OPEN
+                self._opened_at = self._clock()
+                self._trial_in_flight = False
+
+    def release_trial(self):
+        """Free the half-open trial slot when the trial call ended without an outcome."""
+        with self._lock:
+            self._trial_in_flight = False
+
+    def _current_state(self):
+        if self._state == self.OPEN and self._clock() - self._opened_at >= self.reset_timeout:
+            self._state = self.HALF_OPEN
+            self._trial_in_flight = False
+        return self._state
+
+
+class MLServiceClient:
+    """
+    Long-lived HTTP client for the ML service.
+
+    One requests.Session with a sized connection pool keeps connections
+    alive across predictions instead of opening one per call. Request errors
+    (connection errors, timeouts, broken responses) and 5xx responses other
+    than 503 (the ML service's own overload signal) count as circuit breaker
+    failures.
+    """
+
+    def __init__(self, pool_size=10, breaker=None):
+        self.breaker = breaker or CircuitBreaker()
+        self.session = requests.Session()
+        self._adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        self.session.mount('http://', self._adapter)
+        self.session.mount('https://', self._adapter)
+        self._requests = 0
+        self._lock = threading.Lock()
+
+    def post(self, url, **kwargs):
+        """POST through the pooled session, guarded by the circuit breaker."""
+        trial = self.breaker.before_call()
+        with self._lock:
+            self._requests += 1
+        try:
+            response = self.session.post(url, **kwargs)
+            if response.status_code >= 500 and response.status_code != 503:
+                self.breaker.record_failure()
+            else:
+                self.breaker.record_success()
+            return response
+        except requests.RequestException:
+            self.breaker.record_failure()
+            raise
+        finally:
+            # Any other exception records no outcome; the trial must not keep its slot
+            if trial:
+                self.breaker.release_trial()
+
+    def stats(self):
+        pools = self._adapter.poolmanager.pools
+        return {
+            'requests': self._requests,
+            'connections_opened': sum(pools[key].num_connections for key in pools.keys()),
+            'circuit': self.breaker.state,
+        }
+
+
+ml_client = MLServiceClient(
+    pool_size=settings.ML_SERVICE_POOL_SIZE,
+    breaker=CircuitBreaker(
+        failure_threshold=settings.ML_SERVICE_CIRCUIT_FAILURES,
+        reset_timeout=settings.ML_SERVICE_CIRCUIT_RESET_SECONDS,
+    ),
+)
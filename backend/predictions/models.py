@@ -2,8 +2,11 @@
 Database models for medical diagnosis predictions.
 """
 import uuid
-from django.db import models, transaction
+from django.db import DEFAULT_DB_ALIAS, IntegrityError, connection, connections, models, transaction
+from django.db.models import F
 from django.contrib.auth.models import User
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVectorField
 from django.utils import timezone
 
 
@@ -62,6 +65,7 @@ class Patient(models.Model):
             models.Index(fields=['mrn'], name='patient_mrn_idx'),
             models.Index(fields=['full_name'], name='patient_name_idx'),
             models.Index(fields=['phone'], name='patient_phone_idx'),
+            models.Index(fields=['created_by', 'created_at', 'id'], name='patient_creator_keyset_idx'),
         ]
 
     def save(self, *args, **kwargs):
@@ -73,54 +77,106 @@ class Patient(models.Model):
         return f"{self.full_name} ({self.mrn})"
 
 
+MRN_SEQUENCE = 'patient_mrn_{year}_seq'
+
+
 def generate_mrn():
     """
     Generate a unique, year-prefixed MRN with an 8-digit counter.
     Example: MRN202500000001
+
+    Numbers come from a Postgres sequence per year, so concurrent patient
+    creation never waits on a row lock and the counter restarts each year.
+    Numbers drawn by transactions that roll back are not reused.
     """
-    prefix = f"MRN{timezone.now().year}"
-
-    with transaction.atomic():
-        last_record = (
-            Patient.objects
-            .select_for_update()
-            .filter(mrn__startswith=prefix)
-            .order_by('-mrn')
-            .first()
-        )
+    year = timezone.now().year
+    sequence = MRN_SEQUENCE.format(year=year)
+
+    with connection.cursor() as cursor:
+        # nextval(NULL) is NULL, so a missing sequence costs no error and no savepoint
+        cursor.execute("SELECT nextval(to_regclass(%s))", [sequence])
+        next_number = cursor.fetchone()[0]
+        if next_number is None:
+            _create_mrn_sequence(sequence, f"MRN{year}")
+            cursor.execute("SELECT nextval(%s)", [sequence])
+            next_number = cursor.fetchone()[0]
+
+    return f"MRN{year}{next_number:08d}"
+
 
-        if last_record:
-            suffix = last_record.mrn[len(prefix):]
-            next_number = int(suffix) + 1 if suffix.isdigit() else 1
-        else:
-            next_number = 1
+def _create_mrn_sequence(sequence, prefix):
+    """
+    Create the year's sequence, continuing after MRNs already issued with `prefix`.
+    It is created on a separate autocommit connection, so a long transaction
+    around the first patient of the year does not hold a catalog lock that
+    every other patient creation would wait on.
+    """
+    last_mrn = (
+        Patient.objects
+        .filter(mrn__startswith=prefix)
+        .order_by('-mrn')
+        .values_list('mrn', flat=True)
+        .first()
+    )
+    suffix = last_mrn[len(prefix):] if last_mrn else ''
+    start = int(suffix) + 1 if suffix.isdigit() else 1
 
-        return f"{prefix}{next_number:08d}"
+    ddl_connection = connections.create_connection(DEFAULT_DB_ALIAS)
+    try:
+        with ddl_connection.cursor() as cursor:
+            cursor.execute(f"CREATE SEQUENCE IF NOT EXISTS {sequence} START WITH {start}")
+    except IntegrityError:
+        # Another connection created it concurrently; its start value is as good as ours
+        pass
+    finally:
+        ddl_connection.close()
 
 
 class Transaction(models.Model):
     """
     Model to store medical diagnosis prediction transactions.
+    Asynchronous uploads start as 'pending' and are filled in by a background job.
     """
+    STATUS_PENDING = 'pending'
+    STATUS_PROCESSING = 'processing'
+    STATUS_COMPLETED = 'completed'
+    STATUS_FAILED = 'failed'
+    STATUS_CHOICES = [
+        (STATUS_PENDING, 'Pending'),
+        (STATUS_PROCESSING, 'Processing'),
+        (STATUS_COMPLETED, 'Completed'),
+        (STATUS_FAILED, 'Failed'),
+    ]
+
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='transactions', null=True, blank=True)
     patient = models.ForeignKey('Patient', on_delete=models.SET_NULL, related_name='transactions', null=True, blank=True)
     image_url = models.URLField(max_length=500)
-    diagnosis = models.CharField(max_length=100)
-    confidence = models.FloatField()
-    model_version = models.CharField(max_length=20)
-    processing_time = models.FloatField(help_text="Processing time in seconds")
+    diagnosis = models.CharField(max_length=100, blank=True)
+    confidence = models.FloatField(null=True, blank=True)
+    model_version = models.CharField(max_length=20, blank=True)
+    processing_time = models.FloatField(null=True, blank=True, help_text="Processing time in seconds")
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default=STATUS_COMPLETED)
+    error = models.TextField(blank=True, help_text="Failure reason for asynchronous predictions")
     uploaded_at = models.DateTimeField(auto_now_add=True)
+    completed_at = models.DateTimeField(null=True, blank=True)
+    # Set for slices uploaded together as one multi-slice study
+    study_id = models.UUIDField(null=True, blank=True, db_index=True)
+    slice_index = models.PositiveIntegerField(null=True, blank=True)
 
     class Meta:
         db_table = 'transactions'
         ordering = ['-uploaded_at']
         indexes = [
             models.Index(fields=['uploaded_at'], name='uploaded_at_idx'),
-            models.Index(fields=['patient'], name='transaction_patient_idx'),
+            models.Index(fields=['user', 'uploaded_at', 'id'], name='transaction_user_keyset_idx'),
+            models.Index(fields=['patient', 'uploaded_at', 'id'], name='transaction_patient_keyset_idx'),
+            models.Index(fields=['status', 'uploaded_at'], name='transaction_status_idx'),
         ]
 
     def __str__(self):
+        if self.status != self.STATUS_COMPLETED:
+            return f"{self.status} ({self.uploaded_at})"
         return f"{self.diagnosis} - {self.confidence:.2f} ({self.uploaded_at})"
 
 
@@ -168,20 +224,72 @@ class Message(models.Model):
     sender = models.ForeignKey(User, on_delete=models.CASCADE, related_name='sent_messages')
     content = models.TextField()
     attachment_url = models.URLField(max_length=500, blank=True, help_text="URL to attached file/image")
-    read_by = models.ManyToManyField(User, related_name='read_messages', blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
+    # Set from content by the messages_search_vector trigger on every insert and update
+    search_vector = SearchVectorField(null=True, editable=False)
     
     class Meta:
         db_table = 'messages'
         ordering = ['created_at']
         indexes = [
-            models.Index(fields=['room', 'created_at'], name='room_created_idx'),
+            models.Index(fields=['room', 'created_at', 'id'], name='message_room_keyset_idx'),
+            GinIndex(fields=['search_vector'], name='message_search_idx'),
         ]
     
+    def save(self, *args, **kwargs):
+        adding = self._state.adding
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+            if adding:
+                ChatReadState.record_message(self)
+
     def __str__(self):
         return f"{self.sender.username}: {self.content[:50]}"
 
 
+class ChatReadState(models.Model):
+    """
+    Per-member read state of a chat room: a read watermark (the last message
+    read and its timestamp) and the unread messages after it. Messages up to
+    the watermark are read. Saving a new Message counts it here and
+    predictions.unread.mark_read() moves the watermark; the
+    rebuild_read_states command repairs the counts.
+    """
+    room = models.ForeignKey(ChatRoom, on_delete=models.CASCADE, related_name='read_states')
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='chat_read_states')
+    unread_count = models.PositiveIntegerField(default=0)
+    last_read_message = models.ForeignKey(Message, on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
+    last_read_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        db_table = 'chat_read_states'
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'room'], name='read_state_user_room_uniq'),
+        ]
+
+    @classmethod
+    def record_message(cls, message):
+        """Count `message` as unread for every room member except its sender."""
+        member_ids = list(
+            ChatRoom.members.through.objects
+            .filter(chatroom_id=message.room_id)
+            .exclude(user_id=message.sender_id)
+            .values_list('user_id', flat=True)
+        )
+        if not member_ids:
+            return
+        cls.objects.bulk_create(
+            [cls(room_id=message.room_id, user_id=user_id) for user_id in member_ids],
+            ignore_conflicts=True,
+        )
+        cls.objects.filter(room_id=message.room_id, user_id__in=member_ids).update(
+            unread_count=F('unread_count') + 1
+        )
+
+    def __str__(self):
+        return f"{self.user_id} in {self.room_id}: {self.unread_count} unread"
+
+
 # ==================== Treatment Management Models ====================
 
 class TreatmentPlan(models.Model):
@@ -0,0 +1,116 @@
+"""
+Pagination classes for list endpoints.
+"""
+import base64
+import binascii
+import json
+
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+
+class DefaultPagination(PageNumberPagination):
+    """
+    Custom pagination class with configurable page size.
+    """
+    page_size = 10
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+
+
+class KeysetPagination(DefaultPagination):
+    """
+    Cursor pagination on a (timestamp, id) key, with page numbers on request.
+
+    Without a `page` parameter, pages are read in the view's `keyset_ordering`
+    (default newest first) and linked by opaque `next`/`previous` cursors that
+    hold the key of the row at the page edge. A page is an index range scan
+    from that key, so deep pages cost the same as the first and no COUNT(*)
+    runs. Requests with `page` get the former page-number responses.
+    """
+    cursor_query_param = 'cursor'
+    ordering = ('-created_at', '-id')
+    invalid_cursor_message = 'Invalid cursor'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.use_keyset = self.page_query_param not in request.query_params
+        if not self.use_keyset:
+            return super().paginate_queryset(queryset, request, view)
+
+        self.request = request
+        self.fields = getattr(view, 'keyset_ordering', self.ordering)
+        page_size = self.get_page_size(request)
+        key, reverse = self.decode_cursor(request, queryset.model)
+
+        # Previous pages are read walking back towards the start, then flipped
+        ordering = [self.flip(field) for field in self.fields] if reverse else list(self.fields)
+        queryset = queryset.order_by(*ordering)
+        if key is not None:
+            queryset = queryset.filter(self.after(ordering, key))
+
+        rows = list(queryset[:page_size + 1])
+        has_more = len(rows) > page_size
+        rows = rows[:page_size]
+        if reverse:
+            rows.reverse()
+        has_next, has_previous = (True, has_more) if reverse else (has_more, key is not None)
+
+        self.next_key = self.key_of(rows[-1]) if rows and has_next else None
+        self.previous_key = self.key_of(rows[0]) if rows and has_previous else None
+        return rows
+
+    def get_paginated_response(self, data):
+        if not self.use_keyset:
+            return super().get_paginated_response(data)
+        return Response({
+            'next': self.cursor_link(self.next_key, reverse=False),
+            'previous': self.cursor_link(self.previous_key, reverse=True),
+            'results': data,
+        })
+
+    @staticmethod
+    def flip(field):
+        return field[1:] if field.startswith('-') else f'-{field}'
+
+    @staticmethod
+    def after(ordering, key):
+        """
+        Rows past `key` in `ordering`. The bound on the leading field alone
+        is what the index range scan starts from; the rest breaks ties.
+        """
+        (first, second), (first_value, second_value) = ordering, key
+        descending = first.startswith('-')
+        first, second = first.lstrip('-'), second.lstrip('-')
+        past, bound = ('lt', 'lte') if descending else ('gt', 'gte')
+        return Q(**{f'{first}__{bound}': first_value}) & (
+            Q(**{f'{first}__{past}': first_value}) | Q(**{first: first_value, f'{second}__{past}': second_value})
+        )
+
+    def key_of(self, row):
+        first, second = (field.lstrip('-') for field in self.fields)
+        return [getattr(row, first).isoformat(), str(getattr(row, second))]
+
+    def cursor_link(self, key, reverse):
+        if key is None:
+            return None
+        token = base64.urlsafe_b64encode(json.dumps({'k': key, 'r': reverse}).encode()).decode()
+        return replace_query_param(self.request.build_absolute_uri(), self.cursor_query_param, token)
+
+    def decode_cursor(self, request, model):
+        """(key, reverse) from the cursor parameter, or (None, False) for the first page."""
+        token = request.query_params.get(self.cursor_query_param)
+        if not token:
+            return None, False
+        try:
+            cursor = json.loads(base64.urlsafe_b64decode(token.encode()))
+            key = [
+                model._meta.get_field(field.lstrip('-')).to_python(value)
+                for field, value in zip(self.fields, cursor['k'], strict=True)
+            ]
+            return key, bool(cursor.get('r'))
+        except (TypeError, ValueError, KeyError, binascii.Error, ValidationError):
+            raise NotFound(self.invalid_cursor_message)
@@ -0,0 +1,85 @@
+"""
+Ranked queries behind the global search.
+
+Each entity type is one query that filters, ranks and limits in the database;
+nothing counts the full match set. Patient and diagnosis substring matches
+(icontains) are served by the pg_trgm indexes of migration 0012 where the
+server has pg_trgm. Messages match on their search_vector column, kept up to
+date from content by a trigger, and rank by ts_rank, so message search is an
+index scan on the GIN index rather than a scan of every message.
+"""
+import re
+
+from django.contrib.postgres.expressions import ArraySubquery
+from django.contrib.postgres.search import SearchQuery, SearchRank
+from django.db.models import BooleanField, Case, F, Func, IntegerField, Q, Value, When
+
+from .models import ChatRoom, Message, Patient, Transaction
+
+RESULT_LIMIT = 10
+SEARCH_CONFIG = 'simple'
+
+
+class EqualsAny(Func):
+    """`expression = ANY(array)`, as a filter."""
+    arg_joiner = ' = ANY('
+    template = '%(expressions)s)'
+    output_field = BooleanField()
+
+
+def matching_patients(query):
+    return Patient.objects.filter(
+        Q(full_name__icontains=query) |
+        Q(mrn__icontains=query) |
+        Q(phone__icontains=query)
+    )
+
+
+def search_patients(query, limit=RESULT_LIMIT):
+    """Exact MRN or phone matches first, then prefix matches, then the other substring matches."""
+    rank = Case(
+        When(Q(mrn__iexact=query) | Q(phone=query), then=Value(2)),
+        When(Q(full_name__istartswith=query) | Q(mrn__istartswith=query) | Q(phone__startswith=query), then=Value(1)),
+        default=Value(0),
+        output_field=IntegerField(),
+    )
+    return matching_patients(query).annotate(rank=rank).order_by('-rank', 'full_name', 'id')[:limit]
+
+
+def search_diagnoses(query, limit=RESULT_LIMIT):
+    """Latest diagnoses whose label, or whose patient's name or MRN, matches."""
+    return Transaction.objects.filter(
+        Q(diagnosis__icontains=query) |
+        Q(patient__in=matching_patients(query).values('pk'))
+    ).select_related('patient').order_by('-uploaded_at')[:limit]
+
+
+def message_search_query(query):
+    """
+    All words of `query`, the last one as a prefix since it may still be being
+    typed ('glioma lef' finds 'glioma, left lobe'), or None when it has no
+    words. Prefixes cost more to look up in the index than whole words, so only
+    the last word is one. Words are reduced to \\w runs so the raw tsquery is valid.
+    """
+    words = re.findall(r'\w+', query)
+    if not words:
+        return None
+    terms = words[:-1] + [f'{words[-1]}:*']
+    return SearchQuery(' & '.join(terms), search_type='raw', config=SEARCH_CONFIG)
+
+
+def search_messages(user, query, limit=RESULT_LIMIT):
+    """Best ranked, then newest, messages matching `query` in the rooms `user` belongs to."""
+    search_query = message_search_query(query)
+    if search_query is None:
+        return Message.objects.none()
+    # room_id = ANY(ARRAY(...)) reads the rooms once, so the GIN index is scanned
+    # once and intersected with the room index; with room_id IN (...) the planner
+    # repeats the GIN scan per room, which costs seconds for common words
+    rooms = ArraySubquery(ChatRoom.members.through.objects.filter(user=user).values('chatroom_id'))
+    return Message.objects.filter(
+        EqualsAny(F('room_id'), rooms),
+        search_vector=search_query,
+    ).annotate(
+        rank=SearchRank(F('search_vector'), search_query),
+    ).select_related('sender__profile', 'room').defer('search_vector').order_by('-rank', '-created_at')[:limit]
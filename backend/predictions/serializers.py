@@ -1,7 +1,10 @@
 """
 Serializers for medical diagnosis predictions API.
 """
+from django.conf import settings
 from rest_framework import serializers
+from . import unread
+from .dicom import DICOM_CONTENT_TYPE, frame_count, is_dicom
 from .models import Transaction, UserProfile, Patient, Appointment, ChatRoom, Message, TreatmentPlan, Medication, FollowUpNote
 from django.contrib.auth.models import User
 
@@ -37,9 +40,16 @@ class TransactionSerializer(serializers.ModelSerializer):
             # patient linkage
             'patient',
             'patient_data',
-            'uploaded_at'
+            'uploaded_at',
+            # asynchronous prediction jobs
+            'status',
+            'error',
+            'completed_at',
+            # multi-slice studies
+            'study_id',
+            'slice_index',
         ]
-        read_only_fields = ['id', 'uploaded_at', 'patient']
+        read_only_fields = ['id', 'uploaded_at', 'patient', 'status', 'error', 'completed_at', 'study_id', 'slice_index']
 
 
 class PatientSerializer(serializers.ModelSerializer):
@@ -91,11 +101,53 @@ class AppointmentSerializer(serializers.ModelSerializer):
         return None
 
 
+class ScanField(serializers.ImageField):
+    """
+    Image upload field that also accepts DICOM files.
+
+    DICOM files are recognised by their "DICM" prefix and skip Pillow's
+    image check, which cannot read them.
+    """
+
+    def to_internal_value(self, data):
+        if hasattr(data, 'read') and is_dicom(data):
+            return serializers.FileField.to_internal_value(self, data)
+        return super().to_internal_value(data)
+
+
+def validate_image_file(value):
+    """
+    Check size and format of an uploaded image or DICOM file.
+    """
+    if is_dicom(value):
+        if value.size > settings.DICOM_UPLOAD_MAX_SIZE:
+            raise serializers.ValidationError(
+                f"DICOM file size must be less than {settings.DICOM_UPLOAD_MAX_SIZE // (1024 * 1024)}MB."
+            )
+        try:
+            frame_count(value)
+        except Exception:
+            raise serializers.ValidationError("Unreadable DICOM file.")
+        value.content_type = DICOM_CONTENT_TYPE
+        return value
+    
+    # Check file size (10MB max)
+    if value.size > 10 * 1024 * 1024:
+        raise serializers.ValidationError("Image file size must be less than 10MB.")
+    
+    # Check file format
+    allowed_formats = ['image/jpeg', 'image/jpg', 'image/png']
+    if value.content_type not in allowed_formats:
+        raise serializers.ValidationError("Only JPG, PNG and DICOM images are allowed.")
+    
+    return value
+
+
 class UploadImageSerializer(serializers.Serializer):
     """
     Serializer for image upload requests.
     """
-    image = serializers.ImageField(required=True)
+    image = ScanField(required=True)
     patient_id = serializers.IntegerField(required=False)
     # patient info
     patient_name = serializers.CharField(max_length=255, required=False)
@@ -108,16 +160,7 @@ class UploadImageSerializer(serializers.Serializer):
         """
         Validate uploaded image.
         """
-        # Check file size (10MB max)
-        if value.size > 10 * 1024 * 1024:
-            raise serializers.ValidationError("Image file size must be less than 10MB.")
-        
-        # Check file format
-        allowed_formats = ['image/jpeg', 'image/jpg', 'image/png']
-        if value.content_type not in allowed_formats:
-            raise serializers.ValidationError("Only JPG and PNG images are allowed.")
-        
-        return value
+        return validate_image_file(value)
 
     def validate(self, attrs):
         """Allow either patient_id or full patient fields for backward compatibility."""
@@ -139,6 +182,24 @@ class UploadImageSerializer(serializers.Serializer):
         return attrs
 
 
+class BatchUploadSerializer(UploadImageSerializer):
+    """
+    Serializer for multi-slice study uploads: several images for one patient.
+    """
+    image = None
+    images = serializers.ListField(
+        child=ScanField(),
+        min_length=1,
+        max_length=settings.BATCH_UPLOAD_MAX_FILES,
+    )
+
+    def validate_images(self, value):
+        """
+        Validate every slice of the study.
+        """
+        return [validate_image_file(image) for image in value]
+
+
 class LoginSerializer(serializers.Serializer):
     """Serializer for user login."""
     username = serializers.CharField()
@@ -197,7 +258,9 @@ class MessageSerializer(serializers.ModelSerializer):
     def get_is_read(self, obj):
         request = self.context.get('request')
         if request and request.user:
-            return obj.read_by.filter(id=request.user.id).exists()
+            # Message lists pass the room's watermarks so each message costs no query
+            watermarks = self.context.get('read_watermarks') or unread.read_watermarks(obj.room_id, request.user)
+            return unread.is_read(obj, request.user, watermarks)
         return False
     
     class Meta:
@@ -218,7 +281,16 @@ class ChatRoomSerializer(serializers.ModelSerializer):
     unread_count = serializers.SerializerMethodField()
     
     def get_last_message(self, obj):
-        last_msg = obj.messages.last()
+        # Rooms listed through chat_rooms_for() carry the last message as annotations
+        if hasattr(obj, 'last_message_at'):
+            if obj.last_message_at is None:
+                return None
+            return {
+                'content': obj.last_message_content,
+                'sender': obj.last_message_sender,
+                'created_at': obj.last_message_at
+            }
+        last_msg = obj.messages.select_related('sender').last()
         if last_msg:
             return {
                 'content': last_msg.content,
@@ -228,9 +300,12 @@ class ChatRoomSerializer(serializers.ModelSerializer):
         return None
     
     def get_unread_count(self, obj):
+        if hasattr(obj, 'unread_count'):
+            return obj.unread_count
         request = self.context.get('request')
         if request and request.user:
-            return obj.messages.exclude(read_by=request.user).exclude(sender=request.user).count()
+            state = obj.read_states.filter(user=request.user).first()
+            return state.unread_count if state else 0
         return 0
     
     class Meta:
@@ -1,16 +1,21 @@
 """
 Unit tests for Chat and WebSocket functionality.
 """
+import io
 import unittest
+from django.db import connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
 from django.contrib.auth import get_user_model
 from rest_framework.test import APIClient
 from rest_framework import status
 from channels.testing import WebsocketCommunicator
 from channels.routing import URLRouter
 from django.urls import re_path
+from django.core.management import call_command
 
-from .models import ChatRoom, Message
+from . import unread
+from .models import ChatReadState, ChatRoom, Message
 
 User = get_user_model()
 
@@ -84,7 +89,7 @@ class MessageModelTestCase(TestCase):
         self.assertEqual(message.content, 'Hello, World!')
         self.assertEqual(message.sender, self.user1)
         self.assertEqual(message.room, self.room)
-        self.assertEqual(message.read_by.count(), 0)
+        self.assertFalse(unread.is_read(message, self.user2, unread.read_watermarks(self.room.id, self.user2)))
     
     def test_mark_message_as_read(self):
         """Test marking message as read."""
@@ -94,9 +99,9 @@ class MessageModelTestCase(TestCase):
             content='Test message'
         )
         
-        message.read_by.add(self.user2)
+        unread.mark_read(self.user2, self.room.id, [message.id])
         
-        self.assertIn(self.user2, message.read_by.all())
+        self.assertTrue(unread.is_read(message, self.user2, unread.read_watermarks(self.room.id, self.user2)))
 
 
 class ChatRoomAPITestCase(TestCase):
@@ -173,6 +178,28 @@ class ChatRoomAPITestCase(TestCase):
         self.assertIn('results', response.json())
         self.assertGreaterEqual(len(response.json()['results']), 2)
     
+    def test_load_older_messages_with_cursor(self):
+        """Test cursor pages walk back through messages, ties on created_at included."""
+        messages = [
+            Message.objects.create(room=self.room, sender=self.user2, content=f'Message {index}')
+            for index in range(8)
+        ]
+        # Same timestamp for half of them, so only the id orders those
+        Message.objects.filter(id__in=[m.id for m in messages[2:6]]).update(created_at=messages[2].created_at)
+        
+        url = f'/api/v1/chat/rooms/{self.room.id}/messages/?page_size=3'
+        pages = []
+        while url:
+            with CaptureQueriesContext(connection) as queries:
+                data = self.client.get(url).json()
+            self.assertNotIn('COUNT(', ' '.join(q['sql'] for q in queries))
+            pages.append([m['id'] for m in data['results']])
+            url = data['next']
+        
+        expected = Message.objects.filter(room=self.room).order_by('-created_at', '-id')
+        self.assertEqual(sum(pages, []), [str(m.id) for m in expected])
+        self.assertEqual([len(page) for page in pages], [3, 3, 2])
+    
     def test_send_message(self):
         """Test sending a message."""
         data = {
@@ -205,8 +232,8 @@ class ChatRoomAPITestCase(TestCase):
         response = self.client.post(f'/api/v1/chat/rooms/{self.room.id}/read/', data, format='json')
         
         self.assertEqual(response.status_code, status.HTTP_200_OK)
-        message.refresh_from_db()
-        self.assertIn(self.user1, message.read_by.all())
+        state = ChatReadState.objects.get(room=self.room, user=self.user1)
+        self.assertEqual(state.last_read_message, message)
     
     def test_get_unread_count(self):
         """Test getting unread message count."""
@@ -228,6 +255,55 @@ class ChatRoomAPITestCase(TestCase):
         self.assertIn('unread_count', response.json())
         self.assertGreaterEqual(response.json()['unread_count'], 2)
     
+    def test_list_includes_last_message_and_unread_count(self):
+        """Test room listing reports the latest message and unread messages."""
+        read = Message.objects.create(room=self.room, sender=self.user2, content='Read')
+        self.client.post(f'/api/v1/chat/rooms/{self.room.id}/read/', {'message_ids': [str(read.id)]}, format='json')
+        Message.objects.create(room=self.room, sender=self.user1, content='Own message')
+        Message.objects.create(room=self.room, sender=self.user2, content='Latest')
+        
+        response = self.client.get('/api/v1/chat/rooms/')
+        
+        room = response.json()['results'][0]
+        self.assertEqual(room['last_message']['content'], 'Latest')
+        self.assertEqual(room['last_message']['sender'], 'user2')
+        self.assertEqual(room['unread_count'], 1)
+
+    def test_last_message_fields_come_from_one_message_on_timestamp_ties(self):
+        """Test content and sender of the last message agree when timestamps tie."""
+        messages = [
+            Message.objects.create(room=self.room, sender=sender, content=f'From {sender.username} #{index}')
+            for index, sender in enumerate([self.user1, self.user2] * 4)
+        ]
+        Message.objects.filter(room=self.room).update(created_at=messages[0].created_at)
+        expected = max(messages, key=lambda message: message.id)
+
+        response = self.client.get('/api/v1/chat/rooms/')
+
+        last_message = response.json()['results'][0]['last_message']
+        self.assertEqual(last_message['content'], expected.content)
+        self.assertEqual(last_message['sender'], expected.sender.username)
+
+    def test_room_list_query_count_does_not_grow_with_rooms(self):
+        """Test listing rooms runs a fixed number of queries."""
+        def add_rooms(count):
+            for index in range(count):
+                room = ChatRoom.objects.create(name=f'Room {index}', created_by=self.user1)
+                room.members.add(self.user1, self.user2)
+                Message.objects.create(room=room, sender=self.user2, content=f'Hello {index}')
+        
+        def list_queries():
+            with CaptureQueriesContext(connection) as queries:
+                response = self.client.get('/api/v1/chat/rooms/', {'page_size': 100})
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            return len(queries)
+        
+        add_rooms(2)
+        few_rooms = list_queries()
+        add_rooms(15)
+        
+        self.assertEqual(list_queries(), few_rooms)
+    
     def test_unauthorized_access(self):
         """Test that unauthenticated users cannot access chat."""
         self.client.force_authenticate(user=None)
@@ -250,6 +326,100 @@ class ChatRoomAPITestCase(TestCase):
         self.assertIn(response.status_code, [status.HTTP_403_FORBIDDEN, status.HTTP_404_NOT_FOUND])
 
 
+class ChatReadStateTestCase(TestCase):
+    """Test cases for per-member unread counters."""
+    
+    def setUp(self):
+        self.client = APIClient()
+        self.user1 = User.objects.create_user(username='user1', password='testpass123')
+        self.user2 = User.objects.create_user(username='user2', password='testpass123')
+        self.user3 = User.objects.create_user(username='user3', password='testpass123')
+        self.room = ChatRoom.objects.create(name='Test Room', created_by=self.user1)
+        self.room.members.add(self.user1, self.user2, self.user3)
+        self.client.force_authenticate(user=self.user1)
+    
+    def state(self, user):
+        return ChatReadState.objects.get(room=self.room, user=user)
+    
+    def test_new_message_counts_for_other_members(self):
+        """Test a new message is unread for everyone but its sender."""
+        Message.objects.create(room=self.room, sender=self.user2, content='Hello')
+        Message.objects.create(room=self.room, sender=self.user2, content='Again')
+        
+        self.assertEqual(self.state(self.user1).unread_count, 2)
+        self.assertEqual(self.state(self.user3).unread_count, 2)
+        self.assertFalse(ChatReadState.objects.filter(user=self.user2).exists())
+    
+    def test_marking_read_decrements_once_and_moves_pointer(self):
+        """Test reads are counted once and advance the last-read pointer."""
+        first = Message.objects.create(room=self.room, sender=self.user2, content='First')
+        second = Message.objects.create(room=self.room, sender=self.user2, content='Second')
+        Message.objects.create(room=self.room, sender=self.user2, content='Third')
+        
+        for _ in range(2):
+            response = self.client.post(
+                f'/api/v1/chat/rooms/{self.room.id}/read/',
+                {'message_ids': [str(first.id), str(second.id)]},
+                format='json'
+            )
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+        
+        state = self.state(self.user1)
+        self.assertEqual(state.unread_count, 1)
+        self.assertEqual(state.last_read_message, second)
+        self.assertEqual(self.client.get('/api/v1/chat/unread-count/').json()['unread_count'], 1)
+        self.assertEqual(self.state(self.user3).unread_count, 3)
+    
+    def test_message_list_derives_is_read_from_watermarks(self):
+        """Test is_read compares messages with the watermarks, without a query per message."""
+        older = Message.objects.create(room=self.room, sender=self.user2, content='Older')
+        own = Message.objects.create(room=self.room, sender=self.user1, content='Own')
+        newer = Message.objects.create(room=self.room, sender=self.user2, content='Newer')
+        unread.mark_read(self.user1, self.room.id, [own.id])
+        unread.mark_read(self.user3, self.room.id, [own.id])
+        
+        def list_messages():
+            with CaptureQueriesContext(connection) as queries:
+                response = self.client.get(f'/api/v1/chat/rooms/{self.room.id}/messages/', {'page_size': 100})
+            return {m['id']: m['is_read'] for m in response.json()['results']}, len(queries)
+        
+        is_read, query_count = list_messages()
+        self.assertEqual(is_read, {str(older.id): True, str(own.id): True, str(newer.id): False})
+        
+        for index in range(10):
+            Message.objects.create(room=self.room, sender=self.user2, content=f'More {index}')
+        self.assertEqual(list_messages()[1], query_count)
+    
+    def test_unread_count_is_a_single_query(self):
+        """Test the unread badge does not scan messages."""
+        for index in range(5):
+            Message.objects.create(room=self.room, sender=self.user2, content=f'Message {index}')
+        
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get('/api/v1/chat/unread-count/')
+        
+        self.assertEqual(response.json()['unread_count'], 5)
+        self.assertEqual(len(queries), 1)
+        self.assertNotIn('"messages"', queries[0]['sql'])
+    
+    def test_rebuild_command_repairs_counters(self):
+        """Test rebuild_read_states recomputes counters from history."""
+        Message.objects.bulk_create([
+            Message(room=self.room, sender=self.user2, content=f'Bulk {index}') for index in range(3)
+        ])
+        read = Message.objects.create(room=self.room, sender=self.user3, content='Read')
+        unread.mark_read(self.user1, self.room.id, [read.id])
+        Message.objects.bulk_create([Message(room=self.room, sender=self.user2, content='After')])
+        ChatReadState.objects.filter(user=self.user1).update(unread_count=42)
+        
+        call_command('rebuild_read_states', stdout=io.StringIO())
+        
+        self.assertEqual(self.state(self.user1).unread_count, 1)
+        self.assertEqual(self.state(self.user1).last_read_message, read)
+        self.assertEqual(self.state(self.user2).unread_count, 1)
+        self.assertEqual(self.state(self.user3).unread_count, 4)
+
+
 class ChatUsersAPITestCase(TestCase):
     """Test cases for Chat Users API."""
     
@@ -0,0 +1,44 @@
+"""Unit tests for the Prometheus metrics endpoint and upload stage timings."""
+from unittest.mock import patch
+
+from prometheus_client import REGISTRY
+from rest_framework import status
+
+from .metrics import STAGES
+from .test_study_upload import UploadTestCase, png_upload, slice_result
+
+
+def sample(name, **labels):
+    return REGISTRY.get_sample_value(name, labels) or 0.0
+
+
+class MetricsTestCase(UploadTestCase):
+
+    @patch('predictions.views.call_ml_service_batch')
+    def test_study_upload_records_every_stage(self, mock_batch):
+        mock_batch.return_value = {'results': [slice_result('No Tumor', 0.1)] * 2}
+        before = {stage: sample('backend_stage_duration_seconds_count', stage=stage) for stage in STAGES}
+
+        response = self.client.post('/api/v1/upload/batch/', {
+            'images': [png_upload('a.png', 0), png_upload('b.png', 10)],
+            'patient_id': self.patient.id,
+        }, format='multipart')
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        counts = {
+            stage: sample('backend_stage_duration_seconds_count', stage=stage) - before[stage]
+            for stage in STAGES
+        }
+        self.assertEqual(counts, {'storage_save': 2, 'patient_resolution': 1, 'ml_call': 1, 'db_insert': 1})
+        self.assertEqual(sample('backend_uploads_in_flight', endpoint='upload_study'), 0)
+
+    def test_metrics_endpoint_serves_prometheus_text_without_authentication(self):
+        self.client.force_authenticate(user=None)
+
+        response = self.client.get('/metrics')
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response['Content-Type'].startswith('text/plain'))
+        body = response.content.decode()
+        self.assertIn('backend_stage_duration_seconds_bucket', body)
+        self.assertIn('backend_prediction_jobs_pending', body)
@@ -0,0 +1,161 @@
+"""Unit tests for the pooled ML service client and circuit breaker."""
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest.mock import patch
+
+import requests
+from django.test import SimpleTestCase
+
+from .ml_client import CircuitBreaker, CircuitOpenError, MLServiceClient, ml_client
+from .views import call_ml_service
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class CountingServer(ThreadingHTTPServer):
+    """Keep-alive HTTP server that counts accepted TCP connections."""
+
+    daemon_threads = True
+
+    def __init__(self, status_code=200):
+        self.connections = 0
+        self.status_code = status_code
+        super().__init__(('127.0.0.1', 0), CountingHandler)
+
+    def process_request(self, request, client_address):
+        self.connections += 1
+        super().process_request(request, client_address)
+
+    @property
+    def url(self):
+        return f'http://127.0.0.1:{self.server_address[1]}/predict/'
+
+
+class CountingHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get('Content-Length', 0)))
+        body = b'{"diagnosis": "No Tumor"}'
+        self.send_response(self.server.status_code)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class MLServiceClientTestCase(SimpleTestCase):
+
+    def start_server(self, status_code=200):
+        server = CountingServer(status_code)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        self.addCleanup(server.server_close)
+        self.addCleanup(server.shutdown)
+        return server
+
+    def test_pooled_client_reuses_connections(self):
+        server = self.start_server()
+
+        for _ in range(20):
+            requests.post(server.url, json={'image_url': 'x'}, timeout=5).json()
+        per_call_connections = server.connections
+
+        client = MLServiceClient(pool_size=4)
+        for _ in range(20):
+            client.post(server.url, json={'image_url': 'x'}, timeout=5).json()
+        pooled_connections = server.connections - per_call_connections
+
+        self.assertEqual(per_call_connections, 20)
+        self.assertEqual(pooled_connections, 1)
+        self.assertEqual(client.stats()['connections_opened'], 1)
+        self.assertEqual(client.stats()['requests'], 20)
+
+    def test_server_errors_open_circuit_but_overload_does_not(self):
+        client = MLServiceClient(breaker=CircuitBreaker(failure_threshold=2))
+
+        overloaded = self.start_server(status_code=503)
+        for _ in range(3):
+            client.post(overloaded.url, timeout=5)
+        self.assertEqual(client.breaker.state, CircuitBreaker.CLOSED)
+
+        broken = self.start_server(status_code=500)
+        client.post(broken.url, timeout=5)
+        client.post(broken.url, timeout=5)
+        self.assertEqual(client.breaker.state, CircuitBreaker.OPEN)
+
+        with self.assertRaises(CircuitOpenError):
+            client.post(broken.url, timeout=5)
+
+
+class CircuitBreakerTestCase(SimpleTestCase):
+
+    def test_half_open_trial_closes_or_reopens(self):
+        clock = FakeClock()
+        breaker = CircuitBreaker(failure_threshold=2, reset_timeout=30, clock=clock)
+        breaker.record_failure()
+        breaker.before_call()
+        breaker.record_failure()
+
+        with self.assertRaises(CircuitOpenError):
+            breaker.before_call()
+
+        clock.now = 30
+        breaker.before_call()  # single trial call
+        with self.assertRaises(CircuitOpenError):
+            breaker.before_call()
+        breaker.record_failure()
+        self.assertEqual(breaker.state, CircuitBreaker.OPEN)
+
+        clock.now = 60
+        breaker.before_call()
+        breaker.record_success()
+        self.assertEqual(breaker.state, CircuitBreaker.CLOSED)
+
+    def test_open_circuit_skips_retry_backoff(self):
+        breaker = CircuitBreaker(failure_threshold=1)
+        breaker.record_failure()
+
+        with patch.object(ml_client, 'breaker', breaker), patch.object(ml_client.session, 'post') as mock_post:
+            started = time.time()
+            with self.assertRaises(CircuitOpenError):
+                call_ml_service('http://example.com/scan.png')
+            elapsed = time.time() - started
+
+        mock_post.assert_not_called()
+        self.assertLess(elapsed, 0.5)
+
+    def half_open_client(self):
+        clock = FakeClock()
+        breaker = CircuitBreaker(failure_threshold=1, reset_timeout=30, clock=clock)
+        breaker.record_failure()
+        clock.now = 30
+        return MLServiceClient(breaker=breaker)
+
+    def test_any_request_error_on_trial_reopens_circuit(self):
+        client = self.half_open_client()
+
+        with patch.object(client.session, 'post', side_effect=requests.exceptions.ChunkedEncodingError()):
+            with self.assertRaises(requests.exceptions.ChunkedEncodingError):
+                client.post('http://ml/predict/')
+
+        self.assertEqual(client.breaker.state, CircuitBreaker.OPEN)
+
+    def test_unexpected_error_on_trial_frees_trial_slot(self):
+        client = self.half_open_client()
+
+        with patch.object(client.session, 'post', side_effect=ValueError('bad argument')):
+            with self.assertRaises(ValueError):
+                client.post('http://ml/predict/')
+
+        self.assertEqual(client.breaker.state, CircuitBreaker.HALF_OPEN)
+        self.assertTrue(client.breaker.before_call())  # the next call gets the trial
@@ -0,0 +1,109 @@
+"""Unit tests for MRN allocation."""
+import threading
+from datetime import timedelta
+from unittest.mock import patch
+
+from django.db import connection, connections, transaction
+from django.test import TransactionTestCase
+from django.utils import timezone
+
+from .models import MRN_SEQUENCE, Patient
+
+
+def create_patient(name='Patient'):
+    return Patient.objects.create(full_name=name, age=40, gender='F')
+
+
+def drop_mrn_sequences(*years):
+    with connection.cursor() as cursor:
+        for year in years:
+            cursor.execute(f"DROP SEQUENCE IF EXISTS {MRN_SEQUENCE.format(year=year)}")
+
+
+class MrnAllocationTestCase(TransactionTestCase):
+    """Sequences are created outside any transaction, so these tests cannot roll them back."""
+
+    def setUp(self):
+        self.year = timezone.now().year
+        drop_mrn_sequences(self.year, self.year + 1)
+
+    def tearDown(self):
+        drop_mrn_sequences(self.year, self.year + 1)
+
+    def test_numbers_follow_each_other_within_the_year(self):
+        first, second = create_patient(), create_patient()
+
+        self.assertEqual(first.mrn, f'MRN{self.year}00000001')
+        self.assertEqual(second.mrn, f'MRN{self.year}00000002')
+
+    def test_continues_after_mrns_already_issued_this_year(self):
+        Patient.objects.create(full_name='Existing', age=50, gender='M', mrn=f'MRN{self.year}00000041')
+
+        self.assertEqual(create_patient().mrn, f'MRN{self.year}00000042')
+
+    def test_counter_restarts_each_year(self):
+        create_patient()
+        next_year = timezone.now() + timedelta(days=366)
+        with patch('predictions.models.timezone.now', return_value=next_year):
+            self.assertEqual(create_patient().mrn, f'MRN{next_year.year}00000001')
+
+
+class ConcurrentMrnAllocationTestCase(TransactionTestCase):
+
+    def setUp(self):
+        drop_mrn_sequences(timezone.now().year)
+
+    def tearDown(self):
+        drop_mrn_sequences(timezone.now().year)
+
+    def run_threads(self, count, target):
+        errors = []
+
+        def run(index):
+            try:
+                target(index)
+            except Exception as e:
+                errors.append(e)
+            finally:
+                connections.close_all()
+
+        threads = [threading.Thread(target=run, args=(index,)) for index in range(count)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(errors, [])
+
+    def test_concurrent_creation_gives_unique_mrns(self):
+        self.run_threads(8, lambda index: [create_patient(f'Patient {index}-{n}') for n in range(25)])
+
+        mrns = list(Patient.objects.values_list('mrn', flat=True))
+        self.assertEqual(len(mrns), 200)
+        self.assertEqual(len(set(mrns)), 200)
+
+    def test_open_transaction_does_not_block_other_creations(self):
+        created, release = threading.Event(), threading.Event()
+
+        def hold_transaction():
+            try:
+                with transaction.atomic():
+                    create_patient('Held')
+                    created.set()
+                    release.wait(10)
+            finally:
+                connections.close_all()
+
+        holder = threading.Thread(target=hold_transaction)
+        holder.start()
+        try:
+            self.assertTrue(created.wait(10))
+            with connection.cursor() as cursor:
+                cursor.execute("SET lock_timeout = '1s'")
+            patient = create_patient('Not blocked')
+        finally:
+            release.set()
+            holder.join()
+            with connection.cursor() as cursor:
+                cursor.execute("RESET lock_timeout")
+
+        self.assertEqual(patient.mrn, f'MRN{timezone.now().year}00000002')
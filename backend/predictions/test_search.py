@@ -0,0 +1,111 @@
+"""
+Unit tests for the global search.
+"""
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from .models import ChatRoom, Message, Patient, Transaction
+
+User = get_user_model()
+
+
+class GlobalSearchTestCase(TestCase):
+    """Test cases for GET /api/v1/search/."""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = User.objects.create_user(username='doctor', password='testpass123')
+        self.other = User.objects.create_user(username='nurse', password='testpass123')
+        self.client.force_authenticate(user=self.user)
+
+        self.room = ChatRoom.objects.create(name='Ward A', created_by=self.user)
+        self.room.members.add(self.user, self.other)
+        self.private_room = ChatRoom.objects.create(name='Private', created_by=self.other)
+        self.private_room.members.add(self.other)
+
+    def search(self, query):
+        response = self.client.get('/api/v1/search/', {'q': query})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return response.data
+
+    def test_short_query_returns_nothing(self):
+        data = self.search('a')
+
+        self.assertEqual(data['total'], 0)
+
+    def test_patients_rank_exact_and_prefix_matches_first(self):
+        Patient.objects.create(full_name='Maria Anderson', age=30, gender='F', mrn='MRN202400000002')
+        Patient.objects.create(full_name='Anderson Smith', age=40, gender='M', mrn='MRN202400000001')
+        exact = Patient.objects.create(full_name='Zoe Park', age=50, gender='F', mrn='ANDERSON')
+
+        names = [patient['full_name'] for patient in self.search('anderson')['patients']]
+
+        self.assertEqual(names, [exact.full_name, 'Anderson Smith', 'Maria Anderson'])
+
+    def test_patients_match_on_phone(self):
+        Patient.objects.create(full_name='John Doe', age=40, gender='M', phone='0812345678')
+
+        self.assertEqual([p['full_name'] for p in self.search('2345')['patients']], ['John Doe'])
+
+    def test_diagnoses_match_on_label_or_patient(self):
+        patient = Patient.objects.create(full_name='Somchai Jaidee', age=60, gender='M')
+        by_patient = Transaction.objects.create(
+            patient=patient, diagnosis='no_tumor', confidence=0.9, model_version='v1.0', processing_time=0.5
+        )
+        by_label = Transaction.objects.create(
+            diagnosis='glioma_tumor', confidence=0.8, model_version='v1.0', processing_time=0.5
+        )
+
+        self.assertEqual([d['id'] for d in self.search('somchai')['diagnoses']], [str(by_patient.id)])
+        self.assertEqual([d['id'] for d in self.search('glioma')['diagnoses']], [str(by_label.id)])
+
+    def test_messages_match_words_and_last_word_prefix(self):
+        message = Message.objects.create(room=self.room, sender=self.other, content='MRI shows a Glioma, left lobe')
+        Message.objects.create(room=self.room, sender=self.other, content='Lunch at noon?')
+
+        results = self.search('glioma lef')['messages']
+
+        self.assertEqual([m['id'] for m in results], [str(message.id)])
+        self.assertEqual(results[0]['room_name'], 'Ward A')
+
+    def test_messages_rank_by_relevance(self):
+        Message.objects.create(room=self.room, sender=self.other, content='Follow-up on the biopsy next week')
+        closer = Message.objects.create(room=self.room, sender=self.user, content='Biopsy done, biopsy report pending')
+
+        results = self.search('biopsy')['messages']
+
+        self.assertEqual(results[0]['id'], str(closer.id))
+        self.assertEqual(len(results), 2)
+
+    def test_messages_only_from_rooms_of_the_user(self):
+        Message.objects.create(room=self.private_room, sender=self.other, content='Confidential biopsy result')
+
+        self.assertEqual(self.search('biopsy')['messages'], [])
+
+    def test_edited_message_is_searchable_by_new_content(self):
+        message = Message.objects.create(room=self.room, sender=self.other, content='Draft')
+        message.content = 'Meningioma confirmed'
+        message.save()
+
+        self.assertEqual([m['id'] for m in self.search('meningioma')['messages']], [str(message.id)])
+        self.assertEqual(self.search('draft')['messages'], [])
+
+    def test_query_without_words_matches_no_messages(self):
+        Message.objects.create(room=self.room, sender=self.other, content='Results: ?? pending')
+
+        self.assertEqual(self.search('??')['messages'], [])
+
+    def test_one_query_per_entity_type(self):
+        patient = Patient.objects.create(full_name='Tumor Case', age=45, gender='F')
+        for index in range(3):
+            Transaction.objects.create(
+                patient=patient, diagnosis='pituitary_tumor', confidence=0.9, model_version='v1.0', processing_time=0.5
+            )
+            Message.objects.create(room=self.room, sender=self.other, content=f'Tumor board note {index}')
+
+        with self.assertNumQueries(3):
+            data = self.search('tumor')
+
+        self.assertEqual((len(data['patients']), len(data['diagnoses']), len(data['messages'])), (1, 3, 3))
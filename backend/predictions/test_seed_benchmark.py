@@ -0,0 +1,49 @@
+"""Unit tests for the load test fixture command."""
+import io
+import json
+
+from django.core.management import call_command
+from django.test import TestCase
+
+from .models import ChatRoom, Message, Patient, Transaction
+
+
+def seed(**options):
+    out = io.StringIO()
+    call_command(
+        'seed_benchmark', users=3, patients=20, transactions=60, rooms=2, messages=5, days=7,
+        stdout=out, **options,
+    )
+    return json.loads(out.getvalue())
+
+
+def snapshot():
+    return (
+        list(Patient.objects.order_by('mrn').values_list('mrn', 'full_name', 'age', 'gender')),
+        sorted(Transaction.objects.values_list('id', 'diagnosis', 'confidence', 'patient__mrn')),
+        sorted(ChatRoom.objects.values_list('id', 'name')),
+        sorted(Message.objects.values_list('id', 'content')),
+    )
+
+
+class SeedBenchmarkTestCase(TestCase):
+
+    def test_same_seed_gives_the_same_rows(self):
+        first = seed(seed=7)
+        rows = snapshot()
+        second = seed(seed=7, reset=True)
+
+        self.assertEqual(snapshot(), rows)
+        self.assertEqual(first['room_ids'], second['room_ids'])
+        self.assertEqual(len(second['users']), 3)
+        self.assertEqual(len(second['patient_ids']), 20)
+        self.assertEqual(Transaction.objects.count(), 60)
+        self.assertGreater(Transaction.objects.dates('uploaded_at', 'day').count(), 1)
+
+    def test_rerun_without_reset_adds_nothing(self):
+        seed(seed=7)
+        counts = (Patient.objects.count(), Transaction.objects.count(), Message.objects.count())
+
+        seed(seed=7)
+
+        self.assertEqual((Patient.objects.count(), Transaction.objects.count(), Message.objects.count()), counts)
@@ -0,0 +1,237 @@
+"""Unit tests for multi-slice study uploads."""
+import io
+import os
+import shutil
+import tempfile
+import threading
+import time
+from unittest.mock import patch
+
+import requests
+from django.contrib.auth import get_user_model
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import TestCase, override_settings
+from PIL import Image
+from pydicom.dataset import FileDataset, FileMetaDataset
+from pydicom.uid import ExplicitVRLittleEndian, MRImageStorage, generate_uid
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from .models import Patient, Transaction
+from .views import summarize_study
+
+User = get_user_model()
+
+
+def png_upload(name, shade):
+    buffer = io.BytesIO()
+    Image.new('RGB', (8, 8), (shade, shade, shade)).save(buffer, format='PNG')
+    return SimpleUploadedFile(name, buffer.getvalue(), content_type='image/png')
+
+
+def dicom_upload(name, frames):
+    meta = FileMetaDataset()
+    meta.MediaStorageSOPClassUID = MRImageStorage
+    meta.MediaStorageSOPInstanceUID = generate_uid()
+    meta.TransferSyntaxUID = ExplicitVRLittleEndian
+    dataset = FileDataset(name, {}, file_meta=meta, preamble=b'\0' * 128)
+    dataset.SOPClassUID = MRImageStorage
+    dataset.Rows = dataset.Columns = 8
+    if frames > 1:
+        dataset.NumberOfFrames = frames
+    dataset.SamplesPerPixel = 1
+    dataset.PhotometricInterpretation = 'MONOCHROME2'
+    dataset.BitsAllocated = dataset.BitsStored = 16
+    dataset.HighBit = 15
+    dataset.PixelRepresentation = 0
+    dataset.PixelData = bytes(frames * 8 * 8 * 2)
+    buffer = io.BytesIO()
+    dataset.save_as(buffer, write_like_original=False)
+    # Browsers rarely know a MIME type for .dcm files
+    return SimpleUploadedFile(name, buffer.getvalue(), content_type='application/octet-stream')
+
+
+def slice_result(diagnosis, tumor_probability):
+    return {
+        'diagnosis': diagnosis,
+        'has_tumor': tumor_probability >= 0.5,
+        'tumor_probability': tumor_probability,
+        'confidence': max(tumor_probability, 1 - tumor_probability),
+        'model_version': 'v2.0',
+        'processing_time': 0.1,
+    }
+
+
+class UploadTestCase(TestCase):
+    """Uploads against the local filesystem storage."""
+
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root, ignore_errors=True)
+        settings_override = override_settings(USE_S3=False, MEDIA_ROOT=self.media_root)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+        self.client = APIClient()
+        self.user = User.objects.create_user(username='studyuser', password='testpass')
+        self.client.force_authenticate(user=self.user)
+        self.patient = Patient.objects.create(full_name='Study Patient', age=61, gender='F')
+
+
+class StudyUploadTestCase(UploadTestCase):
+    """Multi-slice study uploads."""
+
+    def post_study(self, count):
+        return self.client.post('/api/v1/upload/batch/', {
+            'images': [png_upload(f'slice{i}.png', i * 10) for i in range(count)],
+            'patient_id': self.patient.id,
+        }, format='multipart')
+
+    @patch('predictions.views.call_ml_service_batch')
+    @patch('predictions.views.call_ml_service_upload')
+    def test_study_is_predicted_in_one_call_and_bulk_inserted(self, mock_single, mock_batch):
+        mock_batch.return_value = {'results': [
+            slice_result('No Tumor', 0.1),
+            slice_result('Glioma', 0.7),
+            slice_result('Meningioma', 0.9),
+        ]}
+
+        with self.assertNumQueries(3):  # patient validation + lookup, one bulk insert for all slices
+            response = self.post_study(3)
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        mock_single.assert_not_called()
+        files = mock_batch.call_args.args[0]
+        self.assertEqual([name for name, _, _ in files], ['slice0.png', 'slice1.png', 'slice2.png'])
+
+        data = response.json()
+        self.assertEqual([s['slice_index'] for s in data['slices']], [0, 1, 2])
+        self.assertEqual([s['diagnosis'] for s in data['slices']], ['No Tumor', 'Glioma', 'Meningioma'])
+        self.assertEqual(data['summary']['diagnosis'], 'Meningioma')
+        self.assertEqual(data['summary']['tumor_slices'], [1, 2])
+
+        transactions = Transaction.objects.filter(study_id=data['study_id']).order_by('slice_index')
+        self.assertEqual(transactions.count(), 3)
+        for transaction in transactions:
+            self.assertEqual(transaction.patient, self.patient)
+            saved_path = transaction.image_url.split('/media/', 1)[1]
+            self.assertTrue(os.path.exists(os.path.join(self.media_root, saved_path)))
+
+    @patch('predictions.views.call_ml_service_batch')
+    @patch('predictions.views.save_upload')
+    def test_storage_writes_run_in_parallel(self, mock_save, mock_batch):
+        mock_batch.return_value = {'results': [slice_result('No Tumor', 0.1)] * 4}
+        threads = set()
+
+        def slow_save(name, content):
+            threads.add(threading.get_ident())
+            time.sleep(0.2)
+            return name, 0.2
+
+        mock_save.side_effect = slow_save
+
+        started = time.time()
+        response = self.post_study(4)
+        elapsed = time.time() - started
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertGreater(len(threads), 1)
+        self.assertLess(elapsed, 0.6)
+
+    @patch('predictions.views.call_ml_service_batch')
+    def test_ml_failure_keeps_images_but_creates_no_transactions(self, mock_batch):
+        mock_batch.side_effect = requests.ConnectionError('down')
+
+        response = self.post_study(2)
+
+        self.assertEqual(response.status_code, status.HTTP_503_SERVICE_UNAVAILABLE)
+        self.assertFalse(Transaction.objects.exists())
+
+    @patch('predictions.views.call_ml_service_batch')
+    def test_result_count_mismatch_is_rejected(self, mock_batch):
+        mock_batch.return_value = {'results': [slice_result('No Tumor', 0.1)]}
+
+        response = self.post_study(2)
+
+        self.assertEqual(response.status_code, status.HTTP_500_INTERNAL_SERVER_ERROR)
+        self.assertFalse(Transaction.objects.exists())
+
+    def test_requires_images(self):
+        response = self.client.post('/api/v1/upload/batch/', {'patient_id': self.patient.id}, format='multipart')
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class DicomUploadTestCase(UploadTestCase):
+    """DICOM files and multi-frame series through the single and batch upload endpoints."""
+
+    @patch('predictions.views.call_ml_service_batch')
+    @patch('predictions.views.call_ml_service')
+    def test_series_upload_is_one_batch_request_with_a_transaction_per_frame(self, mock_single, mock_batch):
+        mock_batch.return_value = {'results': [
+            {**slice_result('No Tumor', 0.2), 'source_file': 0, 'frame': 0},
+            {**slice_result('Glioma', 0.8), 'source_file': 0, 'frame': 1},
+            {**slice_result('No Tumor', 0.1), 'source_file': 0, 'frame': 2},
+        ]}
+
+        response = self.client.post('/api/v1/upload/', {
+            'image': dicom_upload('series.dcm', 3),
+            'patient_id': self.patient.id,
+        }, format='multipart')
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        mock_single.assert_not_called()
+        ((name, _, content_type),) = mock_batch.call_args.args[0]
+        self.assertEqual((name, content_type), ('series.dcm', 'application/dicom'))
+
+        data = response.json()
+        self.assertEqual([s['slice_index'] for s in data['slices']], [0, 1, 2])
+        self.assertEqual(data['summary']['tumor_slices'], [1])
+        self.assertEqual(len({s['image_url'] for s in data['slices']}), 1)
+        self.assertEqual(Transaction.objects.filter(study_id=data['study_id']).count(), 3)
+
+    def test_series_cannot_be_predicted_asynchronously(self):
+        response = self.client.post('/api/v1/upload/?async=true', {
+            'image': dicom_upload('series.dcm', 2),
+            'patient_id': self.patient.id,
+        }, format='multipart')
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    @patch('predictions.views.call_ml_service_batch')
+    def test_study_maps_series_frames_back_to_their_file(self, mock_batch):
+        mock_batch.return_value = {'results': [
+            {**slice_result('No Tumor', 0.1), 'source_file': 0, 'frame': None},
+            {**slice_result('No Tumor', 0.2), 'source_file': 1, 'frame': 0},
+            {**slice_result('Glioma', 0.9), 'source_file': 1, 'frame': 1},
+        ]}
+
+        response = self.client.post('/api/v1/upload/batch/', {
+            'images': [png_upload('scout.png', 0), dicom_upload('series.dcm', 2)],
+            'patient_id': self.patient.id,
+        }, format='multipart')
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        urls = [s['image_url'] for s in response.json()['slices']]
+        self.assertTrue(urls[0].endswith('scout.png'))
+        self.assertEqual(urls[1], urls[2])
+        self.assertTrue(urls[1].endswith('series.dcm'))
+
+    def test_unreadable_dicom_is_rejected(self):
+        content = bytearray(dicom_upload('broken.dcm', 1).read())
+        response = self.client.post('/api/v1/upload/', {
+            'image': SimpleUploadedFile('broken.dcm', bytes(content[:140]) + b'\xff' * 16),
+            'patient_id': self.patient.id,
+        }, format='multipart')
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class SummarizeStudyTestCase(TestCase):
+
+    def test_negative_study_uses_most_common_diagnosis(self):
+        summary = summarize_study([slice_result('No Tumor', 0.1), slice_result('No Tumor', 0.2)])
+
+        self.assertFalse(summary['has_tumor'])
+        self.assertEqual(summary['diagnosis'], 'No Tumor')
+        self.assertEqual(summary['max_tumor_probability'], 0.2)
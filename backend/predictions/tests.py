@@ -1,6 +1,8 @@
 """
 Unit tests for the predictions app.
 """
+import io
+import threading
 import unittest
 import uuid
 from django.test import TestCase, override_settings
@@ -10,7 +12,13 @@ from rest_framework.test import APIClient
 from rest_framework import status
 from unittest.mock import patch
 
+import requests
+from asgiref.sync import async_to_sync
+from channels.layers import get_channel_layer
+from PIL import Image
+
 from .models import Transaction
+from .views import _prediction_job_worker, run_prediction_job
 
 User = get_user_model()
 
@@ -82,8 +90,27 @@ class TransactionHistoryTestCase(TestCase):
         response = self.client.get('/api/v1/history/')
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         self.assertIn('results', response.json())
-        self.assertIn('count', response.json())
+        self.assertIn('next', response.json())  # Cursor pagination by default
         self.assertEqual(len(response.json()['results']), 10)  # Default page size
+        
+        # Page numbers with a count are still available
+        response = self.client.get('/api/v1/history/?page=1')
+        self.assertIn('count', response.json())
+        self.assertEqual(len(response.json()['results']), 10)
+    
+    def test_get_history_with_cursor(self):
+        """Test following cursors through history, newest first."""
+        response = self.client.get('/api/v1/history/?page_size=6')
+        seen = [t['id'] for t in response.json()['results']]
+        while response.json()['next']:
+            response = self.client.get(response.json()['next'])
+            seen += [t['id'] for t in response.json()['results']]
+        
+        expected = Transaction.objects.filter(user=self.user).order_by('-uploaded_at', '-id')
+        self.assertEqual(seen, [str(t.id) for t in expected])
+        
+        previous = self.client.get(response.json()['previous']).json()
+        self.assertEqual([t['id'] for t in previous['results']], seen[6:12])
     
     def test_get_history_with_pagination(self):
         """Test pagination parameters."""
@@ -166,3 +193,254 @@ class UploadImageTestCase(TestCase):
         
         self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
         self.assertIn('error', response.json())
+
+
+@override_settings(USE_S3=False, MEDIA_ROOT='/tmp/test_media', ML_SERVICE_DIRECT_UPLOAD=True)
+class DirectUploadTestCase(TestCase):
+    """
+    Test cases for forwarding uploads straight to the ML service.
+    """
+
+    ML_RESULT = {
+        'diagnosis': 'No Tumor',
+        'confidence': 0.91,
+        'model_version': 'v2.0',
+        'processing_time': 0.2,
+    }
+
+    def setUp(self):
+        self.client = APIClient()
+        user = User.objects.create_user(username='directuser', password='testpass')
+        self.client.force_authenticate(user=user)
+
+    @staticmethod
+    def png_bytes():
+        buffer = io.BytesIO()
+        Image.new('RGB', (8, 8)).save(buffer, format='PNG')
+        return buffer.getvalue()
+
+    def post_image(self):
+        image = SimpleUploadedFile("scan.png", self.png_bytes(), content_type="image/png")
+        return self.client.post('/api/v1/upload/', {
+            'image': image,
+            'patient_name': 'Direct Patient',
+            'age': 40,
+            'gender': 'F',
+            'mrn': 'DIRECT001',
+        }, format='multipart')
+
+    @patch('predictions.views.call_ml_service')
+    @patch('predictions.views.call_ml_service_upload')
+    @patch('predictions.views.default_storage.save')
+    def test_forwards_bytes_while_storage_runs_in_parallel(self, mock_storage, mock_upload, mock_url_call):
+        """Storage and ML call overlap, so total latency is close to the slower of the two."""
+        # Each call can only pass the barrier while the other one is in flight;
+        # run one after the other, the first wait breaks after the timeout
+        both_in_flight = threading.Barrier(2, timeout=5)
+
+        def save(name, content):
+            both_in_flight.wait()
+            return 'patient_images/scan.png'
+
+        def predict(file_name, content, content_type):
+            both_in_flight.wait()
+            return self.ML_RESULT
+
+        mock_storage.side_effect = save
+        mock_upload.side_effect = predict
+
+        response = self.post_image()
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertFalse(both_in_flight.broken)
+        mock_url_call.assert_not_called()
+        file_name, content, content_type = mock_upload.call_args.args
+        self.assertEqual(file_name, 'scan.png')
+        self.assertEqual(content, self.png_bytes())
+        self.assertEqual(content_type, 'image/png')
+
+        data = response.json()
+        self.assertTrue(data['image_url'].endswith('/media/patient_images/scan.png'))
+        self.assertIn('storage', data['timings'])
+        self.assertIn('ml_service', data['timings'])
+
+    @patch('predictions.views.call_ml_service_upload')
+    @patch('predictions.views.default_storage.save')
+    def test_ml_failure_still_stores_image(self, mock_storage, mock_upload):
+        mock_storage.return_value = 'patient_images/scan.png'
+        mock_upload.side_effect = requests.ConnectionError("down")
+
+        response = self.post_image()
+
+        self.assertEqual(response.status_code, status.HTTP_503_SERVICE_UNAVAILABLE)
+        mock_storage.assert_called_once()
+        self.assertFalse(Transaction.objects.exists())
+
+    @patch('predictions.views.ml_client.post')
+    def test_upload_call_posts_multipart_to_brain_tumor_endpoint(self, mock_post):
+        from .views import call_ml_service_upload
+
+        mock_post.return_value.json.return_value = self.ML_RESULT
+
+        result = call_ml_service_upload('scan.jpg', b'bytes', 'image/jpeg')
+
+        self.assertEqual(result, self.ML_RESULT)
+        url = mock_post.call_args.args[0]
+        self.assertTrue(url.endswith('/predict/brain-tumor/'))
+        self.assertEqual(mock_post.call_args.kwargs['files'], {'file': ('scan.jpg', b'bytes', 'image/jpeg')})
+
+
+@override_settings(
+    USE_S3=False,
+    MEDIA_ROOT='/tmp/test_media',
+    CHANNEL_LAYERS={'default': {'BACKEND': 'channels.layers.InMemoryChannelLayer'}},
+)
+class PredictionJobTestCase(TestCase):
+    """
+    Test cases for asynchronous prediction jobs.
+    """
+
+    ML_RESULT = DirectUploadTestCase.ML_RESULT
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = User.objects.create_user(username='jobuser', password='testpass')
+        self.client.force_authenticate(user=self.user)
+
+    def pending_transaction(self, user=None):
+        return Transaction.objects.create(
+            user=user or self.user,
+            image_url='http://example.com/scan.png',
+            status=Transaction.STATUS_PENDING,
+        )
+
+    def listen(self, user):
+        layer = get_channel_layer()
+        channel = async_to_sync(layer.new_channel)()
+        async_to_sync(layer.group_add)(f'user_{user.id}', channel)
+        return lambda: async_to_sync(layer.receive)(channel)
+
+    @patch('predictions.views.prediction_job_executor')
+    @patch('predictions.views.call_ml_service')
+    @patch('predictions.views.default_storage.save')
+    def test_async_upload_returns_pending_job(self, mock_storage, mock_ml_service, mock_executor):
+        mock_storage.return_value = 'patient_images/scan.png'
+
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post('/api/v1/upload/?async=true', {
+                'image': SimpleUploadedFile("scan.png", DirectUploadTestCase.png_bytes(), content_type="image/png"),
+                'patient_name': 'Async Patient',
+                'age': 50,
+                'gender': 'M',
+                'mrn': 'ASYNC001',
+            }, format='multipart')
+
+        self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
+        data = response.json()
+        self.assertEqual(data['status'], Transaction.STATUS_PENDING)
+        self.assertEqual(data['status_url'], f"/api/v1/jobs/{data['job_id']}/")
+        mock_ml_service.assert_not_called()
+        worker, transaction_id = mock_executor.submit.call_args.args
+        self.assertIs(worker, _prediction_job_worker)
+        self.assertEqual(str(transaction_id), data['job_id'])
+
+    @patch('predictions.views.call_ml_service')
+    def test_job_completes_transaction_and_notifies_owner(self, mock_ml_service):
+        mock_ml_service.return_value = self.ML_RESULT
+        transaction = self.pending_transaction()
+        receive = self.listen(self.user)
+
+        run_prediction_job(transaction.id)
+
+        transaction.refresh_from_db()
+        self.assertEqual(transaction.status, Transaction.STATUS_COMPLETED)
+        self.assertEqual(transaction.diagnosis, 'No Tumor')
+        self.assertIsNotNone(transaction.completed_at)
+        mock_ml_service.assert_called_once_with('http://example.com/scan.png')
+
+        message = receive()
+        self.assertEqual(message['type'], 'prediction_update')
+        self.assertEqual(message['transaction']['id'], str(transaction.id))
+        self.assertEqual(message['transaction']['status'], Transaction.STATUS_COMPLETED)
+
+    @patch('predictions.views.call_ml_service_upload')
+    def test_job_uses_forwarded_bytes(self, mock_upload):
+        mock_upload.return_value = self.ML_RESULT
+        transaction = self.pending_transaction()
+
+        run_prediction_job(transaction.id, image_bytes=b'bytes', file_name='scan.png', content_type='image/png')
+
+        mock_upload.assert_called_once_with('scan.png', b'bytes', 'image/png')
+
+    @patch('predictions.views.call_ml_service')
+    def test_job_failure_is_recorded_and_pushed(self, mock_ml_service):
+        mock_ml_service.side_effect = requests.ConnectionError("ML service down")
+        transaction = self.pending_transaction()
+        receive = self.listen(self.user)
+
+        run_prediction_job(transaction.id)
+
+        transaction.refresh_from_db()
+        self.assertEqual(transaction.status, Transaction.STATUS_FAILED)
+        self.assertIn('ML service down', transaction.error)
+        self.assertEqual(receive()['transaction']['status'], Transaction.STATUS_FAILED)
+
+    @patch('predictions.views.call_ml_service')
+    def test_job_only_runs_once(self, mock_ml_service):
+        mock_ml_service.return_value = self.ML_RESULT
+        transaction = self.pending_transaction()
+
+        run_prediction_job(transaction.id)
+        run_prediction_job(transaction.id)
+
+        self.assertEqual(mock_ml_service.call_count, 1)
+
+    def test_status_endpoint_is_scoped_to_owner(self):
+        transaction = self.pending_transaction()
+
+        response = self.client.get(f'/api/v1/jobs/{transaction.id}/')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.json()['status'], Transaction.STATUS_PENDING)
+
+        other = User.objects.create_user(username='otheruser', password='testpass')
+        self.client.force_authenticate(user=other)
+        response = self.client.get(f'/api/v1/jobs/{transaction.id}/')
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+
+class ReportsSummaryTestCase(TestCase):
+    """
+    Test cases for the reports summary with unfinished prediction jobs.
+    """
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = User.objects.create_user(username='reportuser', password='testpass')
+        self.client.force_authenticate(user=self.user)
+        self.completed = Transaction.objects.create(
+            user=self.user,
+            image_url='http://example.com/done.png',
+            diagnosis='Glioma',
+            confidence=0.876,
+            model_version='v1.0',
+            processing_time=0.5,
+        )
+        for job_status in (Transaction.STATUS_PENDING, Transaction.STATUS_FAILED):
+            Transaction.objects.create(
+                user=self.user,
+                image_url=f'http://example.com/{job_status}.png',
+                status=job_status,
+            )
+
+    def test_summary_counts_only_completed_predictions(self):
+        response = self.client.get('/api/v1/reports/summary/')
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        data = response.json()
+        self.assertEqual(data['summary']['total_predictions'], 1)
+        self.assertEqual(data['daily_series'][0]['count'], 1)
+        self.assertEqual(data['diagnosis_distribution'], [{'diagnosis': 'Glioma', 'count': 1}])
+        self.assertEqual(
+            [(txn['id'], txn['confidence']) for txn in data['recent_transactions']],
+            [(str(self.completed.id), 0.88)],
+        )
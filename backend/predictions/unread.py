@@ -0,0 +1,123 @@
+"""
+Per-member read state for chat rooms.
+
+Each (room, member) pair has a ChatReadState row holding a read watermark
+(the last message read and its timestamp) and the number of unread messages.
+A message is read by a member when it is not newer than their watermark, so
+read state costs one row per member instead of one per member and message.
+Saving a message increments the counters of the other members (Message.save),
+and marking messages read moves the reader's watermark forward and recounts
+the messages after it, so unread badges never scan the message history.
+rebuild_read_states() recomputes the counters from the watermarks after drift.
+"""
+from django.db import transaction
+from django.db.models import Count, Exists, OuterRef, Subquery, Sum
+from django.db.models.functions import Coalesce
+
+from .models import ChatReadState, ChatRoom, Message
+
+
+def unread_messages(room_id, user, watermark):
+    """Messages of a room that `user` has not read, given their watermark."""
+    messages = Message.objects.filter(room_id=room_id).exclude(sender=user)
+    if watermark is not None:
+        messages = messages.filter(created_at__gt=watermark)
+    return messages
+
+
+def mark_read(user, room_id, message_ids):
+    """
+    Mark messages of a room as read by `user`: the watermark moves up to the
+    newest of them, which also covers every older message. Returns the messages.
+    """
+    with transaction.atomic():
+        # The row lock orders this recount after concurrent marks and new messages
+        state, _ = ChatReadState.objects.select_for_update().get_or_create(room_id=room_id, user=user)
+        messages = list(Message.objects.filter(id__in=message_ids, room_id=room_id).only('id', 'created_at'))
+
+        latest = max(messages, key=lambda m: m.created_at, default=None)
+        if latest is not None and (state.last_read_at is None or latest.created_at > state.last_read_at):
+            state.last_read_message = latest
+            state.last_read_at = latest.created_at
+            state.unread_count = unread_messages(room_id, user, latest.created_at).count()
+            state.save(update_fields=['unread_count', 'last_read_message', 'last_read_at'])
+    return messages
+
+
+def read_watermarks(room_id, user):
+    """
+    Watermarks for deriving `is_read` in a room, in one query: `user`'s own,
+    and the furthest of the other members (whether anyone has read `user`'s messages).
+    """
+    own = others = None
+    for user_id, last_read_at in ChatReadState.objects.filter(
+        room_id=room_id, last_read_at__isnull=False
+    ).values_list('user_id', 'last_read_at'):
+        if user_id == user.id:
+            own = last_read_at
+        elif others is None or last_read_at > others:
+            others = last_read_at
+    return own, others
+
+
+def is_read(message, user, watermarks):
+    """
+    Whether `message` is read from `user`'s point of view: by `user` for
+    messages of others, by any other member for `user`'s own messages.
+    """
+    own, others = watermarks
+    watermark = others if message.sender_id == user.id else own
+    return watermark is not None and message.created_at <= watermark
+
+
+def room_unread_count(user):
+    """Subquery of `user`'s unread count in the outer ChatRoom."""
+    return Coalesce(
+        Subquery(ChatReadState.objects.filter(room=OuterRef('pk'), user=user).values('unread_count')[:1]),
+        0,
+    )
+
+
+def total_unread_count(user):
+    """Unread messages of `user` across the rooms they belong to."""
+    return ChatReadState.objects.filter(user=user, room__members=user).aggregate(
+        total=Coalesce(Sum('unread_count'), 0)
+    )['total']
+
+
+def rebuild_read_states(room_ids=None):
+    """
+    Recompute every member's unread count from their watermark, adding rows
+    for members without one and removing rows of members who left.
+    Limited to `room_ids` when given. Returns the number of rows in scope.
+    """
+    memberships = ChatRoom.members.through.objects.all()
+    states = ChatReadState.objects.all()
+    if room_ids is not None:
+        memberships = memberships.filter(chatroom_id__in=room_ids)
+        states = states.filter(room_id__in=room_ids)
+
+    others_messages = Message.objects.filter(room_id=OuterRef('room_id')).exclude(sender_id=OuterRef('user_id'))
+
+    def count(messages):
+        return Coalesce(Subquery(
+            messages.order_by().values('room_id').annotate(count=Count('pk')).values('count')
+        ), 0)
+
+    with transaction.atomic():
+        states.exclude(Exists(
+            ChatRoom.members.through.objects.filter(chatroom_id=OuterRef('room_id'), user_id=OuterRef('user_id'))
+        )).delete()
+        ChatReadState.objects.bulk_create(
+            [
+                ChatReadState(room_id=room_id, user_id=user_id)
+                for room_id, user_id in memberships.values_list('chatroom_id', 'user_id').iterator()
+            ],
+            batch_size=1000,
+            ignore_conflicts=True,
+        )
+        states.filter(last_read_at__isnull=True).update(unread_count=count(others_messages))
+        states.filter(last_read_at__isnull=False).update(
+            unread_count=count(others_messages.filter(created_at__gt=OuterRef('last_read_at')))
+        )
+    return states.count()
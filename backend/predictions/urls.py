@@ -8,6 +8,8 @@ app_name = 'predictions'
 
 urlpatterns = [
     path('upload/', views.upload_image, name='upload'),
+    path('upload/batch/', views.upload_study, name='upload-batch'),
+    path('jobs/<uuid:pk>/', views.prediction_job_status, name='prediction-job'),
     path('history/', views.TransactionHistoryView.as_view(), name='history'),
     path('history/<uuid:pk>/', views.TransactionDetailView.as_view(), name='history-detail'),
     # patient-centric endpoints
@@ -3,30 +3,43 @@ API views for medical diagnosis predictions.
 """
 import time
 import os
+import uuid
 import logging
 import requests
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
 from django.conf import settings
+from django.core.files.base import ContentFile
 from django.core.files.storage import default_storage
-from django.db import connection
-from django.db.models import Q, Count, Avg
+from django.db import connection, transaction as db_transaction
+from django.db.models import Q, Count, Avg, OuterRef, Prefetch, Subquery
 from django.db.models.functions import TruncDate
+from django.urls import reverse
 from django.utils import timezone
 from django.views.decorators.cache import cache_page
 from django.utils.decorators import method_decorator
 from django.contrib.auth import authenticate
+from django.contrib.auth.models import User
+from django.http import HttpResponse
 from rest_framework import status, generics, permissions
 from rest_framework.decorators import api_view, permission_classes
 from rest_framework.response import Response
-from rest_framework.pagination import PageNumberPagination
 from rest_framework.authtoken.models import Token
 from tenacity import retry, stop_after_attempt, wait_exponential, retry_if_exception_type
 from asgiref.sync import async_to_sync
 from channels.layers import get_channel_layer
+from prometheus_client import CONTENT_TYPE_LATEST, generate_latest
 
+from . import metrics, unread
+from .dicom import DICOM_CONTENT_TYPE, frame_count, is_dicom
+from .ml_client import ml_client
+from .pagination import DefaultPagination, KeysetPagination
+from .search import search_diagnoses, search_messages, search_patients
 from .models import Transaction, UserProfile, Patient, Appointment, ChatRoom, Message, TreatmentPlan, Medication, FollowUpNote
 from .serializers import (
     TransactionSerializer,
     UploadImageSerializer,
+    BatchUploadSerializer,
     LoginSerializer,
     UserProfileSerializer,
     ChatRoomSerializer,
@@ -41,14 +54,17 @@ from .serializers import (
 
 logger = logging.getLogger(__name__)
 
+# Storage writes run here in direct upload mode so they overlap the ML call
+storage_executor = ThreadPoolExecutor(
+    max_workers=settings.UPLOAD_STORAGE_WORKERS,
+    thread_name_prefix='upload-storage',
+)
 
-class DefaultPagination(PageNumberPagination):
-    """
-    Custom pagination class with configurable page size.
-    """
-    page_size = 10
-    page_size_query_param = 'page_size'
-    max_page_size = 100
+# Background workers for asynchronous prediction jobs (POST /upload/?async=true)
+prediction_job_executor = ThreadPoolExecutor(
+    max_workers=settings.PREDICTION_JOB_WORKERS,
+    thread_name_prefix='prediction-job',
+)
 
 
 @retry(
@@ -72,7 +88,7 @@ def call_ml_service(image_url: str) -> dict:
     ml_service_url = f"{settings.ML_SERVICE_URL}/predict/"
     
     try:
-        response = requests.post(
+        response = ml_client.post(
             ml_service_url,
             json={"image_url": image_url},
             timeout=settings.ML_SERVICE_TIMEOUT
@@ -84,7 +100,358 @@ def call_ml_service(image_url: str) -> dict:
         raise
 
 
+@retry(
+    stop=stop_after_attempt(settings.ML_SERVICE_MAX_RETRIES),
+    wait=wait_exponential(multiplier=1, min=2, max=10),
+    retry=retry_if_exception_type((requests.ConnectionError, requests.Timeout))
+)
+def call_ml_service_upload(file_name: str, content: bytes, content_type: str) -> dict:
+    """
+    Send image bytes straight to the ML service as a multipart upload.
+    
+    Avoids the ML service downloading the image back from storage.
+    
+    Args:
+        file_name: Original file name of the upload
+        content: Raw image bytes
+        content_type: MIME type of the upload
+        
+    Returns:
+        dict: Prediction response from ML service
+        
+    Raises:
+        requests.RequestException: If all retry attempts fail
+    """
+    ml_service_url = f"{settings.ML_SERVICE_URL}/predict/brain-tumor/"
+    
+    try:
+        response = ml_client.post(
+            ml_service_url,
+            files={"file": (file_name, content, content_type)},
+            timeout=settings.ML_SERVICE_TIMEOUT
+        )
+        response.raise_for_status()
+        return response.json()
+    except requests.RequestException as e:
+        logger.error(f"ML service error: {str(e)}")
+        raise
+
+
+@retry(
+    stop=stop_after_attempt(settings.ML_SERVICE_MAX_RETRIES),
+    wait=wait_exponential(multiplier=1, min=2, max=10),
+    retry=retry_if_exception_type((requests.ConnectionError, requests.Timeout))
+)
+def call_ml_service_batch(files: list) -> dict:
+    """
+    Send several images to the ML service in one multipart request.
+    
+    Args:
+        files: (file_name, content, content_type) tuples, in slice order
+        
+    Returns:
+        dict: Batch prediction response with one result per image
+        
+    Raises:
+        requests.RequestException: If all retry attempts fail
+    """
+    ml_service_url = f"{settings.ML_SERVICE_URL}/predict/brain-tumor/batch/"
+    
+    try:
+        response = ml_client.post(
+            ml_service_url,
+            files=[("files", file) for file in files],
+            timeout=settings.ML_SERVICE_TIMEOUT
+        )
+        response.raise_for_status()
+        return response.json()
+    except requests.RequestException as e:
+        logger.error(f"ML service error: {str(e)}")
+        raise
+
+
+def save_upload(file_name: str, content) -> tuple:
+    """Save an upload to default storage, returning (saved_path, seconds taken)."""
+    started = time.time()
+    saved_path = default_storage.save(file_name, content)
+    elapsed = time.time() - started
+    metrics.observe_stage('storage_save', elapsed)
+    return saved_path, round(elapsed, 3)
+
+
+def submit_storage_write(file_name: str, content):
+    """Save an upload on the storage pool, returning the future of `save_upload`."""
+    metrics.STORAGE_WRITES_PENDING.inc()
+    future = storage_executor.submit(save_upload, file_name, content)
+    future.add_done_callback(lambda _: metrics.STORAGE_WRITES_PENDING.dec())
+    return future
+
+
+def build_image_url(saved_path: str) -> str:
+    """Build the URL under which a saved upload is reachable."""
+    if settings.USE_S3:
+        return f"{settings.MEDIA_URL}{saved_path}"
+    # For local storage, use a publicly accessible URL
+    # ML service needs to access this via HTTP
+    return f"http://medml_backend:8000{settings.MEDIA_URL}{saved_path}"
+
+
+@metrics.timed('patient_resolution')
+def resolve_patient(validated_data: dict):
+    """
+    Find or create the patient an upload belongs to.
+    
+    Raises:
+        Patient.DoesNotExist: If patient_id does not match a patient
+    """
+    patient_id = validated_data.get('patient_id')
+    # Legacy fields used only to create/find Patient when patient_id is not provided
+    patient_name = validated_data.get('patient_name')
+    age = validated_data.get('age')
+    gender = validated_data.get('gender')
+    mrn = validated_data.get('mrn')
+    phone = validated_data.get('phone', '')
+    
+    if patient_id:
+        return Patient.objects.get(id=patient_id)
+    
+    # Create or get patient by MRN if provided; fallback by name+phone
+    if mrn:
+        patient_obj, _ = Patient.objects.get_or_create(
+            mrn=mrn,
+            defaults={
+                'full_name': patient_name,
+                'age': age,
+                'gender': gender,
+                'phone': phone or '',
+            }
+        )
+        # If exists but missing data, update minimally
+        updated = False
+        if patient_name and not patient_obj.full_name:
+            patient_obj.full_name = patient_name; updated = True
+        if age is not None and patient_obj.age != age:
+            patient_obj.age = age; updated = True
+        if gender and patient_obj.gender != gender:
+            patient_obj.gender = gender; updated = True
+        if phone and not patient_obj.phone:
+            patient_obj.phone = phone; updated = True
+        if updated:
+            patient_obj.save()
+        return patient_obj
+    
+    # No MRN, try name+phone grouping
+    patient_obj, _ = Patient.objects.get_or_create(
+        full_name=patient_name,
+        phone=phone or '',
+        defaults={
+            'mrn': '',
+            'age': age,
+            'gender': gender,
+        }
+    )
+    return patient_obj
+
+
+def summarize_study(predictions: list) -> dict:
+    """
+    Study-level aggregate of per-slice ML predictions.
+    
+    A study is positive when any slice is. Its diagnosis comes from the slice
+    with the highest tumor probability, otherwise the most common diagnosis.
+    """
+    tumor_slices = [index for index, p in enumerate(predictions) if p.get('has_tumor')]
+    if tumor_slices:
+        top = max(tumor_slices, key=lambda index: predictions[index].get('tumor_probability') or 0)
+        diagnosis = predictions[top].get('diagnosis')
+    else:
+        diagnosis = Counter(p.get('diagnosis') for p in predictions).most_common(1)[0][0]
+    
+    probabilities = [p['tumor_probability'] for p in predictions if p.get('tumor_probability') is not None]
+    confidences = [p['confidence'] for p in predictions if p.get('confidence') is not None]
+    return {
+        'slices': len(predictions),
+        'has_tumor': bool(tumor_slices),
+        'diagnosis': diagnosis,
+        'tumor_slices': tumor_slices,
+        'max_tumor_probability': max(probabilities) if probabilities else None,
+        'mean_confidence': round(min(1.0, sum(confidences) / len(confidences)), 4) if confidences else None,
+    }
+
+
+def map_prediction_result(prediction_result: dict) -> dict:
+    """Map an ML service response onto Transaction fields."""
+    ml_confidence_raw = prediction_result.get('confidence')
+    try:
+        ml_confidence = min(1.0, float(ml_confidence_raw)) if ml_confidence_raw is not None else None
+    except (TypeError, ValueError):
+        ml_confidence = None
+    return {
+        'diagnosis': prediction_result.get('diagnosis') or prediction_result.get('breed'),
+        'confidence': ml_confidence,
+        'model_version': prediction_result.get('model_version'),
+        'processing_time': prediction_result.get('processing_time'),
+    }
+
+
+def notify_prediction(transaction):
+    """Push a finished asynchronous prediction to the owner's notification channel."""
+    if transaction.user_id is None:
+        return
+    try:
+        channel_layer = get_channel_layer()
+        async_to_sync(channel_layer.group_send)(
+            f"user_{transaction.user_id}",
+            {
+                'type': 'prediction_update',
+                'transaction': TransactionSerializer(transaction).data,
+            }
+        )
+    except Exception as e:
+        # Non-fatal; clients without a socket poll the job status endpoint
+        logger.warning(f"Prediction notification failed for {transaction.id}: {str(e)}")
+
+
+def run_prediction_job(transaction_id, image_bytes=None, file_name=None, content_type=None):
+    """
+    Run the ML prediction for a pending transaction and record the outcome.
+    
+    Uses the forwarded image bytes when given, otherwise the stored image URL.
+    Only pending transactions are claimed, so a job never runs twice.
+    """
+    claimed = Transaction.objects.filter(
+        id=transaction_id, status=Transaction.STATUS_PENDING
+    ).update(status=Transaction.STATUS_PROCESSING)
+    if not claimed:
+        logger.info(f"Prediction job {transaction_id} is not pending, skipping")
+        return
+    
+    transaction = Transaction.objects.select_related('patient').get(id=transaction_id)
+    try:
+        with metrics.stage_timer('ml_call'):
+            if image_bytes is not None:
+                prediction_result = call_ml_service_upload(file_name, image_bytes, content_type)
+            else:
+                prediction_result = call_ml_service(transaction.image_url)
+        fields = map_prediction_result(prediction_result)
+        if not fields['diagnosis']:
+            raise ValueError("ML service returned no diagnosis")
+        for field, value in fields.items():
+            setattr(transaction, field, value)
+        transaction.status = Transaction.STATUS_COMPLETED
+        transaction.error = ''
+    except Exception as e:
+        logger.error(f"Prediction job {transaction_id} failed: {str(e)}")
+        transaction.status = Transaction.STATUS_FAILED
+        transaction.error = str(e)
+    
+    transaction.completed_at = timezone.now()
+    with metrics.stage_timer('db_insert'):
+        transaction.save()
+    notify_prediction(transaction)
+
+
+def _prediction_job_worker(transaction_id, **job):
+    try:
+        run_prediction_job(transaction_id, **job)
+    except Exception as e:
+        logger.error(f"Prediction job {transaction_id} crashed: {str(e)}", exc_info=True)
+    finally:
+        metrics.PREDICTION_JOBS_PENDING.dec()
+        # Worker threads hold their own DB connection; release it between jobs
+        connection.close()
+
+
+def _enqueue_prediction_job(transaction_id, **job):
+    metrics.PREDICTION_JOBS_PENDING.inc()
+    prediction_job_executor.submit(_prediction_job_worker, transaction_id, **job)
+
+
+def submit_prediction_job(transaction_id, **job):
+    """Queue a prediction job once the pending transaction is committed."""
+    db_transaction.on_commit(lambda: _enqueue_prediction_job(transaction_id, **job))
+
+
+def record_study(request, patient_obj, study_id, image_urls, predictions, timings, start_time):
+    """
+    Save one transaction per predicted slice and build the study response.
+    
+    Predictions for the frames of a multi-frame DICOM file carry the file's
+    position in `source_file`; they share its image URL and get consecutive
+    slice indexes.
+    """
+    completed_at = timezone.now()
+    with metrics.stage_timer('db_insert'):
+        transactions = Transaction.objects.bulk_create([
+            Transaction(
+                user=request.user if request.user.is_authenticated else None,
+                patient=patient_obj,
+                image_url=image_urls[index if prediction.get('source_file') is None else prediction['source_file']],
+                study_id=study_id,
+                slice_index=index,
+                completed_at=completed_at,
+                **map_prediction_result(prediction),
+            )
+            for index, prediction in enumerate(predictions)
+        ])
+    
+    total_time = round(time.time() - start_time, 2)
+    logger.info(
+        f"Study {study_id} with {len(transactions)} slices completed in {total_time}s "
+        f"(storage={timings['storage']}s, ml_service={timings['ml_service']}s)"
+    )
+    
+    slice_results = [
+        {**data, 'has_tumor': prediction.get('has_tumor'), 'tumor_probability': prediction.get('tumor_probability')}
+        for data, prediction in zip(TransactionSerializer(transactions, many=True).data, predictions)
+    ]
+    return Response({
+        'study_id': str(study_id),
+        'patient': patient_obj.id,
+        'slices': slice_results,
+        'summary': summarize_study(predictions),
+        'total_processing_time': total_time,
+        'timings': timings,
+    }, status=status.HTTP_201_CREATED)
+
+
+def upload_series(request, image_file, patient_obj, start_time):
+    """
+    Predict every frame of a multi-frame DICOM upload as one study.
+    
+    The file is stored once and sent to the ML service batch endpoint in a
+    single request, which expands it into one prediction per frame.
+    """
+    timings = {}
+    study_id = uuid.uuid4()
+    image_file.seek(0)
+    content = image_file.read()
+    storage_future = submit_storage_write(f"patient_images/{study_id}/0000_{image_file.name}", ContentFile(content))
+    
+    ml_error = None
+    ml_started = time.time()
+    try:
+        prediction_result = call_ml_service_batch([(image_file.name, content, DICOM_CONTENT_TYPE)])
+    except requests.RequestException as e:
+        ml_error = e
+    timings['ml_service'] = round(time.time() - ml_started, 3)
+    metrics.observe_stage('ml_call', time.time() - ml_started)
+    
+    saved_path, timings['storage'] = storage_future.result()
+    if ml_error is not None:
+        return Response(
+            {"error": "ML service unavailable", "details": str(ml_error)},
+            status=status.HTTP_503_SERVICE_UNAVAILABLE
+        )
+    
+    predictions = prediction_result.get('results') or []
+    if not predictions:
+        raise ValueError("ML service returned no results for the series")
+    return record_study(request, patient_obj, study_id, [build_image_url(saved_path)], predictions, timings, start_time)
+
+
 @api_view(['POST'])
+@metrics.track_in_flight('upload_image')
 def upload_image(request):
     """
     Upload image endpoint.
@@ -93,8 +460,21 @@ def upload_image(request):
     
     Accepts an image file, uploads it to S3, calls ML service for prediction,
     and saves the result to the database.
+    
+    With ML_SERVICE_DIRECT_UPLOAD the image bytes are forwarded to the ML
+    service directly while the storage write runs in parallel.
+    
+    With ?async=true the image is stored, a pending transaction is returned
+    with 202 and the prediction runs in a background job. The result is pushed
+    to the user's notification channel and can be polled at /jobs/<id>/.
+    
+    A multi-frame DICOM series is predicted in one batch request and answered
+    like a study upload, with one transaction per frame.
     """
     start_time = time.time()
+    direct_upload = settings.ML_SERVICE_DIRECT_UPLOAD
+    async_mode = request.query_params.get('async', '').lower() in ('1', 'true', 'yes')
+    timings = {}
     
     # Validate input
     serializer = UploadImageSerializer(data=request.data)
@@ -105,108 +485,111 @@ def upload_image(request):
         )
     
     image_file = serializer.validated_data['image']
-    patient_id = serializer.validated_data.get('patient_id')
-    # Legacy fields used only to create/find Patient when patient_id is not provided
-    patient_name = serializer.validated_data.get('patient_name')
-    age = serializer.validated_data.get('age')
-    gender = serializer.validated_data.get('gender')
-    mrn = serializer.validated_data.get('mrn')
-    phone = serializer.validated_data.get('phone', '')
+    content_type = image_file.content_type or 'application/octet-stream'
+    series = is_dicom(image_file) and frame_count(image_file) > 1
+    if series and async_mode:
+        return Response(
+            {"error": "Multi-frame DICOM series cannot be predicted asynchronously"},
+            status=status.HTTP_400_BAD_REQUEST
+        )
     
     try:
+        if series:
+            try:
+                patient_obj = resolve_patient(serializer.validated_data)
+            except Patient.DoesNotExist:
+                return Response({"error": "Patient not found"}, status=status.HTTP_400_BAD_REQUEST)
+            return upload_series(request, image_file, patient_obj, start_time)
+        
         # Upload to S3 or local storage
         file_name = f"patient_images/{int(time.time())}_{image_file.name}"
-        saved_path = default_storage.save(file_name, image_file)
-        
-        # Generate full URL
-        if settings.USE_S3:
-            image_url = f"{settings.MEDIA_URL}{saved_path}"
+        storage_future = None
+        if direct_upload:
+            image_file.seek(0)
+            image_bytes = image_file.read()
+            storage_future = submit_storage_write(file_name, ContentFile(image_bytes))
         else:
-            # For local storage, use a publicly accessible URL
-            # ML service needs to access this via HTTP
-            image_url = f"http://medml_backend:8000{settings.MEDIA_URL}{saved_path}"
-        
-        logger.info(f"Image uploaded to: {image_url}")
+            saved_path, timings['storage'] = save_upload(file_name, image_file)
+            image_url = build_image_url(saved_path)
+            logger.info(f"Image uploaded to: {image_url}")
         
         # Resolve patient record
-        patient_obj = None
-        if patient_id:
-            try:
-                patient_obj = Patient.objects.get(id=patient_id)
-            except Patient.DoesNotExist:
-                return Response({"error": "Patient not found"}, status=status.HTTP_400_BAD_REQUEST)
-        else:
-            # Create or get patient by MRN if provided; fallback by name+phone
-            if mrn:
-                patient_obj, _ = Patient.objects.get_or_create(
-                    mrn=mrn,
-                    defaults={
-                        'full_name': patient_name,
-                        'age': age,
-                        'gender': gender,
-                        'phone': phone or '',
-                    }
-                )
-                # If exists but missing data, update minimally
-                updated = False
-                if patient_name and not patient_obj.full_name:
-                    patient_obj.full_name = patient_name; updated = True
-                if age is not None and patient_obj.age != age:
-                    patient_obj.age = age; updated = True
-                if gender and patient_obj.gender != gender:
-                    patient_obj.gender = gender; updated = True
-                if phone and not patient_obj.phone:
-                    patient_obj.phone = phone; updated = True
-                if updated:
-                    patient_obj.save()
-            else:
-                # No MRN, try name+phone grouping
-                patient_obj, _ = Patient.objects.get_or_create(
-                    full_name=patient_name,
-                    phone=phone or '',
-                    defaults={
-                        'mrn': '',
-                        'age': age,
-                        'gender': gender,
-                    }
+        try:
+            patient_obj = resolve_patient(serializer.validated_data)
+        except Patient.DoesNotExist:
+            return Response({"error": "Patient not found"}, status=status.HTTP_400_BAD_REQUEST)
+
+        if async_mode:
+            if storage_future is not None:
+                saved_path, timings['storage'] = storage_future.result()
+                image_url = build_image_url(saved_path)
+                logger.info(f"Image uploaded to: {image_url}")
+            
+            with metrics.stage_timer('db_insert'):
+                transaction = Transaction.objects.create(
+                    user=request.user if request.user.is_authenticated else None,
+                    patient=patient_obj,
+                    image_url=image_url,
+                    status=Transaction.STATUS_PENDING,
                 )
+            job = {}
+            if direct_upload:
+                job = {'image_bytes': image_bytes, 'file_name': image_file.name, 'content_type': content_type}
+            submit_prediction_job(transaction.id, **job)
+            logger.info(f"Transaction {transaction.id} queued for prediction")
+            
+            response_data = TransactionSerializer(transaction).data
+            response_data['job_id'] = str(transaction.id)
+            response_data['status_url'] = reverse('predictions:prediction-job', args=[transaction.id])
+            response_data['timings'] = timings
+            return Response(response_data, status=status.HTTP_202_ACCEPTED)
 
         # Call ML service for prediction
+        ml_error = None
+        ml_started = time.time()
         try:
-            prediction_result = call_ml_service(image_url)
+            if direct_upload:
+                prediction_result = call_ml_service_upload(image_file.name, image_bytes, content_type)
+            else:
+                prediction_result = call_ml_service(image_url)
         except requests.RequestException as e:
+            ml_error = e
+        timings['ml_service'] = round(time.time() - ml_started, 3)
+        metrics.observe_stage('ml_call', time.time() - ml_started)
+        
+        if storage_future is not None:
+            # The file is kept even when prediction fails, same as in URL mode
+            saved_path, timings['storage'] = storage_future.result()
+            image_url = build_image_url(saved_path)
+            logger.info(f"Image uploaded to: {image_url}")
+        
+        if ml_error is not None:
             return Response(
-                {"error": "ML service unavailable", "details": str(e)},
+                {"error": "ML service unavailable", "details": str(ml_error)},
                 status=status.HTTP_503_SERVICE_UNAVAILABLE
             )
         
-        # Map ML response to our schema
-        ml_diagnosis = prediction_result.get('diagnosis') or prediction_result.get('breed')
-        ml_confidence_raw = prediction_result.get('confidence')
-        try:
-            ml_confidence = min(1.0, float(ml_confidence_raw)) if ml_confidence_raw is not None else None
-        except (TypeError, ValueError):
-            ml_confidence = None
-        ml_model_version = prediction_result.get('model_version')
-        ml_processing_time = prediction_result.get('processing_time')
-
         # Save transaction to database
-        transaction = Transaction.objects.create(
-            user=request.user if request.user.is_authenticated else None,
-            patient=patient_obj,
-            image_url=image_url,
-            diagnosis=ml_diagnosis,
-            confidence=ml_confidence,
-            model_version=ml_model_version,
-            processing_time=ml_processing_time,
-        )
+        with metrics.stage_timer('db_insert'):
+            transaction = Transaction.objects.create(
+                user=request.user if request.user.is_authenticated else None,
+                patient=patient_obj,
+                image_url=image_url,
+                completed_at=timezone.now(),
+                **map_prediction_result(prediction_result),
+            )
         
         total_time = round(time.time() - start_time, 2)
-        logger.info(f"Transaction {transaction.id} completed in {total_time}s")
+        logger.info(
+            f"Transaction {transaction.id} completed in {total_time}s "
+            f"(direct_upload={direct_upload}, storage={timings['storage']}s, "
+            f"ml_service={timings['ml_service']}s)"
+        )
         
         # Return response
         response_data = TransactionSerializer(transaction).data
         response_data['total_processing_time'] = total_time
+        response_data['timings'] = timings
         
         return Response(response_data, status=status.HTTP_201_CREATED)
         
@@ -218,6 +601,104 @@ def upload_image(request):
         )
 
 
+@api_view(['POST'])
+@metrics.track_in_flight('upload_study')
+def upload_study(request):
+    """
+    Batch upload endpoint for multi-slice studies.
+    
+    POST /api/v1/upload/batch/
+    
+    Accepts several images (`images`) for one patient. Slices are stored in
+    parallel, predicted by the ML service in a single batch request and saved
+    with one bulk insert. Returns the per-slice transactions and a study-level
+    summary.
+    """
+    start_time = time.time()
+    timings = {}
+    
+    serializer = BatchUploadSerializer(data=request.data)
+    if not serializer.is_valid():
+        return Response(
+            {"error": "Invalid image data", "details": serializer.errors},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    
+    try:
+        try:
+            patient_obj = resolve_patient(serializer.validated_data)
+        except Patient.DoesNotExist:
+            return Response({"error": "Patient not found"}, status=status.HTTP_400_BAD_REQUEST)
+        
+        study_id = uuid.uuid4()
+        slices = []
+        for image_file in serializer.validated_data['images']:
+            # A multi-frame DICOM file is expanded into one slice per frame by the ML service
+            frames = frame_count(image_file) if is_dicom(image_file) else 1
+            image_file.seek(0)
+            slices.append((image_file.name, image_file.read(), image_file.content_type or 'application/octet-stream', frames))
+        
+        # Store all slices in parallel while the ML service predicts the batch
+        storage_started = time.time()
+        storage_futures = [
+            submit_storage_write(f"patient_images/{study_id}/{index:04d}_{name}", ContentFile(content))
+            for index, (name, content, _, _) in enumerate(slices)
+        ]
+        
+        ml_error = None
+        ml_started = time.time()
+        try:
+            prediction_result = call_ml_service_batch([upload[:3] for upload in slices])
+        except requests.RequestException as e:
+            ml_error = e
+        timings['ml_service'] = round(time.time() - ml_started, 3)
+        metrics.observe_stage('ml_call', time.time() - ml_started)
+        
+        saved_paths = [future.result()[0] for future in storage_futures]
+        timings['storage'] = round(time.time() - storage_started, 3)
+        
+        if ml_error is not None:
+            return Response(
+                {"error": "ML service unavailable", "details": str(ml_error)},
+                status=status.HTTP_503_SERVICE_UNAVAILABLE
+            )
+        
+        predictions = prediction_result.get('results') or []
+        expected = sum(frames for _, _, _, frames in slices)
+        if len(predictions) != expected:
+            raise ValueError(f"ML service returned {len(predictions)} results for {expected} images")
+        
+        image_urls = [build_image_url(saved_path) for saved_path in saved_paths]
+        return record_study(request, patient_obj, study_id, image_urls, predictions, timings, start_time)
+        
+    except Exception as e:
+        logger.error(f"Study upload error: {str(e)}", exc_info=True)
+        return Response(
+            {"error": "Internal server error", "details": str(e)},
+            status=status.HTTP_500_INTERNAL_SERVER_ERROR
+        )
+
+
+@api_view(['GET'])
+def prediction_job_status(request, pk):
+    """
+    Poll an asynchronous prediction job.
+    
+    GET /api/v1/jobs/<id>/
+    
+    Returns the transaction with its status (pending, processing, completed
+    or failed) and error message, if any.
+    """
+    try:
+        transaction = Transaction.objects.select_related('patient').get(id=pk, user=request.user)
+    except Transaction.DoesNotExist:
+        return Response({"error": "Job not found"}, status=status.HTTP_404_NOT_FOUND)
+    
+    response_data = TransactionSerializer(transaction).data
+    response_data['job_id'] = str(transaction.id)
+    return Response(response_data)
+
+
 class TransactionHistoryView(generics.ListAPIView):
     """
     Get paginated transaction history filtered by current user.
@@ -225,11 +706,13 @@ class TransactionHistoryView(generics.ListAPIView):
     GET /api/v1/history/
     
     Query parameters:
-    - page: Page number (default: 1)
+    - cursor: Cursor from the previous response's next/previous link
+    - page: Page number; switches to page-number pagination with a count
     - page_size: Number of items per page (default: 10, max: 100)
     """
     serializer_class = TransactionSerializer
-    pagination_class = DefaultPagination
+    pagination_class = KeysetPagination
+    keyset_ordering = ('-uploaded_at', '-id')
     
     def get_queryset(self):
         # Filter transactions by current user
@@ -244,11 +727,24 @@ class TransactionDetailView(generics.RetrieveAPIView):
     serializer_class = TransactionSerializer
 
 
+def prometheus_metrics(request):
+    """
+    Prometheus scrape endpoint.
+    
+    GET /metrics
+    
+    Upload stage latencies (storage save, patient resolution, ML call, DB
+    insert), uploads in flight and the prediction job and storage queues.
+    Served outside /api/v1/ and without authentication, for the scraper.
+    """
+    return HttpResponse(generate_latest(), content_type=CONTENT_TYPE_LATEST)
+
+
 @api_view(['GET'])
 @permission_classes([permissions.AllowAny])
 def health_check(request):
     """Health check endpoint."""
-    return Response({'status': 'ok'})
+    return Response({'status': 'ok', 'ml_service_client': ml_client.stats()})
 
 
 class PatientListCreateView(generics.ListCreateAPIView):
@@ -256,9 +752,10 @@ class PatientListCreateView(generics.ListCreateAPIView):
     List patients with search, or create a new patient.
     GET /api/v1/patients/?search=...
     POST /api/v1/patients/
+    Cursor-paginated, newest first; pass `page` for page numbers.
     """
     serializer_class = PatientSerializer
-    pagination_class = DefaultPagination
+    pagination_class = KeysetPagination
 
     def get_queryset(self):
         # Filter patients by current user
@@ -290,9 +787,11 @@ class PatientTransactionsView(generics.ListAPIView):
     """
     List transactions for a specific patient.
     GET /api/v1/patients/<int:patient_id>/transactions/
+    Cursor-paginated, newest first; pass `page` for page numbers.
     """
     serializer_class = TransactionSerializer
-    pagination_class = DefaultPagination
+    pagination_class = KeysetPagination
+    keyset_ordering = ('-uploaded_at', '-id')
 
     def get_queryset(self):
         patient_id = self.kwargs.get('patient_id')
@@ -350,7 +849,6 @@ def seed_accounts(request):
         "reset": true
     }
     """
-    from django.contrib.auth.models import User
     
     reset = request.data.get('reset', False)
     
@@ -488,9 +986,11 @@ def metrics_summary(request):
     """Return quick summary numbers for dashboard."""
     today = timezone.localdate()
     total_patients = Patient.objects.count()
-    total_predictions = Transaction.objects.count()
-    today_predictions = Transaction.objects.filter(uploaded_at__date=today).count()
-    avg_conf = Transaction.objects.aggregate(avg=Avg('confidence'))['avg'] or 0
+    # Pending and failed jobs have no diagnosis or confidence yet
+    predictions = Transaction.objects.filter(status=Transaction.STATUS_COMPLETED)
+    total_predictions = predictions.count()
+    today_predictions = predictions.filter(uploaded_at__date=today).count()
+    avg_conf = predictions.aggregate(avg=Avg('confidence'))['avg'] or 0
     return Response({
         'total_patients': total_patients,
         'total_predictions': total_predictions,
@@ -513,7 +1013,7 @@ def metrics_daily(request):
     start = timezone.now() - timezone.timedelta(days=days - 1)
     qs = (
         Transaction.objects
-        .filter(uploaded_at__date__gte=start.date())
+        .filter(status=Transaction.STATUS_COMPLETED, uploaded_at__date__gte=start.date())
         .annotate(day=TruncDate('uploaded_at'))
         .values('day')
         .annotate(count=Count('id'))
@@ -530,6 +1030,7 @@ def metrics_diagnosis_distribution(request):
     """Return diagnosis distribution for doughnut chart."""
     qs = (
         Transaction.objects
+        .filter(status=Transaction.STATUS_COMPLETED)
         .exclude(diagnosis__isnull=True)
         .exclude(diagnosis='')
         .values('diagnosis')
@@ -574,9 +1075,10 @@ def reports_summary(request):
     if start_date > end_date:
         return Response({'error': 'start date must be before end date'}, status=status.HTTP_400_BAD_REQUEST)
     
-    # Filter transactions by date range AND current user
+    # Filter completed predictions by date range AND current user
     transactions_qs = Transaction.objects.filter(
         user=request.user,
+        status=Transaction.STATUS_COMPLETED,
         uploaded_at__date__gte=start_date,
         uploaded_at__date__lte=end_date
     )
@@ -622,7 +1124,7 @@ def reports_summary(request):
             'patient_name': txn.patient.full_name if txn.patient else 'N/A',
             'patient_mrn': txn.patient.mrn if txn.patient else 'N/A',
             'diagnosis': txn.diagnosis,
-            'confidence': round(txn.confidence, 2),
+            'confidence': round(txn.confidence, 2) if txn.confidence is not None else None,
             'model_version': txn.model_version,
         })
     
@@ -655,6 +1157,31 @@ def list_users(request):
     return Response({'users': serializer.data})
 
 
+def chat_rooms_for(user):
+    """
+    Rooms of `user` with their last message and unread count annotated.
+    Both come from correlated subqueries (the count from the member's read
+    state) and members are prefetched with their profiles, so listing rooms
+    takes the same number of queries for any page size. The last message is
+    picked once by id, with the id breaking timestamp ties, so its content,
+    sender and time always belong to the same message.
+    """
+    latest = Message.objects.filter(room=OuterRef('pk')).order_by('-created_at', '-id')
+    last_message = Message.objects.filter(pk=OuterRef('last_message_id')).order_by()
+    return (
+        ChatRoom.objects
+        .filter(members=user)
+        .annotate(last_message_id=Subquery(latest.values('id')[:1]))
+        .annotate(
+            last_message_content=Subquery(last_message.values('content')),
+            last_message_sender=Subquery(last_message.values('sender__username')),
+            last_message_at=Subquery(last_message.values('created_at')),
+            unread_count=unread.room_unread_count(user),
+        )
+        .prefetch_related(Prefetch('members', queryset=User.objects.select_related('profile')))
+    )
+
+
 class ChatRoomListCreateView(generics.ListCreateAPIView):
     """List chat rooms or create a new one."""
     serializer_class = ChatRoomSerializer
@@ -663,7 +1190,7 @@ class ChatRoomListCreateView(generics.ListCreateAPIView):
     
     def get_queryset(self):
         """Return rooms where user is a member."""
-        return ChatRoom.objects.filter(members=self.request.user).prefetch_related('members', 'messages')
+        return chat_rooms_for(self.request.user)
     
     def create(self, request, *args, **kwargs):
         """Create room or return existing chat with same members."""
@@ -726,14 +1253,18 @@ class ChatRoomDetailView(generics.RetrieveAPIView):
     
     def get_queryset(self):
         """Only allow access to rooms where user is a member."""
-        return ChatRoom.objects.filter(members=self.request.user).prefetch_related('members', 'messages')
+        return chat_rooms_for(self.request.user)
 
 
 class MessageListCreateView(generics.ListCreateAPIView):
-    """List messages in a room or create a new message."""
+    """
+    List messages in a room or create a new message.
+    Cursor-paginated newest first, so `next` loads older messages; with
+    `page`, messages are numbered in pages oldest first as before.
+    """
     serializer_class = MessageSerializer
     permission_classes = [permissions.IsAuthenticated]
-    pagination_class = DefaultPagination
+    pagination_class = KeysetPagination
     
     def get_queryset(self):
         """Return messages for a specific room."""
@@ -741,7 +1272,14 @@ class MessageListCreateView(generics.ListCreateAPIView):
         # Verify user is member of this room
         if not ChatRoom.objects.filter(id=room_id, members=self.request.user).exists():
             return Message.objects.none()
-        return Message.objects.filter(room_id=room_id).select_related('sender', 'sender__profile')
+        return Message.objects.filter(room_id=room_id).select_related('sender', 'sender__profile').defer('search_vector')
+    
+    def get_serializer_context(self):
+        """Read watermarks of the room, so is_read needs no query per message."""
+        context = super().get_serializer_context()
+        if self.request.user.is_authenticated:
+            context['read_watermarks'] = unread.read_watermarks(self.kwargs.get('room_id'), self.request.user)
+        return context
     
     def perform_create(self, serializer):
         """Create message with current user as sender."""
@@ -764,9 +1302,7 @@ def mark_messages_read(request, room_id):
     if not ChatRoom.objects.filter(id=room_id, members=request.user).exists():
         return Response({'error': 'Not a member of this room'}, status=status.HTTP_403_FORBIDDEN)
     
-    messages = Message.objects.filter(id__in=message_ids, room_id=room_id)
-    for msg in messages:
-        msg.read_by.add(request.user)
+    messages = unread.mark_read(request.user, room_id, message_ids)
     
     # Broadcast read receipts to the room via Channels so other clients update badges
     try:
@@ -783,22 +1319,14 @@ def mark_messages_read(request, room_id):
         # Non-fatal if channel layer is unavailable
         pass
     
-    return Response({'status': 'success', 'marked_count': messages.count()})
+    return Response({'status': 'success', 'marked_count': len(messages)})
 
 
 @api_view(['GET'])
 @permission_classes([permissions.IsAuthenticated])
 def get_unread_count(request):
     """Get total unread message count for current user."""
-    unread_count = Message.objects.filter(
-        room__members=request.user
-    ).exclude(
-        read_by=request.user
-    ).exclude(
-        sender=request.user
-    ).count()
-    
-    return Response({'unread_count': unread_count})
+    return Response({'unread_count': unread.total_unread_count(request.user)})
 
 
 @api_view(['GET'])
@@ -817,37 +1345,14 @@ def global_search(request):
         })
     
     try:
-        # Search patients
-        patients = Patient.objects.filter(
-            Q(full_name__icontains=query) |
-            Q(mrn__icontains=query) |
-            Q(phone__icontains=query)
-        )[:10]
-        logger.info(f"Found {patients.count()} patients")
-        
-        # Search diagnoses (transactions)
-        diagnoses = Transaction.objects.filter(
-            Q(diagnosis__icontains=query) |
-            Q(patient__full_name__icontains=query) |
-            Q(patient__mrn__icontains=query)
-        ).select_related('patient').order_by('-uploaded_at')[:10]
-        logger.info(f"Found {diagnoses.count()} diagnoses")
-        
-        # Search chat messages (only in rooms user is member of)
-        messages = Message.objects.filter(
-            room__members=request.user,
-            content__icontains=query
-        ).select_related('sender', 'room').order_by('-created_at')[:10]
-        logger.info(f"Found {messages.count()} messages")
-        
-        # Serialize results
+        # One ranked, limited query per entity type (see predictions.search)
         from .serializers import PatientSerializer, TransactionSerializer
         
-        patient_results = PatientSerializer(patients, many=True).data
-        diagnosis_results = TransactionSerializer(diagnoses, many=True).data
+        patient_results = PatientSerializer(search_patients(query), many=True).data
+        diagnosis_results = TransactionSerializer(search_diagnoses(query), many=True).data
         
         message_results = []
-        for msg in messages:
+        for msg in search_messages(request.user, query):
             message_results.append({
                 'id': str(msg.id),
                 'content': msg.content,
@@ -862,7 +1367,10 @@ def global_search(request):
             })
         
         total = len(patient_results) + len(diagnosis_results) + len(message_results)
-        logger.info(f"Total results: {total}")
+        logger.info(
+            f"Search results: {len(patient_results)} patients, {len(diagnosis_results)} diagnoses, "
+            f"{len(message_results)} messages"
+        )
         
         return Response({
             'patients': patient_results,
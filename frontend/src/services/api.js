@@ -245,13 +245,28 @@ export const createChatRoom = async (data) => {
   return response.data
 }
 
-export const listMessages = async (roomId, { page = 1, pageSize = 50 } = {}) => {
+/**
+ * List messages of a room, newest first, one cursor page at a time
+ * @param {string} roomId - Chat room id
+ * @param {string|null} cursor - Cursor of an earlier response (see cursorFromUrl), for older messages
+ * @returns {Promise} - Promise with { results, next, previous }
+ */
+export const listMessages = async (roomId, { pageSize = 50, cursor = null } = {}) => {
   const response = await api.get(`/api/v1/chat/rooms/${roomId}/messages/`, {
-    params: { page, page_size: pageSize }
+    params: { page_size: pageSize, ...(cursor ? { cursor } : {}) }
   })
   return response.data
 }
 
+/**
+ * Cursor parameter of a next/previous link, or null
+ * @param {string|null} url - Link from a cursor-paginated response
+ */
+export const cursorFromUrl = (url) => {
+  if (!url) return null
+  return new URL(url, window.location.origin).searchParams.get('cursor')
+}
+
 export const sendMessage = async (roomId, content) => {
   const response = await api.post(`/api/v1/chat/rooms/${roomId}/messages/`, { content })
   return response.data
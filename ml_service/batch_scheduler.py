@@ -0,0 +1,184 @@
+"""
+Dynamic micro-batching scheduler for ensemble inference
+Collects concurrent prediction requests into batches so each model runs
+one stacked forward pass instead of one pass per image
+"""
+import asyncio
+import logging
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from ensemble_predictor import EnsemblePredictor
+from inference_executor import InferenceExecutor, InferenceQueueFull
+
+logger = logging.getLogger(__name__)
+
+
+class BatchScheduler:
+    """
+    Queue-based batching scheduler in front of an EnsemblePredictor
+
+    A request waits at most ``max_delay_ms`` for other requests to join its
+    batch; a batch is dispatched early as soon as it reaches ``max_batch_size``.
+    Batches run on the inference executor, at most one per executor worker, so
+    requests keep accumulating into the next batch while the workers are busy.
+    """
+
+    def __init__(
+        self,
+        predictor: EnsemblePredictor,
+        executor: InferenceExecutor,
+        max_batch_size: int = 8,
+        max_delay_ms: float = 10.0,
+        max_queue_size: int = 32,
+    ):
+        """
+        Initialize batch scheduler
+
+        Args:
+            predictor: Ensemble predictor exposing ``predict_batch``
+            executor: Executor that runs the blocking batch predictions
+            max_batch_size: Maximum number of images per batch
+            max_delay_ms: Maximum time a request waits for a batch to fill
+            max_queue_size: Maximum number of images waiting for a batch
+        """
+        if max_batch_size < 1:
+            raise ValueError("max_batch_size must be at least 1")
+
+        self.predictor = predictor
+        self.executor = executor
+        self.max_batch_size = max_batch_size
+        self.max_delay = max(max_delay_ms, 0.0) / 1000.0
+        self.max_queue_size = max(max_queue_size, 1)
+        self._queue: Optional[asyncio.Queue] = None
+        self._worker: Optional[asyncio.Task] = None
+        self._slots: Optional[asyncio.Semaphore] = None
+        self._in_flight = set()
+
+        logger.info(
+            f"BatchScheduler initialized: max_batch_size={max_batch_size}, max_delay_ms={max_delay_ms}"
+        )
+
+    @property
+    def is_running(self) -> bool:
+        return self._worker is not None and not self._worker.done()
+
+    @property
+    def queue_depth(self) -> int:
+        return self._queue.qsize() if self._queue is not None else 0
+
+    async def start(self) -> None:
+        """Start the background batching loop on the running event loop."""
+        if self.is_running:
+            return
+        self._queue = asyncio.Queue(maxsize=self.max_queue_size)
+        self._slots = asyncio.Semaphore(self.executor.max_workers)
+        self._worker = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """Stop the batching loop and fail any requests still waiting."""
+        if self._worker is not None:
+            self._worker.cancel()
+            try:
+                await self._worker
+            except asyncio.CancelledError:
+                pass
+            self._worker = None
+
+        for task in list(self._in_flight):
+            task.cancel()
+
+        if self._queue is not None:
+            pending = []
+            while not self._queue.empty():
+                pending.append(self._queue.get_nowait())
+            self._fail(pending, RuntimeError("Batch scheduler stopped"))
+
+    async def submit(self, image: np.ndarray) -> Dict:
+        """
+        Queue an image for batched prediction and wait for its result
+
+        Args:
+            image: Decoded image as numpy array
+
+        Returns:
+            Ensemble result dictionary for this image
+
+        Raises:
+            InferenceQueueFull: If ``max_queue_size`` images are already waiting
+        """
+        if not self.is_running:
+            raise RuntimeError("Batch scheduler is not running")
+
+        future = asyncio.get_running_loop().create_future()
+        try:
+            self._queue.put_nowait((image, future))
+        except asyncio.QueueFull:
+            raise InferenceQueueFull(f"Batch queue is full ({self.max_queue_size} waiting)")
+        return await future
+
+    async def _collect_batch(self) -> List[Tuple[np.ndarray, asyncio.Future]]:
+        """Wait for the first request, then fill the batch until size or deadline."""
+        loop = asyncio.get_running_loop()
+        batch = [await self._queue.get()]
+        deadline = loop.time() + self.max_delay
+
+        while len(batch) < self.max_batch_size:
+            if not self._queue.empty():
+                batch.append(self._queue.get_nowait())
+                continue
+
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self._queue.get(), timeout=remaining))
+            except asyncio.TimeoutError:
+                break
+
+        # Callers that disconnected while waiting do not need inference
+        return [(image, future) for image, future in batch if not future.done()]
+
+    async def _run(self) -> None:
+        while True:
+            # Only start collecting once a worker is free, so batches grow under load
+            await self._slots.acquire()
+            try:
+                batch = await self._collect_batch()
+            except BaseException:
+                self._slots.release()
+                raise
+
+            if not batch:
+                self._slots.release()
+                continue
+
+            task = asyncio.create_task(self._dispatch(batch))
+            self._in_flight.add(task)
+            task.add_done_callback(self._in_flight.discard)
+
+    async def _dispatch(self, batch: List[Tuple[np.ndarray, asyncio.Future]]) -> None:
+        images = [image for image, _ in batch]
+        try:
+            results = await self.executor.run(self.predictor.predict_batch, images)
+        except asyncio.CancelledError:
+            self._fail(batch, RuntimeError("Batch scheduler stopped"))
+            raise
+        except Exception as e:
+            logger.error(f"Batch prediction error (batch_size={len(batch)}): {e}")
+            self._fail(batch, e)
+            return
+        finally:
+            self._slots.release()
+
+        logger.info(f"Batch of {len(batch)} image(s) predicted")
+        for (_, future), result in zip(batch, results):
+            if not future.done():
+                future.set_result(result)
+
+    @staticmethod
+    def _fail(batch: List[Tuple[np.ndarray, asyncio.Future]], error: Exception) -> None:
+        for _, future in batch:
+            if not future.done():
+                future.set_exception(error)
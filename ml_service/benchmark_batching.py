@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+"""
+Benchmark one-at-a-time ensemble inference against the micro-batching scheduler
+
+Runs an open-loop workload: ``--requests`` predictions arrive as a Poisson
+process at ``--rate`` requests/second, and latency is measured from each
+request's arrival, so time spent queued behind a busy event loop is counted.
+Uses BrainTumorModel2 (ResNet18) with random weights so it runs without S3
+credentials or trained checkpoints.
+
+Usage:
+    python benchmark_batching.py --rate 20 --requests 200 --max-batch-size 8 --max-delay-ms 10
+"""
+import argparse
+import asyncio
+import json
+import time
+from typing import Dict, List
+
+import numpy as np
+import torch
+
+from brain_tumor_models import BrainTumorModel2
+from ensemble_predictor import EnsemblePredictor
+from batch_scheduler import BatchScheduler
+
+
+def build_predictor() -> EnsemblePredictor:
+    model = BrainTumorModel2()
+    model.model.eval()
+    model.is_loaded = True
+    return EnsemblePredictor(models=[model])
+
+
+def summarize(latencies: List[float], elapsed: float) -> Dict:
+    latencies_ms = np.array(latencies) * 1000.0
+    return {
+        "requests": len(latencies),
+        "throughput_rps": round(len(latencies) / elapsed, 2),
+        "p50_ms": round(float(np.percentile(latencies_ms, 50)), 1),
+        "p99_ms": round(float(np.percentile(latencies_ms, 99)), 1),
+    }
+
+
+async def run_workload(predict, images: List[np.ndarray], arrivals: np.ndarray) -> Dict:
+    latencies: List[float] = []
+    started = time.perf_counter()
+
+    async def request(index: int, arrival: float):
+        await asyncio.sleep(max(0.0, started + arrival - time.perf_counter()))
+        await predict(images[index % len(images)])
+        latencies.append(time.perf_counter() - (started + arrival))
+
+    await asyncio.gather(*(request(i, arrival) for i, arrival in enumerate(arrivals)))
+    return summarize(latencies, time.perf_counter() - started)
+
+
+async def main(args):
+    torch.manual_seed(0)
+    rng = np.random.default_rng(0)
+    images = [rng.integers(0, 256, (512, 512, 3), dtype=np.uint8) for _ in range(16)]
+    arrivals = np.cumsum(rng.exponential(1.0 / args.rate, args.requests))
+    predictor = build_predictor()
+
+    # Warm up allocator and kernels so neither mode pays first-call costs
+    predictor.predict_batch(images[:args.max_batch_size])
+
+    async def predict_sequential(image):
+        # Mirrors the previous endpoint: inference runs inline on the event loop
+        return predictor.predict(image)
+
+    sequential = await run_workload(predict_sequential, images, arrivals)
+
+    scheduler = BatchScheduler(
+        predictor,
+        max_batch_size=args.max_batch_size,
+        max_delay_ms=args.max_delay_ms,
+    )
+    await scheduler.start()
+    try:
+        batched = await run_workload(scheduler.submit, images, arrivals)
+    finally:
+        await scheduler.stop()
+
+    print(json.dumps({
+        "config": vars(args),
+        "torch_threads": torch.get_num_threads(),
+        "sequential": sequential,
+        "batched": batched,
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--rate", type=float, default=20.0)
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--max-batch-size", type=int, default=8)
+    parser.add_argument("--max-delay-ms", type=float, default=10.0)
+    asyncio.run(main(parser.parse_args()))
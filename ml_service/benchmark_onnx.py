@@ -0,0 +1,182 @@
+#!/usr/bin/env python3
+"""
+Benchmark the native (Keras + PyTorch) ensemble against the ONNX Runtime backend
+
+Each backend runs in a fresh subprocess, so import time, cold start and
+memory are measured the way the service sees them at startup:
+    - import_s: importing the model classes (TensorFlow/PyTorch or onnxruntime)
+    - load_s: loading both model files
+    - first_prediction_s: first ensemble prediction after load
+    - cold_start_s: process start until the first prediction is returned
+    - rss_mb / peak_rss_mb: resident memory after the timed runs
+    - batch_<n>: p50/p95 ensemble latency per batch size
+
+Without --keras/--torch the script exports stand-in models (a small Keras CNN
+and a randomly initialised ResNet18) so it runs without S3 credentials. The
+ResNet18 numbers are representative; Model 1 numbers are only meaningful with
+the real checkpoint.
+
+Usage:
+    python benchmark_onnx.py --iterations 50 --batch-sizes 1 8
+    python benchmark_onnx.py --keras img_clf.keras --torch best_model_test6.pth
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Dict, List
+
+PROCESS_STARTED = time.perf_counter()
+
+BACKENDS = ("native", "onnx")
+
+
+def read_memory_mb() -> Dict[str, float]:
+    """Current and peak resident memory of this process (Linux /proc)."""
+    values = {}
+    with open("/proc/self/status") as status:
+        for line in status:
+            key, _, value = line.partition(":")
+            if key in ("VmRSS", "VmHWM"):
+                values[key] = int(value.split()[0]) / 1024.0
+    return {"rss_mb": round(values["VmRSS"], 1), "peak_rss_mb": round(values["VmHWM"], 1)}
+
+
+def run_worker(backend: str, model_files: Dict[str, str], iterations: int, batch_sizes: List[int]) -> Dict:
+    """Load one backend and time it; runs inside the subprocess."""
+    import numpy as np
+
+    started = time.perf_counter()
+    if backend == "onnx":
+        from onnx_models import OnnxBrainTumorModel1, OnnxBrainTumorModel2
+        models = [OnnxBrainTumorModel1(), OnnxBrainTumorModel2()]
+        paths = [model_files["model1_onnx"], model_files["model2_onnx"]]
+    else:
+        from brain_tumor_models import BrainTumorModel1, BrainTumorModel2
+        models = [BrainTumorModel1(), BrainTumorModel2()]
+        paths = [model_files["model1"], model_files["model2"]]
+    from ensemble_predictor import EnsemblePredictor
+    imported = time.perf_counter()
+
+    for model, model_path in zip(models, paths):
+        model.load_model(Path(model_path))
+    predictor = EnsemblePredictor(models=models)
+    loaded = time.perf_counter()
+
+    rng = np.random.default_rng(0)
+    images = [rng.integers(0, 256, size=(256, 256, 3), dtype=np.uint8) for _ in range(max(batch_sizes))]
+    predictor.predict(images[0])
+    first_prediction = time.perf_counter()
+
+    result = {
+        "backend": backend,
+        "import_s": round(imported - started, 3),
+        "load_s": round(loaded - imported, 3),
+        "first_prediction_s": round(first_prediction - loaded, 3),
+        "cold_start_s": round(first_prediction - PROCESS_STARTED, 3),
+    }
+
+    for batch_size in batch_sizes:
+        batch = images[:batch_size]
+        predictor.predict_batch(batch)  # warm-up for this shape
+        latencies = []
+        for _ in range(iterations):
+            batch_started = time.perf_counter()
+            predictor.predict_batch(batch)
+            latencies.append((time.perf_counter() - batch_started) * 1000.0)
+        result[f"batch_{batch_size}"] = {
+            "p50_ms": round(float(np.percentile(latencies, 50)), 1),
+            "p95_ms": round(float(np.percentile(latencies, 95)), 1),
+        }
+
+    result.update(read_memory_mb())
+    return result
+
+
+def export_stand_in_models(directory: Path) -> Dict[str, str]:
+    """Save stand-in native checkpoints and their ONNX exports."""
+    import keras
+    import torch
+
+    from brain_tumor_models import BrainTumorModel2
+    from export_onnx import export_keras_model, export_torch_model
+
+    keras.utils.set_random_seed(0)
+    model1 = keras.Sequential([
+        keras.Input((224, 224, 3)),
+        keras.layers.Conv2D(32, 3, strides=2, activation="relu"),
+        keras.layers.Conv2D(64, 3, strides=2, activation="relu"),
+        keras.layers.GlobalAveragePooling2D(),
+        keras.layers.Dense(2, activation="softmax"),
+    ])
+    model1.save(directory / "model1.keras")
+
+    torch.manual_seed(0)
+    model2 = BrainTumorModel2()
+    torch.save(model2.model.state_dict(), directory / "model2.pth")
+
+    return {
+        "model1": str(directory / "model1.keras"),
+        "model2": str(directory / "model2.pth"),
+        "model1_onnx": str(export_keras_model(model1, directory / "model1.onnx")),
+        "model2_onnx": str(export_torch_model(model2.model, directory / "model2.onnx")),
+    }
+
+
+def export_real_models(keras_path: Path, torch_path: Path, directory: Path) -> Dict[str, str]:
+    from export_onnx import export_models
+
+    model1_onnx, model2_onnx = export_models(keras_path, torch_path, directory)
+    return {
+        "model1": str(keras_path),
+        "model2": str(torch_path),
+        "model1_onnx": str(model1_onnx),
+        "model2_onnx": str(model2_onnx),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--keras", type=Path, help="Real BrainTumorModel1 checkpoint")
+    parser.add_argument("--torch", type=Path, help="Real BrainTumorModel2 state_dict")
+    parser.add_argument("--iterations", type=int, default=30)
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=[1, 8])
+    parser.add_argument("--worker", choices=BACKENDS, help=argparse.SUPPRESS)
+    parser.add_argument("--model-files", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        result = run_worker(args.worker, json.loads(args.model_files), args.iterations, args.batch_sizes)
+        print(json.dumps(result))
+        return
+
+    with tempfile.TemporaryDirectory() as tmp:
+        if args.keras and args.torch:
+            model_files = export_real_models(args.keras, args.torch, Path(tmp))
+        else:
+            model_files = export_stand_in_models(Path(tmp))
+
+        results = []
+        for backend in BACKENDS:
+            command = [
+                sys.executable, __file__,
+                "--worker", backend,
+                "--model-files", json.dumps(model_files),
+                "--iterations", str(args.iterations),
+                "--batch-sizes", *map(str, args.batch_sizes),
+            ]
+            output = subprocess.run(
+                command, check=True, capture_output=True, text=True,
+                cwd=os.path.dirname(os.path.abspath(__file__)),
+            )
+            results.append(json.loads(output.stdout.strip().splitlines()[-1]))
+
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
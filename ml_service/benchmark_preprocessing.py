@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+"""
+Microbenchmark per-model preprocessing against the shared preprocessing stage
+
+The legacy path preprocesses every image once per model (resize, BGR->RGB,
+float32 scaling, plus torch normalization for ResNet18). The shared path runs
+``Preprocessor.run`` once per batch for both model input specs.
+
+Allocations are measured with tracemalloc, which sees NumPy/OpenCV buffers but
+not the PyTorch CPU allocator, so the legacy figure understates its real cost.
+
+Usage:
+    python benchmark_preprocessing.py --batch-size 8 --iterations 200
+"""
+import argparse
+import json
+import time
+import tracemalloc
+
+import cv2
+import numpy as np
+import torch
+
+from preprocessing import IMAGENET_MEAN, IMAGENET_STD, Preprocessor, PreprocessSpec
+
+KERAS_SPEC = PreprocessSpec(size=(224, 224))
+TORCH_SPEC = PreprocessSpec(size=(224, 224), mean=IMAGENET_MEAN, std=IMAGENET_STD, channels_first=True)
+
+
+def legacy_keras(image):
+    if image.shape[:2] != (224, 224):
+        image = cv2.resize(image, (224, 224))
+    image = cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
+    return np.expand_dims(image.astype(np.float32) / 255.0, axis=0)
+
+
+def legacy_torch(image):
+    tensor = torch.from_numpy(legacy_keras(image)[0]).permute(2, 0, 1)
+    mean = torch.tensor([0.485, 0.456, 0.406]).view(3, 1, 1)
+    std = torch.tensor([0.229, 0.224, 0.225]).view(3, 1, 1)
+    return ((tensor - mean) / std).unsqueeze(0)
+
+
+def legacy(images):
+    keras_batch = np.concatenate([legacy_keras(image) for image in images])
+    torch_batch = torch.cat([legacy_torch(image) for image in images])
+    return keras_batch, torch_batch
+
+
+def measure(func, images, iterations):
+    func(images)  # warm-up: shared buffers are allocated on first use
+
+    started = time.perf_counter()
+    for _ in range(iterations):
+        func(images)
+    elapsed = time.perf_counter() - started
+
+    tracemalloc.start()
+    tracemalloc.reset_peak()
+    func(images)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {
+        "us_per_image": round(elapsed / (iterations * len(images)) * 1e6, 1),
+        "peak_alloc_kib_per_batch": round(peak / 1024, 1),
+    }
+
+
+def main(args):
+    rng = np.random.default_rng(0)
+    images = [rng.integers(0, 256, (512, 512, 3), dtype=np.uint8) for _ in range(args.batch_size)]
+    preprocessor = Preprocessor()
+
+    results = {
+        "config": vars(args),
+        "legacy_per_model": measure(legacy, images, args.iterations),
+        "shared": measure(lambda batch: preprocessor.run(batch, [KERAS_SPEC, TORCH_SPEC]), images, args.iterations),
+    }
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--batch-size", type=int, default=8)
+    parser.add_argument("--iterations", type=int, default=200)
+    main(parser.parse_args())
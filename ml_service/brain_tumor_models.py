@@ -4,44 +4,49 @@ Brain Tumor Detection Models supporting TensorFlow/Keras and PyTorch formats.
 
 from __future__ import annotations
 
+import json
 import logging
+import warnings
 from pathlib import Path
-from typing import Dict, List, Optional, Tuple, Union
+from typing import Dict, Iterable, List, Optional, Tuple
 
-import cv2
 import numpy as np
 import torch
 import torch.nn as nn
+import tensorflow as tf
 from tensorflow.keras.models import load_model
 from torchvision import models
+from torchvision.models import quantization as quantization_models
+
+from model_base import (
+    MODEL1_PREPROCESS_SPEC,
+    MODEL2_CLASS_NAMES,
+    MODEL2_PREPROCESS_SPEC,
+    BrainTumorModelBase,
+    build_binary_result,
+    build_multiclass_result,
+    resolve_no_tumor_index,
+)
+from preprocessing import preprocess_batch
 
 logger = logging.getLogger(__name__)
 
 
-class BrainTumorModelBase:
-    """Base class for brain tumor detection models."""
-
-    def __init__(self, model_name: str) -> None:
-        self.model_name = model_name
-        self.model = None
-        self.is_loaded = False
-
-    def preprocess_image(self, image: np.ndarray) -> Union[np.ndarray, torch.Tensor]:
-        raise NotImplementedError
-
-    def predict(self, image: np.ndarray) -> Tuple[float, Dict]:
-        raise NotImplementedError
-
-    def load_model(self, *args, **kwargs) -> None:  # pragma: no cover - interface definition
-        raise NotImplementedError
-
-
 class BrainTumorModel1(BrainTumorModelBase):
     """TensorFlow/Keras model loader (.keras primary with .h5 fallback)."""
 
     def __init__(self) -> None:
         super().__init__("BrainTumorModel1")
-        self.input_size = (224, 224)
+        self.preprocess_spec = MODEL1_PREPROCESS_SPEC
+        self.input_size = self.preprocess_spec.size
+
+    def set_num_threads(self, num_threads: int) -> None:
+        super().set_num_threads(num_threads)
+        try:
+            tf.config.threading.set_intra_op_parallelism_threads(num_threads)
+        except RuntimeError as err:
+            # TensorFlow only accepts this before its runtime is initialized
+            logger.warning("%s could not set intra-op threads: %s", self.model_name, err)
 
     def load_model(
         self,
@@ -87,57 +92,39 @@ class BrainTumorModel1(BrainTumorModelBase):
         
 
     def preprocess_image(self, image: np.ndarray) -> np.ndarray:
-        if image.shape[:2] != self.input_size:
-            image = cv2.resize(image, self.input_size)
-
-        if len(image.shape) == 2:
-            image = cv2.cvtColor(image, cv2.COLOR_GRAY2RGB)
-        else:
-            image = cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
-
-        image = image.astype(np.float32) / 255.0
-        image = np.expand_dims(image, axis=0)
-
-        return image
+        return preprocess_batch([image], self.preprocess_spec)
 
     def predict(self, image: np.ndarray) -> Tuple[float, Dict]:
+        return self.predict_batch([image])[0]
+
+    def predict_preprocessed(self, batch: np.ndarray) -> List[Tuple[float, Dict]]:
         if not self.is_loaded:
             raise RuntimeError(f"{self.model_name} is not loaded")
 
-        processed_image = self.preprocess_image(image)
-        prediction = self.model.predict(processed_image, verbose=0)
+        predictions = self.model.predict(batch, batch_size=len(batch), verbose=0)
 
-        tumor_prob = float(prediction[0, 1])
-        predicted_class = "tumor" if tumor_prob >= 0.5 else "no_tumor"
-        metadata = {
-            "model_name": self.model_name,
-            "input_shape": self.input_size,
-            "raw_prediction": prediction[0].tolist(),
-            "tumor_probability": tumor_prob,
-            "no_tumor_probability": float(prediction[0, 0]),
-            "predicted_class": predicted_class,
-            "class_probabilities": {
-                "no_tumor": float(prediction[0, 0]),
-                "tumor": tumor_prob,
-            },
-        }
+        return [self._build_result(prediction) for prediction in predictions]
 
-        return tumor_prob, metadata
+    def _build_result(self, prediction: np.ndarray) -> Tuple[float, Dict]:
+        return build_binary_result(self.model_name, self.input_size, prediction)
 
 
 class BrainTumorModel2(BrainTumorModelBase):
     """PyTorch ResNet18 model loader for `.pth` state_dict checkpoints."""
 
+    resnet_factory = staticmethod(models.resnet18)
+
     def __init__(self, class_names: Optional[List[str]] = None) -> None:
         super().__init__("BrainTumorModel2")
-        self.input_size = (224, 224)
-        self.class_names = class_names or ["glioma", "meningioma", "notumor", "pituitary"]
+        self.class_names = class_names or list(MODEL2_CLASS_NAMES)
+        self.preprocess_spec = MODEL2_PREPROCESS_SPEC
+        self.input_size = self.preprocess_spec.size
         self.device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
         self.model = self._build_model(len(self.class_names)).to(self.device)
         self.no_tumor_index = self._resolve_no_tumor_index()
 
     def _build_model(self, num_classes: int) -> nn.Module:
-        model = models.resnet18(weights=None)
+        model = self.resnet_factory(weights=None)
         in_features = model.fc.in_features
         model.fc = nn.Sequential(
             nn.Dropout(p=0.5),
@@ -146,16 +133,7 @@ class BrainTumorModel2(BrainTumorModelBase):
         return model
 
     def _resolve_no_tumor_index(self) -> int:
-        possible_names = {"notumor", "no_tumor", "no-tumor", "no", "none"}
-        for idx, name in enumerate(self.class_names):
-            if name.lower() in possible_names:
-                return idx
-
-        logger.warning(
-            "No explicit 'no tumor' class found in class names %s. Using last class as non-tumor.",
-            self.class_names,
-        )
-        return len(self.class_names) - 1
+        return resolve_no_tumor_index(self.class_names)
 
     def load_model(self, model_path: Path) -> None:
         state_dict = torch.load(model_path, map_location=self.device)
@@ -165,52 +143,92 @@ class BrainTumorModel2(BrainTumorModelBase):
         logger.info("%s loaded from %s", self.model_name, model_path)
 
     def preprocess_image(self, image: np.ndarray) -> torch.Tensor:
-        if image.shape[:2] != self.input_size:
-            image = cv2.resize(image, self.input_size)
+        return torch.from_numpy(preprocess_batch([image], self.preprocess_spec))
 
-        if len(image.shape) == 2:
-            image = cv2.cvtColor(image, cv2.COLOR_GRAY2RGB)
-        else:
-            image = cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
+    def predict(self, image: np.ndarray) -> Tuple[float, Dict]:
+        return self.predict_batch([image])[0]
 
-        image = image.astype(np.float32) / 255.0
-        tensor = torch.from_numpy(image).permute(2, 0, 1)
+    def predict_preprocessed(self, batch: np.ndarray) -> List[Tuple[float, Dict]]:
+        if not self.is_loaded:
+            raise RuntimeError(f"{self.model_name} is not loaded")
 
-        mean = torch.tensor([0.485, 0.456, 0.406]).view(3, 1, 1)
-        std = torch.tensor([0.229, 0.224, 0.225]).view(3, 1, 1)
+        if self.num_threads:
+            # Applies to the calling thread, so parallel ensemble members keep separate budgets
+            torch.set_num_threads(self.num_threads)
 
-        tensor = (tensor - mean) / std
-        tensor = tensor.unsqueeze(0)
+        with warnings.catch_warnings():
+            # Shared batches are read-only views; the forward pass never writes its input
+            warnings.simplefilter("ignore", UserWarning)
+            batch_tensor = torch.from_numpy(batch)
 
-        return tensor
+        with torch.no_grad():
+            logits = self.model(batch_tensor.to(self.device))
+            probs = torch.softmax(logits, dim=1).cpu().numpy()
 
-    def predict(self, image: np.ndarray) -> Tuple[float, Dict]:
-        if not self.is_loaded:
-            raise RuntimeError(f"{self.model_name} is not loaded")
+        return [self._build_result(row) for row in probs]
+
+    def _build_result(self, probs: np.ndarray) -> Tuple[float, Dict]:
+        return build_multiclass_result(
+            self.model_name, self.input_size, self.class_names, self.no_tumor_index, probs
+        )
+
+
+class QuantizedBrainTumorModel2(BrainTumorModel2):
+    """INT8 ResNet18 from post-training static quantization of BrainTumorModel2.
 
-        processed_tensor = self.preprocess_image(image).to(self.device)
+    ``quantize`` calibrates activation ranges on representative scans and
+    converts fp32 weights (done offline by ``quantize_model2.py``);
+    ``load_model`` loads the resulting int8 state_dict. Quantized kernels
+    run on CPU only.
+    """
 
+    precision = "int8"
+    resnet_factory = staticmethod(quantization_models.resnet18)
+
+    def __init__(self, class_names: Optional[List[str]] = None, engine: Optional[str] = None) -> None:
+        super().__init__(class_names)
+        self.device = torch.device("cpu")
+        self.model = self.model.to(self.device)
+        self.engine = engine or torch.backends.quantized.engine
+        self.quantization_report: Optional[Dict] = None
+
+    def _prepare(self) -> None:
+        """Fuse conv/bn/relu and insert observers; identical for calibration and loading."""
+        torch.backends.quantized.engine = self.engine
+        self.model.eval()
+        self.model.fuse_model()
+        self.model.qconfig = torch.ao.quantization.get_default_qconfig(self.engine)
+        torch.ao.quantization.prepare(self.model, inplace=True)
+
+    def quantize(self, fp32_state_dict: Dict, calibration_batches: Iterable[np.ndarray]) -> None:
+        """Convert fp32 weights to int8, calibrating on preprocessed NCHW batches."""
+        self.model.load_state_dict(fp32_state_dict)
+        self._prepare()
         with torch.no_grad():
-            logits = self.model(processed_tensor)
-            probs = torch.softmax(logits, dim=1).cpu().numpy()[0]
-
-        class_probabilities = {
-            class_name: float(probs[idx])
-            for idx, class_name in enumerate(self.class_names)
-        }
-
-        no_tumor_prob = probs[self.no_tumor_index]
-        tumor_prob = float(1.0 - no_tumor_prob)
-        predicted_index = int(np.argmax(probs))
-        predicted_class = self.class_names[predicted_index]
-
-        metadata = {
-            "model_name": self.model_name,
-            "input_shape": self.input_size,
-            "class_probabilities": class_probabilities,
-            "predicted_class": predicted_class,
-            "no_tumor_probability": float(no_tumor_prob),
-            "tumor_probability": tumor_prob,
-        }
-
-        return tumor_prob, metadata
+            for batch in calibration_batches:
+                self.model(torch.from_numpy(np.ascontiguousarray(batch)))
+        torch.ao.quantization.convert(self.model, inplace=True)
+        self.is_loaded = True
+
+    def load_model(self, model_path: Path, report_path: Optional[Path] = None) -> None:
+        if report_path is not None and Path(report_path).exists():
+            self.quantization_report = json.loads(Path(report_path).read_text())
+            self.engine = self.quantization_report.get("engine", self.engine)
+
+        with warnings.catch_warnings():
+            # Observers are never run here; their placeholder qparams are overwritten below
+            warnings.simplefilter("ignore", UserWarning)
+            self._prepare()
+            torch.ao.quantization.convert(self.model, inplace=True)
+        self.model.load_state_dict(torch.load(model_path, map_location=self.device))
+        self.is_loaded = True
+
+        if self.quantization_report:
+            logger.info(
+                "%s loaded int8 weights from %s (accuracy delta vs fp32: %+.4f)",
+                self.model_name,
+                model_path,
+                self.quantization_report["accuracy_delta"],
+            )
+        else:
+            logger.warning("%s loaded int8 weights from %s without a quantization report", self.model_name, model_path)
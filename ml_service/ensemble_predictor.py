@@ -2,35 +2,119 @@
 Ensemble Predictor for Brain Tumor Detection
 Combines predictions from multiple models and selects the best result
 """
+import os
+import time
 import numpy as np
+from concurrent.futures import ThreadPoolExecutor
 from typing import List, Dict, Tuple, Optional
 import logging
-from brain_tumor_models import BrainTumorModelBase
+import metrics
+from model_base import BrainTumorModelBase
+from preprocessing import Preprocessor
 
 logger = logging.getLogger(__name__)
 
 
+def split_thread_budget(num_models: int, total_threads: Optional[int] = None) -> int:
+    """Intra-op threads per model when all models run at the same time."""
+    total_threads = total_threads or os.cpu_count() or 1
+    return max(1, total_threads // max(num_models, 1))
+
+
 class EnsemblePredictor:
     """
     Ensemble predictor that combines multiple brain tumor detection models
     and selects the best prediction based on confidence
     """
     
-    def __init__(self, models: List[BrainTumorModelBase], strategy: str = "max_confidence"):
+    def __init__(
+        self,
+        models: List[BrainTumorModelBase],
+        strategy: str = "max_confidence",
+        parallel: bool = False,
+        version: Optional[str] = None,
+    ):
         """
         Initialize ensemble predictor
         
         Args:
             models: List of loaded brain tumor models
             strategy: Selection strategy ('max_confidence', 'average', 'voting')
+            parallel: Run all models at the same time instead of one after another
+            version: Label of this set of models, reported with every result
         """
-        self.models = models
+        # Models and version label are swapped together as one tuple, so a batch
+        # always reports the version of the models it actually ran on
+        self._serving: Tuple[List[BrainTumorModelBase], Optional[str]] = (models, version)
         self.strategy = strategy
+        self.parallel = parallel
+        self._pool: Optional[ThreadPoolExecutor] = None
+        self.preprocessor = Preprocessor()
         
         if not models:
             raise ValueError("At least one model must be provided")
+
+        if parallel:
+            self._pool = ThreadPoolExecutor(max_workers=len(models), thread_name_prefix="ensemble")
         
-        logger.info(f"EnsemblePredictor initialized with {len(models)} models, strategy: {strategy}")
+        logger.info(
+            f"EnsemblePredictor initialized with {len(models)} models, strategy: {strategy}, parallel: {parallel}"
+        )
+
+    @property
+    def models(self) -> List[BrainTumorModelBase]:
+        return self._serving[0]
+
+    @property
+    def version(self) -> Optional[str]:
+        return self._serving[1]
+
+    def add_model(self, model: BrainTumorModelBase, version: Optional[str] = None) -> None:
+        """
+        Add a model that finished loading after the ensemble started serving
+
+        The model list is replaced rather than mutated, so a batch already in
+        flight finishes with the models it started with.
+
+        Args:
+            model: Loaded brain tumor model
+            version: New version label; unchanged when None
+        """
+        if self.parallel:
+            # Not shut down: a batch may still be submitting to the old pool; its idle
+            # threads exit once it is garbage collected
+            self._pool = ThreadPoolExecutor(max_workers=len(self.models) + 1, thread_name_prefix="ensemble")
+        models, current_version = self._serving
+        self._serving = (models + [model], version if version is not None else current_version)
+        logger.info(f"Added {model.model_name} to ensemble ({len(self.models)} models)")
+
+    def replace_model(self, model: BrainTumorModelBase, version: Optional[str] = None) -> BrainTumorModelBase:
+        """
+        Swap in a new version of the ensemble member with the same model_name
+
+        Like ``add_model`` the list is replaced rather than mutated: batches
+        already in flight finish on the old model and report the old version.
+
+        Args:
+            model: Loaded (and warmed up) replacement model
+            version: New version label; unchanged when None
+
+        Returns:
+            The model that was replaced
+        """
+        models, current_version = self._serving
+        names = [member.model_name for member in models]
+        if model.model_name not in names:
+            raise ValueError(f"{model.model_name} is not in the ensemble")
+
+        index = names.index(model.model_name)
+        old_model = models[index]
+        self._serving = (
+            models[:index] + [model] + models[index + 1:],
+            version if version is not None else current_version,
+        )
+        logger.info(f"Replaced {model.model_name} in ensemble (version {self.version})")
+        return old_model
     
     def predict(self, image: np.ndarray) -> Dict:
         """
@@ -48,16 +132,56 @@ class EnsemblePredictor:
                 - all_predictions: List of all model predictions
                 - strategy: Strategy used for selection
         """
-        if not self.models:
+        return self.predict_batch([image])[0]
+
+    def predict_batch(self, images: List[np.ndarray]) -> List[Dict]:
+        """
+        Predict brain tumor for several images at once
+
+        Preprocessing is shared: each distinct model input spec is computed
+        once for the batch. Each model then runs a single stacked forward pass,
+        and the per-image predictions are combined exactly as in ``predict``.
+
+        Args:
+            images: Input images as numpy arrays
+
+        Returns:
+            List of result dictionaries (same shape as ``predict``), one per image
+        """
+        # Snapshot: add_model/replace_model may swap the models while this batch runs
+        models, version = self._serving
+        pool = self._pool
+        if not models:
             raise RuntimeError("No models loaded in ensemble")
-        
-        all_predictions = []
-        
-        # Get predictions from all models
-        for model in self.models:
-            try:
-                tumor_prob, metadata = model.predict(image)
-                
+
+        metrics.observe_batch(len(images))
+        specs = {model.preprocess_spec for model in models if model.preprocess_spec is not None}
+        with metrics.stage_timer("preprocess"):
+            batches = self.preprocessor.run(images, specs)
+
+        # Get batched predictions from all models, keeping model order
+        if pool is not None:
+            futures = [pool.submit(self._run_model, model, images, batches) for model in models]
+            outcomes = [future.result() for future in futures]
+        else:
+            outcomes = [self._run_model(model, images, batches) for model in models]
+
+        model_results = [
+            (model, predictions)
+            for model, predictions in zip(models, outcomes)
+            if predictions is not None
+        ]
+
+        if not model_results:
+            raise RuntimeError("All models failed to predict")
+
+        combine_started = time.perf_counter()
+        results = []
+        for index in range(len(images)):
+            all_predictions = []
+            for model, predictions in model_results:
+                tumor_prob, metadata = predictions[index]
+
                 prediction_info = {
                     "model_name": model.model_name,
                     "tumor_probability": tumor_prob,
@@ -66,17 +190,44 @@ class EnsemblePredictor:
                     "class_probabilities": metadata.get("class_probabilities"),
                     "metadata": metadata,
                 }
-                
+
                 all_predictions.append(prediction_info)
                 logger.info(f"{model.model_name}: tumor_prob={tumor_prob:.4f}, confidence={prediction_info['confidence']:.4f}")
-                
-            except Exception as e:
-                logger.error(f"Error predicting with {model.model_name}: {e}")
-                continue
-        
-        if not all_predictions:
-            raise RuntimeError("All models failed to predict")
-        
+
+            result = self._combine(all_predictions)
+            result["model_version"] = version
+            results.append(result)
+
+        metrics.observe_stage("combine", time.perf_counter() - combine_started)
+        return results
+
+    def _run_model(
+        self,
+        model: BrainTumorModelBase,
+        images: List[np.ndarray],
+        batches: Dict,
+    ) -> Optional[List[Tuple[float, Dict]]]:
+        """Run one model over the batch, recording its timing; None if it failed."""
+        start_time = time.perf_counter()
+        try:
+            if model.preprocess_spec is not None:
+                predictions = model.predict_preprocessed(batches[model.preprocess_spec])
+            else:
+                predictions = model.predict_batch(images)
+        except Exception as e:
+            logger.error(f"Error predicting with {model.model_name}: {e}")
+            return None
+
+        elapsed = time.perf_counter() - start_time
+        metrics.observe_model_inference(model.model_name, elapsed)
+        inference_time = round(elapsed, 4)
+        for _, metadata in predictions:
+            metadata["inference_time"] = inference_time
+            metadata["batch_size"] = len(images)
+        return predictions
+
+    def _combine(self, all_predictions: List[Dict]) -> Dict:
+        """Combine per-model predictions for one image into the ensemble result."""
         ensemble_class_probabilities = self._average_class_probabilities(all_predictions)
 
         # Select best prediction based on strategy
@@ -267,14 +418,20 @@ class EnsemblePredictor:
         """
         Get information about all models in ensemble
         
-{{ ... }}
+        Returns:
             List of model information dictionaries
         """
-        return [
-            {
+        models_info = []
+        for model in self.models:
+            info = {
                 "model_name": model.model_name,
                 "is_loaded": model.is_loaded,
-                "input_size": getattr(model, 'input_size', None)
+                "input_size": getattr(model, 'input_size', None),
+                "backend": model.backend,
+                "precision": model.precision,
             }
-            for model in self.models
-        ]
+            report = getattr(model, 'quantization_report', None)
+            if report:
+                info["quantization"] = report
+            models_info.append(info)
+        return models_info
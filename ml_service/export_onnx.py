@@ -0,0 +1,154 @@
+#!/usr/bin/env python3
+"""
+Export the ensemble models to ONNX for the onnxruntime backend
+
+Converts BrainTumorModel1 (Keras) with tf2onnx and BrainTumorModel2 (ResNet18
+state_dict) with torch.onnx. Both graphs take a dynamic batch in the layout
+of the native model's preprocess_spec and output class probabilities
+(softmax is appended to ResNet18, which natively returns logits).
+
+Conversion needs TensorFlow, PyTorch and tf2onnx; serving with
+INFERENCE_BACKEND=onnx needs only onnxruntime. tf2onnx pins an old protobuf,
+so install it without dependencies next to requirements.txt:
+    pip install onnx==1.17.0 && pip install --no-deps tf2onnx==1.16.1
+
+Usage:
+    python export_onnx.py --keras img_clf.keras --torch best_model_test6.pth --output-dir onnx
+    python export_onnx.py --from-s3 --output-dir onnx --upload
+"""
+import argparse
+import logging
+import os
+from pathlib import Path
+from typing import Tuple
+
+logger = logging.getLogger(__name__)
+
+ONNX_OPSET = 17
+INPUT_NAME = "input"
+OUTPUT_NAME = "probabilities"
+
+
+def export_keras_model(keras_model, output_path: Path, opset: int = ONNX_OPSET) -> Path:
+    """
+    Export a loaded Keras model to ONNX
+
+    Args:
+        keras_model: Model returning class probabilities for NHWC float32 input
+        output_path: Destination .onnx file
+        opset: ONNX opset version
+
+    Returns:
+        Path of the written file
+    """
+    import tensorflow as tf
+    import tf2onnx
+
+    height, width, channels = keras_model.input_shape[1:]
+    signature = [tf.TensorSpec((None, height, width, channels), tf.float32, name=INPUT_NAME)]
+    # Tracing a tf.function works for both Keras 2 and Keras 3 models
+    forward = tf.function(lambda batch: keras_model(batch, training=False))
+
+    output_path = Path(output_path)
+    output_path.parent.mkdir(parents=True, exist_ok=True)
+    tf2onnx.convert.from_function(
+        forward,
+        input_signature=signature,
+        opset=opset,
+        output_path=str(output_path),
+    )
+    logger.info("Exported Keras model to %s", output_path)
+    return output_path
+
+
+def export_torch_model(
+    torch_model,
+    output_path: Path,
+    input_size: Tuple[int, int] = (224, 224),
+    opset: int = ONNX_OPSET,
+) -> Path:
+    """
+    Export a PyTorch classifier to ONNX with softmax appended
+
+    Args:
+        torch_model: nn.Module returning logits for NCHW float32 input
+        output_path: Destination .onnx file
+        input_size: (width, height) of the model input
+        opset: ONNX opset version
+
+    Returns:
+        Path of the written file
+    """
+    import torch
+
+    model = torch.nn.Sequential(torch_model, torch.nn.Softmax(dim=1)).cpu().eval()
+    width, height = input_size
+    example = torch.zeros(1, 3, height, width, dtype=torch.float32)
+
+    output_path = Path(output_path)
+    output_path.parent.mkdir(parents=True, exist_ok=True)
+    with torch.no_grad():
+        torch.onnx.export(
+            model,
+            example,
+            str(output_path),
+            input_names=[INPUT_NAME],
+            output_names=[OUTPUT_NAME],
+            dynamic_axes={INPUT_NAME: {0: "batch"}, OUTPUT_NAME: {0: "batch"}},
+            opset_version=opset,
+        )
+    logger.info("Exported PyTorch model to %s", output_path)
+    return output_path
+
+
+def export_models(keras_path: Path, torch_path: Path, output_dir: Path) -> Tuple[Path, Path]:
+    """Load both native checkpoints and export them next to each other."""
+    from brain_tumor_models import BrainTumorModel1, BrainTumorModel2
+
+    model1 = BrainTumorModel1()
+    model1.load_model(Path(keras_path))
+    model2 = BrainTumorModel2()
+    model2.load_model(Path(torch_path))
+
+    output_dir = Path(output_dir)
+    return (
+        export_keras_model(model1.model, output_dir / f"{Path(keras_path).stem}.onnx"),
+        export_torch_model(model2.model, output_dir / f"{Path(torch_path).stem}.onnx", model2.input_size),
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--keras", type=Path, help="BrainTumorModel1 .keras/.h5 file")
+    parser.add_argument("--torch", type=Path, help="BrainTumorModel2 .pth state_dict")
+    parser.add_argument("--from-s3", action="store_true", help="Download the native models from S3 first")
+    parser.add_argument("--upload", action="store_true", help="Upload the exports to MODEL1_ONNX_KEY/MODEL2_ONNX_KEY")
+    parser.add_argument("--output-dir", type=Path, default=Path("onnx"))
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+
+    s3_loader = None
+    if args.from_s3 or args.upload:
+        import main as service  # reads .env and the model key settings
+        from s3_model_loader import S3ModelLoader
+        s3_loader = S3ModelLoader(bucket_name=service.S3_BUCKET, region_name=service.AWS_REGION)
+
+    if args.from_s3:
+        args.keras = s3_loader.download_model(service.MODEL1_PRIMARY_KEY)
+        args.torch = s3_loader.download_model(service.MODEL2_KEY)
+
+    if not args.keras or not args.torch:
+        parser.error("--keras and --torch are required unless --from-s3 is given")
+
+    model1_onnx, model2_onnx = export_models(args.keras, args.torch, args.output_dir)
+    print(f"Model 1: {model1_onnx} ({os.path.getsize(model1_onnx) / 1e6:.1f} MB)")
+    print(f"Model 2: {model2_onnx} ({os.path.getsize(model2_onnx) / 1e6:.1f} MB)")
+
+    if args.upload:
+        s3_loader.upload_model(str(model1_onnx), service.MODEL1_ONNX_KEY)
+        s3_loader.upload_model(str(model2_onnx), service.MODEL2_ONNX_KEY)
+
+
+if __name__ == "__main__":
+    main()
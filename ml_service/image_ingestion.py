@@ -0,0 +1,198 @@
+"""
+Bounded image ingestion: streamed reads with a byte cap, header sniffing and
+reduced-resolution decoding
+
+Payloads are rejected as early as possible: by Content-Length, by their
+first bytes (not an image or DICOM signature), by the dimensions in the
+header (too many pixels), and by the running byte count while streaming.
+Only then is the image decoded, at the smallest JPEG/OpenCV reduction that
+still leaves the models their input resolution.
+"""
+import logging
+from dataclasses import dataclass
+from io import BytesIO
+from typing import AsyncIterator, Optional, Tuple
+
+import cv2
+import numpy as np
+from PIL import Image, UnidentifiedImageError
+
+from dicom_input import DICOM_MAGIC_OFFSET, is_dicom, read_dicom_header
+
+logger = logging.getLogger(__name__)
+
+# Leading bytes of the formats the decoders accept
+IMAGE_SIGNATURES = {
+    b"\xff\xd8\xff": "JPEG",
+    b"\x89PNG\r\n\x1a\n": "PNG",
+    b"BM": "BMP",
+    b"II*\x00": "TIFF",
+    b"MM\x00*": "TIFF",
+    b"GIF87a": "GIF",
+    b"GIF89a": "GIF",
+}
+SIGNATURE_BYTES = DICOM_MAGIC_OFFSET + 4
+# Headers (JPEG SOF after EXIF/ICC segments) are looked for in this many leading bytes
+MAX_HEADER_BYTES = 1024 * 1024
+
+REDUCED_COLOR_FLAGS = (
+    (8, cv2.IMREAD_REDUCED_COLOR_8),
+    (4, cv2.IMREAD_REDUCED_COLOR_4),
+    (2, cv2.IMREAD_REDUCED_COLOR_2),
+)
+
+
+class ImageRejected(ValueError):
+    """Payload refused before decoding; ``status_code`` is the HTTP status to answer with."""
+
+    status_code = 400
+
+
+class ImageTooLarge(ImageRejected):
+    status_code = 413
+
+
+@dataclass(frozen=True)
+class ImageHeader:
+    format: str
+    width: int
+    height: int
+    frames: int = 1  # multi-frame DICOM series
+
+    @property
+    def pixels(self) -> int:
+        """Pixels per frame."""
+        return self.width * self.height
+
+
+def sniff_format(head: bytes) -> Optional[str]:
+    """Image format from the leading bytes, None when they match no supported format."""
+    for signature, image_format in IMAGE_SIGNATURES.items():
+        if head.startswith(signature):
+            return image_format
+    if head[:4] == b"RIFF" and head[8:12] == b"WEBP":
+        return "WEBP"
+    if is_dicom(head):
+        return "DICOM"
+    return None
+
+
+def sniff_header(data: bytes) -> Optional[ImageHeader]:
+    """
+    Format and dimensions from the image header, without decoding pixels
+
+    Returns None while ``data`` is too short to contain the header.
+    """
+    if is_dicom(data):
+        dimensions = read_dicom_header(data)
+        return ImageHeader("DICOM", *dimensions) if dimensions is not None else None
+    try:
+        with Image.open(BytesIO(data)) as image:
+            width, height = image.size
+            return ImageHeader(image.format, width, height)
+    except Image.DecompressionBombError as e:
+        raise ImageTooLarge(str(e))
+    except (UnidentifiedImageError, SyntaxError, OSError, ValueError):
+        return None
+
+
+async def read_image_stream(
+    chunks: AsyncIterator[bytes],
+    max_bytes: int,
+    max_pixels: int,
+    declared_length: Optional[int] = None,
+    max_dicom_bytes: Optional[int] = None,
+) -> Tuple[bytes, ImageHeader]:
+    """
+    Accumulate an image byte stream, rejecting it at the first sign of trouble
+
+    Args:
+        chunks: Body chunks (upload file or HTTP response)
+        max_bytes: Largest accepted payload
+        max_pixels: Largest accepted width * height, taken from the header
+        declared_length: Content-Length, if the sender announced one
+        max_dicom_bytes: Limit for DICOM files (whole series) instead of ``max_bytes``
+
+    Returns:
+        The payload bytes and the sniffed header
+
+    Raises:
+        ImageTooLarge: Over ``max_bytes`` or ``max_pixels``
+        ImageRejected: Not an image in a supported format
+    """
+    # Until the signature is known the larger limit applies
+    limit = max(max_bytes, max_dicom_bytes or 0)
+    if declared_length is not None and declared_length > limit:
+        raise ImageTooLarge(f"Image is larger than {limit} bytes")
+
+    buffer = bytearray()
+    signature_checked = False
+    header = None
+    async for chunk in chunks:
+        buffer.extend(chunk)
+        if not signature_checked and len(buffer) >= SIGNATURE_BYTES:
+            image_format = _check_signature(buffer)
+            signature_checked = True
+            limit = max_dicom_bytes if image_format == "DICOM" and max_dicom_bytes else max_bytes
+            if declared_length is not None and declared_length > limit:
+                raise ImageTooLarge(f"Image is larger than {limit} bytes")
+        if len(buffer) > limit:
+            raise ImageTooLarge(f"Image is larger than {limit} bytes")
+        if signature_checked and header is None and len(buffer) - len(chunk) < MAX_HEADER_BYTES:
+            header = _checked_header(bytes(buffer), max_pixels)
+
+    if not signature_checked:
+        _check_signature(buffer)
+        if len(buffer) > max_bytes:
+            raise ImageTooLarge(f"Image is larger than {max_bytes} bytes")
+    if header is None:
+        header = _checked_header(bytes(buffer), max_pixels)
+    if header is None:
+        raise ImageRejected("Invalid image file")
+    return bytes(buffer), header
+
+
+def _check_signature(buffer: bytearray) -> str:
+    image_format = sniff_format(bytes(buffer[:SIGNATURE_BYTES]))
+    if image_format is None:
+        raise ImageRejected("Invalid image file")
+    return image_format
+
+
+def _checked_header(data: bytes, max_pixels: int) -> Optional[ImageHeader]:
+    header = sniff_header(data)
+    if header is not None and header.pixels > max_pixels:
+        raise ImageTooLarge(
+            f"Image is {header.width}x{header.height}; at most {max_pixels} pixels are accepted"
+        )
+    return header
+
+
+def reduction_factor(header: ImageHeader, min_side: int) -> int:
+    """Largest of 8, 4 or 2 that keeps both sides at least ``min_side``, else 1."""
+    for factor, _ in REDUCED_COLOR_FLAGS:
+        if min(header.width, header.height) // factor >= min_side:
+            return factor
+    return 1
+
+
+def decode_cv2_reduced(content: bytes, header: ImageHeader, min_side: int) -> Optional[np.ndarray]:
+    """
+    Decode with OpenCV at reduced resolution when the image is large
+
+    JPEGs are scaled in the DCT domain, so neither the time nor the memory
+    of a full-size decode is spent. Returns None for invalid data.
+    """
+    factor = reduction_factor(header, min_side)
+    flags = dict(REDUCED_COLOR_FLAGS).get(factor, cv2.IMREAD_COLOR)
+    return cv2.imdecode(np.frombuffer(content, np.uint8), flags)
+
+
+def decode_pil_reduced(content: bytes, header: ImageHeader, min_side: int) -> np.ndarray:
+    """Decode with PIL into BGR, letting the JPEG decoder scale down to at least ``min_side``."""
+    pil_image = Image.open(BytesIO(content))
+    factor = reduction_factor(header, min_side)
+    if factor > 1:
+        # Only JPEG supports draft mode; other formats ignore it
+        pil_image.draft(pil_image.mode, (header.width // factor, header.height // factor))
+    return cv2.cvtColor(np.array(pil_image), cv2.COLOR_RGB2BGR)
@@ -0,0 +1,71 @@
+"""
+Bounded executor that keeps blocking model inference off the event loop
+Requests beyond the configured capacity are rejected instead of queued forever
+"""
+import asyncio
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict
+
+logger = logging.getLogger(__name__)
+
+
+class InferenceQueueFull(Exception):
+    """Raised when no more inference work can be admitted."""
+
+
+class InferenceExecutor:
+    """
+    Thread pool for TensorFlow/PyTorch forward passes with admission control
+
+    Both frameworks release the GIL inside their kernels, so a thread pool lets
+    the event loop keep serving health checks and downloads during inference.
+    """
+
+    def __init__(self, max_workers: int = 1, max_pending: int = 32):
+        """
+        Initialize inference executor
+
+        Args:
+            max_workers: Number of inference threads
+            max_pending: Maximum number of calls running or waiting for a thread
+        """
+        if max_workers < 1:
+            raise ValueError("max_workers must be at least 1")
+
+        self.max_workers = max_workers
+        self.max_pending = max(max_pending, max_workers)
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="inference")
+        self._pending = 0
+
+        logger.info(f"InferenceExecutor initialized: max_workers={max_workers}, max_pending={self.max_pending}")
+
+    @property
+    def pending(self) -> int:
+        return self._pending
+
+    async def run(self, func: Callable, *args) -> Any:
+        """
+        Run a blocking callable on the inference pool
+
+        Raises:
+            InferenceQueueFull: If ``max_pending`` calls are already admitted
+        """
+        if self._pending >= self.max_pending:
+            raise InferenceQueueFull(f"Inference queue is full ({self.max_pending} pending)")
+
+        self._pending += 1
+        try:
+            return await asyncio.get_running_loop().run_in_executor(self._pool, func, *args)
+        finally:
+            self._pending -= 1
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "workers": self.max_workers,
+            "pending": self._pending,
+            "capacity": self.max_pending,
+        }
+
+    def shutdown(self) -> None:
+        self._pool.shutdown(wait=False, cancel_futures=True)
@@ -1,11 +1,18 @@
+import asyncio
+import functools
+import hashlib
+import hmac
 import time
 import os
 import logging
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from typing import Optional, Dict, List, Any
-from fastapi import FastAPI, HTTPException, UploadFile, File
+from typing import Optional, Dict, List, Any, Tuple
+from fastapi import FastAPI, HTTPException, UploadFile, File, Header
+from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel, HttpUrl
+from fastapi.responses import JSONResponse, Response
+from pydantic import BaseModel, Field, HttpUrl
 import httpx
 import numpy as np
 import cv2
@@ -25,9 +32,23 @@ else:
     load_dotenv()
 
 # Import custom modules
+import metrics
 from s3_model_loader import S3ModelLoader
-from brain_tumor_models import BrainTumorModel1, BrainTumorModel2
-from ensemble_predictor import EnsemblePredictor
+from ensemble_predictor import EnsemblePredictor, split_thread_budget
+from batch_scheduler import BatchScheduler
+from inference_executor import InferenceExecutor, InferenceQueueFull
+from prediction_cache import PredictionCache, build_namespace, file_checksum
+from model_readiness import ModelReadiness
+from model_base import MODEL1_PREPROCESS_SPEC, MODEL2_PREPROCESS_SPEC
+from dicom_input import Window, decode_dicom
+from image_ingestion import (
+    ImageHeader,
+    ImageRejected,
+    ImageTooLarge,
+    decode_cv2_reduced,
+    decode_pil_reduced,
+    read_image_stream,
+)
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -63,9 +84,153 @@ MODEL2_KEY = os.getenv(
     "models/brain_tumor/model2/best_model_test6.pth",
 )
 
+# "fp32" or "int8" (statically quantized ResNet18 from quantize_model2.py, native backend only)
+MODEL2_PRECISION = os.getenv("MODEL2_PRECISION", "fp32")
+MODEL2_INT8_KEY = os.getenv(
+    "MODEL2_INT8_KEY",
+    "models/brain_tumor/model2/best_model_test6_int8.pth",
+)
+MODEL2_INT8_REPORT_KEY = os.getenv(
+    "MODEL2_INT8_REPORT_KEY",
+    "models/brain_tumor/model2/best_model_test6_int8.json",
+)
+
+# "native" runs Keras + PyTorch; "onnx" runs the export_onnx.py graphs on onnxruntime
+# and never imports TensorFlow or PyTorch; "stub" serves deterministic stand-ins
+# (stub_models.py) without S3, for load tests
+INFERENCE_BACKEND = os.getenv("INFERENCE_BACKEND", "native")
+MODEL1_ONNX_KEY = os.getenv(
+    "MODEL1_ONNX_KEY",
+    "models/brain_tumor/model1/img_clf.onnx",
+)
+MODEL2_ONNX_KEY = os.getenv(
+    "MODEL2_ONNX_KEY",
+    "models/brain_tumor/model2/best_model_test6.onnx",
+)
+# Simulated forward pass cost of the stub models: per batch plus per image
+STUB_BATCH_LATENCY_MS = float(os.getenv("STUB_BATCH_LATENCY_MS", "10"))
+STUB_IMAGE_LATENCY_MS = float(os.getenv("STUB_IMAGE_LATENCY_MS", "15"))
+
+# Startup threads for model downloads and framework imports, which all run at once;
+# each model joins the ensemble as soon as it is loaded
+MODEL_LOAD_WORKERS = int(os.getenv("MODEL_LOAD_WORKERS", "3"))
+
+# Synthetic passes at the batch sizes the batching layer produces, run after each model
+# loads and before it takes traffic (graph tracing, allocator growth, kernel selection).
+# Empty batch sizes = 1, the powers of two below BATCH_MAX_SIZE, and BATCH_MAX_SIZE.
+MODEL_WARMUP_ENABLED = os.getenv("MODEL_WARMUP_ENABLED", "True") == "True"
+MODEL_WARMUP_ITERATIONS = int(os.getenv("MODEL_WARMUP_ITERATIONS", "2"))
+MODEL_WARMUP_BATCH_SIZES = os.getenv("MODEL_WARMUP_BATCH_SIZES", "")
+
+# Hot model swap through POST /admin/models/reload/ (X-Admin-Token header); disabled when
+# the token is empty. Reloaded models are always warmed up before the swap.
+ML_ADMIN_TOKEN = os.getenv("ML_ADMIN_TOKEN", "")
+
+# Dynamic micro-batching of concurrent prediction requests
+BATCHING_ENABLED = os.getenv("BATCHING_ENABLED", "True") == "True"
+BATCH_MAX_SIZE = int(os.getenv("BATCH_MAX_SIZE", "8"))
+BATCH_MAX_DELAY_MS = float(os.getenv("BATCH_MAX_DELAY_MS", "10"))
+BATCH_UPLOAD_MAX_FILES = int(os.getenv("BATCH_UPLOAD_MAX_FILES", "64"))  # per /predict/brain-tumor/batch/ request
+
+# Run ensemble members concurrently, each with its own intra-op thread budget
+ENSEMBLE_PARALLEL = os.getenv("ENSEMBLE_PARALLEL", "False") == "True"
+ENSEMBLE_THREADS_PER_MODEL = int(os.getenv("ENSEMBLE_THREADS_PER_MODEL", "0"))  # 0 = split cores evenly
+
+# Bounded inference pool; requests beyond INFERENCE_QUEUE_SIZE get 503 + Retry-After
+INFERENCE_WORKERS = int(os.getenv("INFERENCE_WORKERS", "1"))
+INFERENCE_QUEUE_SIZE = int(os.getenv("INFERENCE_QUEUE_SIZE", "32"))
+INFERENCE_RETRY_AFTER_SECONDS = int(os.getenv("INFERENCE_RETRY_AFTER_SECONDS", "2"))
+
+# Content-addressed prediction cache; PREDICTION_CACHE_DIR enables the persistent tier
+PREDICTION_CACHE_ENABLED = os.getenv("PREDICTION_CACHE_ENABLED", "True") == "True"
+PREDICTION_CACHE_MAX_ENTRIES = int(os.getenv("PREDICTION_CACHE_MAX_ENTRIES", "1024"))
+PREDICTION_CACHE_TTL_SECONDS = float(os.getenv("PREDICTION_CACHE_TTL_SECONDS", "86400"))
+PREDICTION_CACHE_DIR = os.getenv("PREDICTION_CACHE_DIR", "")
+PREDICTION_CACHE_DISK_MAX_BYTES = int(os.getenv("PREDICTION_CACHE_DISK_MAX_BYTES", str(512 * 1024 * 1024)))
+
+# Image payload limits: uploads and URL downloads are streamed and refused as soon as
+# they exceed MAX_IMAGE_BYTES, or their header shows more than MAX_IMAGE_PIXELS
+MAX_IMAGE_BYTES = int(os.getenv("MAX_IMAGE_BYTES", str(20 * 1024 * 1024)))
+MAX_IMAGE_PIXELS = int(os.getenv("MAX_IMAGE_PIXELS", "50000000"))
+IMAGE_READ_CHUNK_BYTES = 64 * 1024
+# Decode large images at 1/2, 1/4 or 1/8 scale (cv2.IMREAD_REDUCED_*, PIL JPEG draft),
+# never below the models' input resolution
+REDUCED_DECODE_ENABLED = os.getenv("REDUCED_DECODE_ENABLED", "True") == "True"
+MODEL_INPUT_SIDE = max(max(spec.size) for spec in (MODEL1_PREPROCESS_SPEC, MODEL2_PREPROCESS_SPEC))
+MULTIPART_OVERHEAD_BYTES = 64 * 1024
+# Whole /predict/brain-tumor/batch/ request body, all files together
+BATCH_MAX_BODY_BYTES = int(os.getenv("BATCH_MAX_BODY_BYTES", str(512 * 1024 * 1024)))
+
+# DICOM input: a multi-frame series is one file, predicted frame by frame on the batch
+# endpoint. Window center/width override the files' own VOI window when both are set.
+DICOM_MAX_BYTES = int(os.getenv("DICOM_MAX_BYTES", str(256 * 1024 * 1024)))
+DICOM_MAX_FRAMES = int(os.getenv("DICOM_MAX_FRAMES", "256"))  # per request
+DICOM_WINDOW_CENTER = os.getenv("DICOM_WINDOW_CENTER", "")
+DICOM_WINDOW_WIDTH = os.getenv("DICOM_WINDOW_WIDTH", "")
+
+# Shared outbound HTTP client for image downloads: pooled keep-alive connections,
+# HTTP/2 when enabled and the h2 package is installed
+HTTP_MAX_CONNECTIONS = int(os.getenv("HTTP_MAX_CONNECTIONS", "20"))
+HTTP_MAX_KEEPALIVE_CONNECTIONS = int(os.getenv("HTTP_MAX_KEEPALIVE_CONNECTIONS", "10"))
+HTTP_KEEPALIVE_EXPIRY = float(os.getenv("HTTP_KEEPALIVE_EXPIRY", "30"))
+HTTP2_ENABLED = os.getenv("HTTP2_ENABLED", "False") == "True"
+
 # Global variables for models
 s3_loader = None
 ensemble_predictor = None
+batch_scheduler = None
+prediction_cache = None
+http_client = None
+http_client_stats = {"requests": 0, "connections_opened": 0}
+model_readiness = ModelReadiness()
+model_checksums: Dict[str, List[str]] = {}
+model_loading_task = None
+model_reloads: Dict[str, Dict[str, Any]] = {}
+model_reload_tasks: Dict[str, asyncio.Task] = {}
+model_load_pool = ThreadPoolExecutor(max_workers=MODEL_LOAD_WORKERS, thread_name_prefix="model-load")
+inference_executor = InferenceExecutor(
+    max_workers=INFERENCE_WORKERS,
+    max_pending=INFERENCE_QUEUE_SIZE,
+)
+metrics.track_queue_depths(
+    lambda: batch_scheduler.queue_depth if batch_scheduler is not None else 0,
+    lambda: inference_executor.pending,
+)
+
+
+@app.middleware("http")
+async def reject_oversized_bodies(request, call_next):
+    """Refuse uploads whose Content-Length is over the limit before the form is parsed and spooled"""
+    if request.url.path.startswith("/predict/"):
+        limit = max(MAX_IMAGE_BYTES, DICOM_MAX_BYTES) + MULTIPART_OVERHEAD_BYTES
+        if request.url.path.endswith("/batch/"):
+            limit = BATCH_MAX_BODY_BYTES
+        length = request.headers.get("content-length", "")
+        if length.isdigit() and int(length) > limit:
+            logger.warning(f"Rejected {request.url.path} body of {length} bytes")
+            return JSONResponse(status_code=413, content={"detail": f"Request body is larger than {limit} bytes"})
+    return await call_next(request)
+
+
+@app.middleware("http")
+async def record_request_metrics(request, call_next):
+    """Count prediction requests in flight and time them per endpoint"""
+    path = request.url.path
+    if not path.startswith("/predict/"):
+        return await call_next(request)
+    # Only known routes become label values, so unknown paths cannot grow the series count
+    endpoint = path if path in prediction_routes() else "other"
+    started = time.perf_counter()
+    metrics.REQUESTS_IN_FLIGHT.inc()
+    try:
+        return await call_next(request)
+    finally:
+        metrics.REQUESTS_IN_FLIGHT.dec()
+        metrics.REQUEST_SECONDS.labels(endpoint).observe(time.perf_counter() - started)
+
+
+def prediction_routes() -> set:
+    return {route.path for route in app.routes if route.path.startswith("/predict/")}
 
 
 class PredictionRequest(BaseModel):
@@ -84,6 +249,16 @@ class BrainTumorPredictionResponse(BaseModel):
     strategy: str
     predicted_class: Optional[str] = None
     class_probabilities: Optional[Dict[str, float]] = None
+    cached: bool = False
+    source_file: Optional[int] = None  # batch uploads: index of the uploaded file
+    frame: Optional[int] = None  # DICOM: frame within the file
+
+
+class BatchPredictionResponse(BaseModel):
+    results: List[BrainTumorPredictionResponse]
+    batch_size: int
+    model_version: str
+    processing_time: float
 
 
 class HealthResponse(BaseModel):
@@ -91,14 +266,341 @@ class HealthResponse(BaseModel):
     models_loaded: int
     version: str
     models_info: list
+    inference: Optional[Dict[str, Any]] = None
+    cache: Optional[Dict[str, Any]] = None
+    http_client: Optional[Dict[str, Any]] = None
+    models_status: Optional[Dict[str, Any]] = None
+    startup: Optional[Dict[str, Any]] = None
+    reloads: Optional[Dict[str, Any]] = None
+
+
+class ModelReloadRequest(BaseModel):
+    model: str
+    s3_key: Optional[str] = None  # defaults to the configured key, re-fetched if it changed in S3
+    version: Optional[str] = Field(None, max_length=20)  # stored in Transaction.model_version
+
+
+def model_sources() -> Dict[str, List[Tuple[str, bool]]]:
+    """
+    S3 files each ensemble member loads from, for INFERENCE_BACKEND and MODEL2_PRECISION
+
+    Returns:
+        Model name -> list of (S3 key, required) in ``load_model`` argument order.
+        Optional files (Model 1's .h5 fallback, the int8 quantization report)
+        are passed as None when their download fails.
+    """
+    if MODEL2_PRECISION not in ("fp32", "int8"):
+        raise ValueError(f"Unknown MODEL2_PRECISION: {MODEL2_PRECISION}")
+
+    if INFERENCE_BACKEND == "stub":
+        return {"BrainTumorModel1": [], "BrainTumorModel2": []}
+
+    if INFERENCE_BACKEND == "onnx":
+        if MODEL2_PRECISION != "fp32":
+            raise ValueError("MODEL2_PRECISION=int8 requires INFERENCE_BACKEND=native")
+        return {
+            "BrainTumorModel1": [(MODEL1_ONNX_KEY, True)],
+            "BrainTumorModel2": [(MODEL2_ONNX_KEY, True)],
+        }
+    if INFERENCE_BACKEND != "native":
+        raise ValueError(f"Unknown INFERENCE_BACKEND: {INFERENCE_BACKEND}")
+
+    model1_sources = [(MODEL1_PRIMARY_KEY, True)]
+    if MODEL1_FALLBACK_KEY:
+        model1_sources.append((MODEL1_FALLBACK_KEY, False))
+    if MODEL2_PRECISION == "int8":
+        model2_sources = [(MODEL2_INT8_KEY, True), (MODEL2_INT8_REPORT_KEY, False)]
+    else:
+        model2_sources = [(MODEL2_KEY, True)]
+    return {"BrainTumorModel1": model1_sources, "BrainTumorModel2": model2_sources}
+
+
+def import_model_classes() -> Dict[str, type]:
+    """Import the inference framework(s) and return the class of each ensemble member"""
+    if INFERENCE_BACKEND == "stub":
+        from stub_models import StubBrainTumorModel1, StubBrainTumorModel2
+        latency = {"batch_latency_ms": STUB_BATCH_LATENCY_MS, "image_latency_ms": STUB_IMAGE_LATENCY_MS}
+        return {
+            "BrainTumorModel1": functools.partial(StubBrainTumorModel1, **latency),
+            "BrainTumorModel2": functools.partial(StubBrainTumorModel2, **latency),
+        }
+    if INFERENCE_BACKEND == "onnx":
+        from onnx_models import OnnxBrainTumorModel1, OnnxBrainTumorModel2
+        return {"BrainTumorModel1": OnnxBrainTumorModel1, "BrainTumorModel2": OnnxBrainTumorModel2}
+
+    from brain_tumor_models import BrainTumorModel1, BrainTumorModel2, QuantizedBrainTumorModel2
+    return {
+        "BrainTumorModel1": BrainTumorModel1,
+        "BrainTumorModel2": QuantizedBrainTumorModel2 if MODEL2_PRECISION == "int8" else BrainTumorModel2,
+    }
+
+
+def download_model_files(sources: List[Tuple[str, bool]]) -> List[Optional[Path]]:
+    """Download one model's files from S3; failed optional files become None"""
+    paths = []
+    for key, required in sources:
+        try:
+            paths.append(s3_loader.download_model(key))
+        except Exception as e:
+            if required:
+                raise
+            logger.warning(f"Optional model file download failed ({key}): {e}")
+            paths.append(None)
+    return paths
+
+
+def model_file_checksums(paths: List[Optional[Path]]) -> List[str]:
+    """SHA-256 of each model file, from the S3 manifest when there is one"""
+    checksums = []
+    for path in paths:
+        if path is not None:
+            checksums.append(s3_loader.manifest_sha256(path) or file_checksum(path))
+    return checksums
+
+
+def build_model(model_class: type, paths: List[Optional[Path]], threads_per_model: Optional[int]):
+    """Instantiate and load one model; constructing ResNet18 alone takes a noticeable moment"""
+    model = model_class()
+    if threads_per_model:
+        # Must happen before load: TensorFlow and onnxruntime fix their thread pools on first use
+        model.set_num_threads(threads_per_model)
+    model.load_model(*paths)
+    return model
+
+
+def timed_import_model_classes() -> Dict[str, type]:
+    with model_readiness.phase(None, "import"):
+        return import_model_classes()
+
+
+async def load_models(sources: Dict[str, List[Tuple[str, bool]]]) -> None:
+    """
+    Download, import and load all models concurrently
+
+    The framework import overlaps the S3 downloads, and each model is added
+    to the ensemble as soon as it is loaded and warmed up, so the service
+    starts answering with whichever models are ready.
+    """
+    loop = asyncio.get_running_loop()
+
+    threads_per_model = None
+    if ENSEMBLE_PARALLEL:
+        threads_per_model = ENSEMBLE_THREADS_PER_MODEL or split_thread_budget(len(sources))
+        logger.info(f"Parallel ensemble: {threads_per_model} intra-op threads per model")
+
+    for name in sources:
+        model_readiness.loading(name)
+    model_classes = loop.run_in_executor(model_load_pool, timed_import_model_classes)
+
+    await asyncio.gather(*(
+        load_one_model(name, keys, model_classes, threads_per_model)
+        for name, keys in sources.items()
+    ))
+
+    readiness = model_readiness.snapshot()
+    logger.info(f"Model loading finished: startup={readiness['startup']}")
+    for name, entry in readiness["models"].items():
+        logger.info(f"{name}: {entry['status']} timings={entry['timings']}")
+
+
+async def load_one_model(
+    name: str,
+    sources: List[Tuple[str, bool]],
+    model_classes: asyncio.Future,
+    threads_per_model: Optional[int],
+) -> None:
+    """Download and load one model, then add it to the serving ensemble"""
+    loop = asyncio.get_running_loop()
+    try:
+        with model_readiness.phase(name, "download"):
+            paths = await loop.run_in_executor(model_load_pool, download_model_files, sources)
+
+        with model_readiness.phase(name, "import_wait"):
+            model_class = (await model_classes)[name]
+
+        with model_readiness.phase(name, "load"):
+            model = await loop.run_in_executor(
+                model_load_pool, build_model, model_class, paths, threads_per_model
+            )
+
+        with model_readiness.phase(name, "checksum"):
+            checksums = await loop.run_in_executor(model_load_pool, model_file_checksums, paths)
+
+        if MODEL_WARMUP_ENABLED:
+            # Not serving until warmed up, so no patient request pays the first-call cost
+            model_readiness.warming_up(name)
+            with model_readiness.phase(name, "warmup"):
+                await loop.run_in_executor(
+                    model_load_pool, warm_up_model, model, warmup_batch_sizes(), MODEL_WARMUP_ITERATIONS
+                )
+    except Exception as e:
+        logger.error(f"Error loading {name}: {e}")
+        model_readiness.failed(name, e)
+        return
+
+    await add_ready_model(model, checksums)
+    model_readiness.ready(name)
+    logger.info(f"{name} ready")
+
+
+def cache_namespace(predictor: EnsemblePredictor) -> str:
+    # Checksums of the weights actually on disk, so a re-uploaded model under the same
+    # key never serves stale results; partial ensembles get a namespace of their own
+    checksums = [checksum for name in sorted(model_checksums) for checksum in model_checksums[name]]
+    return build_namespace(predictor.version or MODEL_VERSION, predictor.strategy, checksums)
+
+
+async def add_ready_model(model, checksums: List[str]) -> None:
+    """Start serving with the first loaded model, hot-add the following ones"""
+    global ensemble_predictor, batch_scheduler, prediction_cache
+
+    model_checksums[model.model_name] = checksums
+
+    if ensemble_predictor is not None:
+        ensemble_predictor.add_model(model)
+        if prediction_cache is not None:
+            prediction_cache.namespace = cache_namespace(ensemble_predictor)
+        return
+
+    predictor = EnsemblePredictor(
+        models=[model],
+        strategy="max_confidence",  # Can be changed to "average" or "voting"
+        parallel=ENSEMBLE_PARALLEL,
+        version=MODEL_VERSION,
+    )
+
+    if PREDICTION_CACHE_ENABLED:
+        prediction_cache = PredictionCache(
+            cache_namespace(predictor),
+            max_entries=PREDICTION_CACHE_MAX_ENTRIES,
+            ttl_seconds=PREDICTION_CACHE_TTL_SECONDS,
+            disk_dir=PREDICTION_CACHE_DIR or None,
+            disk_max_bytes=PREDICTION_CACHE_DISK_MAX_BYTES,
+        )
+
+    if BATCHING_ENABLED:
+        batch_scheduler = BatchScheduler(
+            predictor,
+            inference_executor,
+            max_batch_size=BATCH_MAX_SIZE,
+            max_delay_ms=BATCH_MAX_DELAY_MS,
+            max_queue_size=INFERENCE_QUEUE_SIZE,
+        )
+        await batch_scheduler.start()
+
+    ensemble_predictor = predictor
+
+
+def warmup_batch_sizes() -> List[int]:
+    """Batch sizes to warm up: MODEL_WARMUP_BATCH_SIZES, or those the batching layer produces"""
+    if MODEL_WARMUP_BATCH_SIZES:
+        return sorted({int(size) for size in MODEL_WARMUP_BATCH_SIZES.split(",") if size.strip()})
+    sizes = {BATCH_MAX_SIZE}
+    size = 1
+    while size < BATCH_MAX_SIZE:
+        sizes.add(size)
+        size *= 2
+    return sorted(sizes)
+
+
+def warm_up_model(model, batch_sizes: List[int], iterations: int) -> float:
+    """
+    Run synthetic batches through a freshly loaded model
+
+    Args:
+        model: Loaded model, not yet serving
+        batch_sizes: Batch sizes it will see in production
+        iterations: Passes per batch size
+
+    Returns:
+        Seconds taken
+    """
+    rng = np.random.default_rng(0)
+    started = time.perf_counter()
+    for batch_size in batch_sizes:
+        images = [rng.integers(0, 256, size=(224, 224, 3), dtype=np.uint8) for _ in range(batch_size)]
+        for _ in range(iterations):
+            model.predict_batch(images)
+    seconds = round(time.perf_counter() - started, 3)
+    logger.info(
+        f"{model.model_name} warm-up: {seconds}s "
+        f"(batch sizes {batch_sizes}, {iterations} passes each)"
+    )
+    return seconds
+
+
+def default_model_version() -> str:
+    """MODEL_VERSION plus a digest of all loaded weights, short enough for Transaction.model_version"""
+    checksums = "".join(checksum for name in sorted(model_checksums) for checksum in model_checksums[name])
+    return f"{MODEL_VERSION}-{hashlib.sha256(checksums.encode()).hexdigest()[:8]}"
+
+
+async def reload_model(name: str, sources: List[Tuple[str, bool]], version: Optional[str]) -> None:
+    """
+    Load a new version of one model next to the serving one and swap it in
+
+    Download, load and warm-up run on the model-load pool while the current
+    version keeps answering. The swap replaces the ensemble's model list in a
+    single assignment, so requests already running finish on the old version
+    and report it as their model_version.
+
+    Args:
+        name: Ensemble member to replace, e.g. BrainTumorModel2
+        sources: (S3 key, required) files passed to ``load_model``
+        version: Version label for responses; derived from the checksums when None
+    """
+    loop = asyncio.get_running_loop()
+    state = model_reloads[name] = {"status": "loading", "sources": [key for key, _ in sources], "timings": {}}
+
+    threads_per_model = None
+    if ENSEMBLE_PARALLEL:
+        threads_per_model = ENSEMBLE_THREADS_PER_MODEL or split_thread_budget(len(model_sources()))
+
+    try:
+        started = time.perf_counter()
+        paths = await loop.run_in_executor(model_load_pool, download_model_files, sources)
+        model_class = (await loop.run_in_executor(model_load_pool, import_model_classes))[name]
+        model = await loop.run_in_executor(model_load_pool, build_model, model_class, paths, threads_per_model)
+        checksums = await loop.run_in_executor(model_load_pool, model_file_checksums, paths)
+        state["timings"]["load_s"] = round(time.perf_counter() - started, 3)
+
+        state["status"] = "warming_up"
+        state["timings"]["warmup_s"] = await loop.run_in_executor(
+            model_load_pool, warm_up_model, model, warmup_batch_sizes(), max(MODEL_WARMUP_ITERATIONS, 1)
+        )
+    except Exception as e:
+        logger.error(f"Reloading {name} failed, keeping the serving version: {e}")
+        state.update(status="failed", error=str(e))
+        return
+
+    previous_checksums = model_checksums.get(name)
+    model_checksums[name] = checksums
+    version = version or default_model_version()
+    if name in [member.model_name for member in ensemble_predictor.models]:
+        ensemble_predictor.replace_model(model, version)
+    else:
+        # Failed at startup; the reload brings it into the ensemble
+        ensemble_predictor.add_model(model, version)
+        model_readiness.ready(name)
+    # Only after the swap: a result computed by the old model must never be stored
+    # under the new namespace
+    if prediction_cache is not None:
+        prediction_cache.namespace = cache_namespace(ensemble_predictor)
+
+    state.update(status="swapped", version=version)
+    logger.info(
+        f"{name} swapped to version {version} (checksums {previous_checksums} -> {checksums}), "
+        f"timings={state['timings']}"
+    )
 
 
 @app.on_event("startup")
 async def startup_event():
-    """Initialize models on startup"""
-    global s3_loader, ensemble_predictor
+    """Start loading models in the background so /health/ answers right away"""
+    global s3_loader, http_client, model_loading_task
     
     logger.info("Starting Brain Tumor Detection ML Service...")
+    http_client = create_http_client()
     
     try:
         # Initialize S3 loader
@@ -107,44 +609,361 @@ async def startup_event():
             region_name=AWS_REGION
         )
         logger.info("S3 Model Loader initialized")
-        
-        # Download and load Model 1
-        logger.info("Loading Brain Tumor Model 1...")
-        model1 = BrainTumorModel1()
-        
-        model1_primary_path = s3_loader.download_model(MODEL1_PRIMARY_KEY)
+        sources = model_sources()
+    except Exception as e:
+        logger.error(f"Error loading models: {e}")
+        logger.warning("Service will start but predictions may fail")
+        return
 
-        model1_fallback_path = None
-        if MODEL1_FALLBACK_KEY:
-            try:
-                model1_fallback_path = s3_loader.download_model(MODEL1_FALLBACK_KEY)
-            except Exception as fallback_error:
-                logger.warning(
-                    "Fallback model download failed (%s): %s",
-                    MODEL1_FALLBACK_KEY,
-                    fallback_error,
-                )
+    model_loading_task = asyncio.create_task(load_models(sources))
 
-        model1.load_model(model1_primary_path, model1_fallback_path)
-        
-        # Download and load Model 2
-        logger.info("Loading Brain Tumor Model 2...")
-        model2 = BrainTumorModel2()
-        
-        model2_path = s3_loader.download_model(MODEL2_KEY)
-        model2.load_model(model2_path)
-        
-        # Create ensemble predictor
-        ensemble_predictor = EnsemblePredictor(
-            models=[model1, model2],
-            strategy="max_confidence"  # Can be changed to "average" or "voting"
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    """Stop the batching loop so waiting requests fail fast"""
+    global http_client
+    if model_loading_task is not None and not model_loading_task.done():
+        model_loading_task.cancel()
+    for task in model_reload_tasks.values():
+        task.cancel()
+    model_load_pool.shutdown(wait=False)
+    if batch_scheduler is not None:
+        await batch_scheduler.stop()
+    inference_executor.shutdown()
+    if http_client is not None:
+        await http_client.aclose()
+        http_client = None
+
+
+def create_http_client() -> httpx.AsyncClient:
+    http2 = HTTP2_ENABLED
+    if http2:
+        try:
+            import h2  # noqa: F401
+        except ImportError:
+            logger.warning("HTTP2_ENABLED is set but the h2 package is not installed; using HTTP/1.1")
+            http2 = False
+
+    return httpx.AsyncClient(
+        timeout=30.0,
+        http2=http2,
+        limits=httpx.Limits(
+            max_connections=HTTP_MAX_CONNECTIONS,
+            max_keepalive_connections=HTTP_MAX_KEEPALIVE_CONNECTIONS,
+            keepalive_expiry=HTTP_KEEPALIVE_EXPIRY,
+        ),
+    )
+
+
+async def _count_connections(event_name: str, info: Dict[str, Any]) -> None:
+    if event_name == "connection.connect_tcp.complete":
+        http_client_stats["connections_opened"] += 1
+
+
+async def read_image(chunks, declared_length: Optional[int] = None) -> Tuple[bytes, ImageHeader]:
+    """Collect an image body within MAX_IMAGE_BYTES/MAX_IMAGE_PIXELS; rejections become HTTP errors."""
+    try:
+        content, header = await read_image_stream(
+            chunks, MAX_IMAGE_BYTES, MAX_IMAGE_PIXELS, declared_length, DICOM_MAX_BYTES
         )
-        
-        logger.info("All models loaded successfully!")
-        
+    except ImageRejected as e:
+        logger.warning(f"Rejected image: {e}")
+        raise HTTPException(status_code=e.status_code, detail=str(e))
+    if header.frames > DICOM_MAX_FRAMES:
+        raise HTTPException(
+            status_code=413,
+            detail=f"DICOM series has {header.frames} frames; at most {DICOM_MAX_FRAMES} are accepted"
+        )
+    return content, header
+
+
+async def read_upload(file: UploadFile, batch_remaining: Optional[int] = None) -> Tuple[bytes, ImageHeader]:
+    """
+    Read an uploaded image in chunks instead of one unbounded ``file.read()``.
+
+    ``batch_remaining`` is what is left of BATCH_MAX_BODY_BYTES for the files of
+    a batch; bodies sent without Content-Length are only bounded here.
+    """
+    async def chunks():
+        read = 0
+        while chunk := await file.read(IMAGE_READ_CHUNK_BYTES):
+            read += len(chunk)
+            if batch_remaining is not None and read > batch_remaining:
+                raise ImageTooLarge(f"Batch is larger than {BATCH_MAX_BODY_BYTES} bytes")
+            yield chunk
+
+    with metrics.stage_timer("upload"):
+        return await read_image(chunks(), file.size)
+
+
+async def download_image(url: str) -> Tuple[bytes, ImageHeader]:
+    """
+    Stream an image over the shared client, reusing pooled connections.
+
+    The body is read chunk by chunk and abandoned as soon as it is over the
+    limits or turns out not to be an image.
+    """
+    global http_client
+    if http_client is None:
+        http_client = create_http_client()
+    http_client_stats["requests"] += 1
+    with metrics.stage_timer("download"):
+        async with http_client.stream("GET", url, extensions={"trace": _count_connections}) as response:
+            if response.status_code != 200:
+                raise HTTPException(
+                    status_code=400,
+                    detail=f"Unable to download image: HTTP {response.status_code}"
+                )
+            length = response.headers.get("content-length", "")
+            return await read_image(
+                response.aiter_bytes(IMAGE_READ_CHUNK_BYTES),
+                int(length) if length.isdigit() else None,
+            )
+
+
+def inference_stats() -> Dict[str, Any]:
+    stats = inference_executor.stats()
+    stats["batching"] = batch_scheduler is not None
+    stats["batch_queue_depth"] = batch_scheduler.queue_depth if batch_scheduler is not None else 0
+    return stats
+
+
+async def run_ensemble_prediction(image: np.ndarray) -> Dict[str, Any]:
+    """
+    Run the ensemble on one image without blocking the event loop.
+
+    Goes through the batch scheduler when enabled, otherwise straight to the
+    inference pool. Overload is reported as 503 with a Retry-After header.
+    """
+    try:
+        if batch_scheduler is not None:
+            return await batch_scheduler.submit(image)
+        return await inference_executor.run(ensemble_predictor.predict, image)
+    except InferenceQueueFull as e:
+        raise queue_full_error(e)
+
+
+async def run_ensemble_batch(images: List[np.ndarray]) -> List[Dict[str, Any]]:
+    """
+    Run the ensemble on an already assembled batch as one forward pass per model.
+
+    Bypasses the batch scheduler but shares its inference pool and admission control.
+    """
+    try:
+        return await inference_executor.run(ensemble_predictor.predict_batch, images)
+    except InferenceQueueFull as e:
+        raise queue_full_error(e)
+
+
+def queue_full_error(error: InferenceQueueFull) -> HTTPException:
+    logger.warning(f"Rejecting prediction: {error}")
+    return HTTPException(
+        status_code=503,
+        detail="Inference queue is full. Please retry later.",
+        headers={"Retry-After": str(INFERENCE_RETRY_AFTER_SECONDS)},
+    )
+
+
+def decode_pil_image(content: bytes, header: Optional[ImageHeader] = None) -> np.ndarray:
+    """Decode downloaded image bytes with PIL into a BGR numpy array."""
+    if header is not None and REDUCED_DECODE_ENABLED:
+        return decode_pil_reduced(content, header, MODEL_INPUT_SIDE)
+    pil_image = Image.open(BytesIO(content))
+    return cv2.cvtColor(np.array(pil_image), cv2.COLOR_RGB2BGR)
+
+
+def decode_cv2_image(content: bytes, header: Optional[ImageHeader] = None) -> Optional[np.ndarray]:
+    """Decode uploaded image bytes with OpenCV; returns None for invalid data."""
+    if header is not None and REDUCED_DECODE_ENABLED:
+        return decode_cv2_reduced(content, header, MODEL_INPUT_SIDE)
+    return cv2.imdecode(np.frombuffer(content, np.uint8), cv2.IMREAD_COLOR)
+
+
+def dicom_window() -> Optional[Window]:
+    if DICOM_WINDOW_CENTER and DICOM_WINDOW_WIDTH:
+        return Window(float(DICOM_WINDOW_CENTER), float(DICOM_WINDOW_WIDTH))
+    return None
+
+
+def decode_dicom_frames(content: bytes) -> Optional[List[np.ndarray]]:
+    """Windowed float32 frames of a DICOM file; None for invalid or unsupported pixel data."""
+    try:
+        return decode_dicom(content, dicom_window())
     except Exception as e:
-        logger.error(f"Error loading models: {e}")
-        logger.warning("Service will start but predictions may fail")
+        logger.warning(f"DICOM decode failed: {e}")
+        return None
+
+
+def decode_dicom_image(content: bytes, header: Optional[ImageHeader] = None) -> Optional[np.ndarray]:
+    """Single-frame DICOM decoder for the one-image endpoints."""
+    frames = decode_dicom_frames(content)
+    return frames[0] if frames else None
+
+
+def decoder_cache_name(decoder_name: str) -> str:
+    if decoder_name == "dicom":
+        # Results depend on the window applied to the stored values
+        window = dicom_window()
+        return f"dicom-{window.key}" if window is not None else "dicom"
+    # Reduced decoding changes pixels slightly, so its results are cached apart
+    return f"{decoder_name}-reduced" if REDUCED_DECODE_ENABLED else decoder_name
+
+
+async def predict_image_bytes(
+    content: bytes,
+    decoder,
+    decoder_name: str,
+    header: Optional[ImageHeader] = None,
+) -> Dict[str, Any]:
+    """
+    Predict from raw image bytes, consulting the prediction cache first
+
+    A cache hit skips both decoding and inference.
+
+    Args:
+        content: Image file bytes
+        decoder: Function turning the bytes (and header) into a BGR numpy array
+        decoder_name: Part of the cache key, since decoders may differ slightly
+        header: Sniffed format and dimensions, used to pick the decode resolution
+
+    Returns:
+        Ensemble result, with ``cached`` set when it came from the cache
+    """
+    if header is not None and header.format == "DICOM":
+        if header.frames > 1:
+            raise HTTPException(
+                status_code=400,
+                detail=f"DICOM series with {header.frames} frames: use /predict/brain-tumor/batch/"
+            )
+        decoder, decoder_name = decode_dicom_image, "dicom"
+
+    cache_key = None
+    if prediction_cache is not None:
+        # Hashing a large upload and reading the disk tier both block
+        cache_key = await run_in_threadpool(prediction_cache.key, content, decoder_cache_name(decoder_name))
+        cached = await run_in_threadpool(prediction_cache.get, cache_key)
+        if cached is not None:
+            return {**cached, "cached": True}
+
+    image = await run_in_threadpool(metrics.timed_call, "decode", decoder, content, header)
+    if image is None:
+        raise HTTPException(
+            status_code=400,
+            detail="Invalid image file"
+        )
+
+    result = await run_ensemble_prediction(image)
+
+    if cache_key is not None:
+        await run_in_threadpool(prediction_cache.set, cache_key, result)
+    return result
+
+
+async def predict_image_batch(
+    contents: List[bytes],
+    headers: Optional[List[ImageHeader]] = None,
+) -> List[Dict[str, Any]]:
+    """
+    Predict several uploaded images (e.g. the slices of one study)
+
+    Every frame of a multi-frame DICOM file counts as one image, so a whole
+    series is predicted in one request. Cached images are answered directly;
+    the rest are decoded and run through the ensemble in chunks of
+    BATCH_MAX_SIZE, one batched forward pass each.
+
+    Args:
+        contents: Image file bytes, in slice order
+        headers: Sniffed header of each image, used to pick the decoder and resolution
+
+    Returns:
+        Ensemble results in upload order (DICOM frames in frame order), each
+        with ``source_file`` and, for DICOM, ``frame``
+    """
+    headers = headers or [None] * len(contents)
+    # One (file index, frame) per image to predict; frame is None for non-DICOM files
+    entries: List[Tuple[int, Optional[int]]] = []
+    for file_index, header in enumerate(headers):
+        if header is not None and header.format == "DICOM":
+            entries.extend((file_index, frame) for frame in range(header.frames))
+        else:
+            entries.append((file_index, None))
+
+    results: List[Optional[Dict[str, Any]]] = [None] * len(entries)
+    cache_keys: List[Optional[str]] = [None] * len(entries)
+
+    def lookup_cached() -> None:
+        digests: Dict[int, bytes] = {}
+        for index, (file_index, frame) in enumerate(entries):
+            if frame is None:
+                decoder_name = decoder_cache_name("cv2")
+            else:
+                decoder_name = f"{decoder_cache_name('dicom')}#{frame}"
+            if file_index not in digests:
+                digests[file_index] = hashlib.sha256(contents[file_index]).digest()
+            cache_keys[index] = prediction_cache.key(contents[file_index], decoder_name, digests[file_index])
+            cached = prediction_cache.get(cache_keys[index])
+            if cached is not None:
+                results[index] = {**cached, "cached": True}
+
+    if prediction_cache is not None:
+        # Hashing the uploads and reading the disk tier both block
+        await run_in_threadpool(lookup_cached)
+    misses = [index for index, result in enumerate(results) if result is None]
+
+    def decode_misses() -> List[Optional[np.ndarray]]:
+        series: Dict[int, Optional[List[np.ndarray]]] = {}
+        images = []
+        for index in misses:
+            file_index, frame = entries[index]
+            if frame is None:
+                images.append(decode_cv2_image(contents[file_index], headers[file_index]))
+                continue
+            if file_index not in series:
+                # Each series is decoded once for all of its frames
+                series[file_index] = decode_dicom_frames(contents[file_index])
+            frames = series[file_index]
+            images.append(frames[frame] if frames is not None and frame < len(frames) else None)
+        return images
+
+    images = await run_in_threadpool(metrics.timed_call, "decode", decode_misses)
+    invalid = sorted({entries[index][0] for index, image in zip(misses, images) if image is None})
+    if invalid:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Invalid image file at positions {invalid}"
+        )
+
+    for start in range(0, len(misses), BATCH_MAX_SIZE):
+        chunk = misses[start:start + BATCH_MAX_SIZE]
+        chunk_results = await run_ensemble_batch(images[start:start + BATCH_MAX_SIZE])
+        for index, result in zip(chunk, chunk_results):
+            results[index] = result
+            if cache_keys[index] is not None:
+                await run_in_threadpool(prediction_cache.set, cache_keys[index], result)
+
+    return [
+        {**result, "source_file": file_index, "frame": frame}
+        for result, (file_index, frame) in zip(results, entries)
+    ]
+
+
+def build_prediction_response(result: Dict[str, Any], processing_time: float) -> BrainTumorPredictionResponse:
+    return BrainTumorPredictionResponse(
+        diagnosis=result["diagnosis"],
+        has_tumor=result["has_tumor"],
+        tumor_probability=result["tumor_probability"],
+        confidence=result["confidence"],
+        selected_model=result["selected_model"],
+        model_version=result.get("model_version") or MODEL_VERSION,
+        processing_time=processing_time,
+        all_predictions=result["all_predictions"],
+        strategy=result["strategy"],
+        predicted_class=result.get("predicted_class"),
+        class_probabilities=result.get("class_probabilities"),
+        cached=result.get("cached", False),
+        source_file=result.get("source_file"),
+        frame=result.get("frame"),
+    )
 
 
 @app.get("/health/", response_model=HealthResponse)
@@ -154,24 +973,95 @@ async def health_check():
     """
     global ensemble_predictor
     
+    # Per-model loading/ready/failed state and cold-start phase timings
+    readiness = model_readiness.snapshot()
+    
     if ensemble_predictor is None:
         return {
-            "status": "models_not_loaded",
+            "status": model_readiness.status(),
             "models_loaded": 0,
             "version": MODEL_VERSION,
-            "models_info": []
+            "models_info": [],
+            "inference": inference_stats(),
+            "cache": None,
+            "http_client": dict(http_client_stats),
+            "models_status": readiness["models"],
+            "startup": readiness["startup"],
+            "reloads": model_reloads,
         }
     
     models_info = ensemble_predictor.get_model_info()
     
     return {
-        "status": "ready",
+        "status": model_readiness.status() if readiness["models"] else "ready",
         "models_loaded": len(models_info),
-        "version": MODEL_VERSION,
-        "models_info": models_info
+        "version": ensemble_predictor.version or MODEL_VERSION,
+        "models_info": models_info,
+        "inference": inference_stats(),
+        "cache": prediction_cache.stats() if prediction_cache is not None else None,
+        "http_client": dict(http_client_stats),
+        "models_status": readiness["models"],
+        "startup": readiness["startup"],
+        "reloads": model_reloads,
     }
 
 
+@app.get("/metrics")
+async def prometheus_metrics():
+    """
+    Prometheus scrape endpoint.
+
+    Per-stage latency histograms (download, upload, decode, preprocess,
+    combine), per-model inference time, batch sizes, request latency per
+    endpoint, requests in flight and the batch/inference queue depths.
+    """
+    body, content_type = metrics.render()
+    return Response(content=body, media_type=content_type)
+
+
+@app.post("/admin/models/reload/", status_code=202)
+async def reload_model_endpoint(
+    request: ModelReloadRequest,
+    x_admin_token: Optional[str] = Header(None),
+):
+    """
+    Load a new version of one model in the background and swap it in once warmed up.
+
+    The serving version keeps answering until the swap; progress is reported
+    under ``reloads`` in /health/.
+
+    Args:
+        request: Model name, optional S3 key (defaults to the configured one) and version label
+        x_admin_token: Must match ML_ADMIN_TOKEN
+
+    Returns:
+        The accepted reload
+    """
+    if not ML_ADMIN_TOKEN:
+        raise HTTPException(status_code=403, detail="Model reload is disabled (ML_ADMIN_TOKEN is not set)")
+    if not x_admin_token or not hmac.compare_digest(x_admin_token, ML_ADMIN_TOKEN):
+        raise HTTPException(status_code=401, detail="Invalid admin token")
+
+    if ensemble_predictor is None or s3_loader is None:
+        raise HTTPException(status_code=503, detail="Models not loaded. Please check service health.")
+
+    sources = model_sources()
+    if request.model not in sources:
+        raise HTTPException(status_code=404, detail=f"Unknown model: {request.model}")
+
+    running = model_reload_tasks.get(request.model)
+    if running is not None and not running.done():
+        raise HTTPException(status_code=409, detail=f"{request.model} is already being reloaded")
+
+    # A new key replaces the configured files; optional extras (the .h5 fallback,
+    # the int8 report) belong to the configured weights
+    keys = [(request.s3_key, True)] if request.s3_key else sources[request.model]
+    model_reload_tasks[request.model] = asyncio.create_task(
+        reload_model(request.model, keys, request.version)
+    )
+    return {"model": request.model, "sources": [key for key, _ in keys], "status": "loading"}
+
+
 @app.post("/predict/brain-tumor/", response_model=BrainTumorPredictionResponse)
 async def predict_brain_tumor(file: UploadFile = File(...)):
     """
@@ -198,42 +1088,95 @@ async def predict_brain_tumor(file: UploadFile = File(...)):
         )
     
     try:
-        # Read uploaded file
-        contents = await file.read()
+        # Read uploaded file, refusing oversized or non-image payloads before decoding
+        contents, header = await read_upload(file)
+        
+        # Decode and run ensemble prediction, unless the result is cached
+        result = await predict_image_bytes(contents, decode_cv2_image, "cv2", header)
         
-        # Convert to numpy array
-        nparr = np.frombuffer(contents, np.uint8)
-        image = cv2.imdecode(nparr, cv2.IMREAD_COLOR)
+        processing_time = round(time.time() - start_time, 2)
+        
+        return build_prediction_response(result, processing_time)
         
-        if image is None:
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Prediction error: {e}")
+        raise HTTPException(
+            status_code=500,
+            detail=f"Prediction error: {str(e)}"
+        )
+
+
+@app.post("/predict/brain-tumor/batch/", response_model=BatchPredictionResponse)
+async def predict_brain_tumor_batch(files: List[UploadFile] = File(...)):
+    """
+    Predict brain tumor for several uploaded images, e.g. the slices of one MRI study.
+    
+    Images are run through the ensemble together instead of one request each.
+    A multi-frame DICOM file is expanded into one prediction per frame.
+    
+    Args:
+        files: Uploaded image or DICOM files, in slice order
+        
+    Returns:
+        One prediction per file (per frame for DICOM series), in the order they were sent
+    """
+    start_time = time.time()
+    
+    if ensemble_predictor is None:
+        raise HTTPException(
+            status_code=503,
+            detail="Models not loaded. Please check service health."
+        )
+    
+    if len(files) > BATCH_UPLOAD_MAX_FILES:
+        raise HTTPException(
+            status_code=400,
+            detail=f"At most {BATCH_UPLOAD_MAX_FILES} images per batch"
+        )
+    
+    try:
+        uploads, invalid = [], []
+        batch_remaining = BATCH_MAX_BODY_BYTES
+        for index, file in enumerate(files):
+            try:
+                uploads.append(await read_upload(file, batch_remaining))
+                batch_remaining -= len(uploads[-1][0])
+            except HTTPException as e:
+                if e.status_code != 400:
+                    raise HTTPException(status_code=e.status_code, detail=f"{e.detail} (position {index})")
+                invalid.append(index)
+        if invalid:
             raise HTTPException(
                 status_code=400,
-                detail="Invalid image file"
+                detail=f"Invalid image file at positions {invalid}"
             )
-        
-        # Run ensemble prediction
-        result = ensemble_predictor.predict(image)
+        frames = sum(header.frames for _, header in uploads if header.format == "DICOM")
+        if frames > DICOM_MAX_FRAMES:
+            raise HTTPException(
+                status_code=413,
+                detail=f"{frames} DICOM frames in one request; at most {DICOM_MAX_FRAMES} are accepted"
+            )
+        results = await predict_image_batch(
+            [content for content, _ in uploads], [header for _, header in uploads]
+        )
         
         processing_time = round(time.time() - start_time, 2)
         
-        return BrainTumorPredictionResponse(
-            diagnosis=result["diagnosis"],
-            has_tumor=result["has_tumor"],
-            tumor_probability=result["tumor_probability"],
-            confidence=result["confidence"],
-            selected_model=result["selected_model"],
-            model_version=MODEL_VERSION,
+        responses = [build_prediction_response(result, processing_time) for result in results]
+        return BatchPredictionResponse(
+            results=responses,
+            batch_size=len(results),
+            # Each result carries its own version; a swap mid-study shows up there
+            model_version=responses[-1].model_version,
             processing_time=processing_time,
-            all_predictions=result["all_predictions"],
-            strategy=result["strategy"],
-            predicted_class=result.get("predicted_class"),
-            class_probabilities=result.get("class_probabilities"),
         )
         
     except HTTPException:
         raise
     except Exception as e:
-        logger.error(f"Prediction error: {e}")
+        logger.error(f"Batch prediction error: {e}")
         raise HTTPException(
             status_code=500,
             detail=f"Prediction error: {str(e)}"
@@ -266,39 +1209,15 @@ async def predict_brain_tumor_url(request: PredictionRequest):
         )
     
     try:
-        # Download image from URL
-        async with httpx.AsyncClient(timeout=30.0) as client:
-            response = await client.get(str(request.image_url))
-            
-            if response.status_code != 200:
-                raise HTTPException(
-                    status_code=400,
-                    detail=f"Unable to download image: HTTP {response.status_code}"
-                )
-            
-            # Convert to numpy array
-            image_bytes = BytesIO(response.content)
-            pil_image = Image.open(image_bytes)
-            image = cv2.cvtColor(np.array(pil_image), cv2.COLOR_RGB2BGR)
+        # Download image from URL, streamed and size-capped
+        content, header = await download_image(str(request.image_url))
         
-        # Run ensemble prediction
-        result = ensemble_predictor.predict(image)
+        # Decode and run ensemble prediction, unless the result is cached
+        result = await predict_image_bytes(content, decode_pil_image, "pil", header)
         
         processing_time = round(time.time() - start_time, 2)
         
-        return BrainTumorPredictionResponse(
-            diagnosis=result["diagnosis"],
-            has_tumor=result["has_tumor"],
-            tumor_probability=result["tumor_probability"],
-            confidence=result["confidence"],
-            selected_model=result["selected_model"],
-            model_version=MODEL_VERSION,
-            processing_time=processing_time,
-            all_predictions=result["all_predictions"],
-            strategy=result["strategy"],
-            predicted_class=result.get("predicted_class"),
-            class_probabilities=result.get("class_probabilities"),
-        )
+        return build_prediction_response(result, processing_time)
         
     except HTTPException:
         raise
@@ -363,7 +1282,10 @@ async def root():
             "/health/",
             "/predict/",  # Legacy endpoint for backward compatibility
             "/predict/brain-tumor/",
+            "/predict/brain-tumor/batch/",
             "/predict/brain-tumor-url/",
+            "/admin/models/reload/",
+            "/metrics",
             "/docs"
         ],
         "features": [
@@ -371,6 +1293,8 @@ async def root():
             "Automatic model selection based on confidence",
             "S3-based model storage",
             "Support for both file upload and URL-based prediction",
+            "Native DICOM input, multi-frame series predicted as one batch",
+            "Prometheus metrics with per-stage latency histograms",
             "Backward compatible with existing backend"
         ]
     }
@@ -0,0 +1,95 @@
+"""
+Prometheus metrics for the ML service
+
+Stage histograms are bound to their label values once at import, so timing a
+stage on the request path costs two ``perf_counter`` calls and one bucket
+increment. Queue gauges are read from the scheduler and executor at scrape
+time and cost nothing per request.
+"""
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, Tuple
+
+from prometheus_client import CONTENT_TYPE_LATEST, Gauge, Histogram, generate_latest
+
+# Per-stage latencies range from sub-millisecond (combine) to seconds (download, CPU inference)
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+STAGES = ("download", "upload", "decode", "preprocess", "combine")
+
+STAGE_SECONDS = Histogram(
+    "ml_stage_duration_seconds",
+    "Time spent in each stage of a prediction",
+    ["stage"],
+    buckets=LATENCY_BUCKETS,
+)
+MODEL_INFERENCE_SECONDS = Histogram(
+    "ml_model_inference_seconds",
+    "Forward pass time of one batch, per model",
+    ["model"],
+    buckets=LATENCY_BUCKETS,
+)
+BATCH_SIZE = Histogram(
+    "ml_batch_size",
+    "Images per ensemble forward pass",
+    buckets=(1, 2, 4, 8, 16, 32, 64),
+)
+REQUEST_SECONDS = Histogram(
+    "ml_request_duration_seconds",
+    "End-to-end request time per endpoint",
+    ["endpoint"],
+    buckets=LATENCY_BUCKETS,
+)
+REQUESTS_IN_FLIGHT = Gauge(
+    "ml_requests_in_flight",
+    "Prediction requests currently being handled",
+)
+BATCH_QUEUE_DEPTH = Gauge(
+    "ml_batch_queue_depth",
+    "Images waiting in the batch scheduler for a batch to form",
+)
+INFERENCE_PENDING = Gauge(
+    "ml_inference_pending",
+    "Inference calls running or waiting for an inference thread",
+)
+
+_stage_children: Dict[str, Histogram] = {stage: STAGE_SECONDS.labels(stage) for stage in STAGES}
+
+
+def observe_stage(stage: str, seconds: float) -> None:
+    _stage_children[stage].observe(seconds)
+
+
+@contextmanager
+def stage_timer(stage: str) -> Iterator[None]:
+    """Time the enclosed block as ``stage``; failures are timed too."""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        _stage_children[stage].observe(time.perf_counter() - started)
+
+
+def timed_call(stage: str, func: Callable, *args):
+    """Call ``func(*args)`` timed as ``stage``; for work handed to a thread pool."""
+    with stage_timer(stage):
+        return func(*args)
+
+
+def observe_model_inference(model_name: str, seconds: float) -> None:
+    MODEL_INFERENCE_SECONDS.labels(model_name).observe(seconds)
+
+
+def observe_batch(batch_size: int) -> None:
+    BATCH_SIZE.observe(batch_size)
+
+
+def track_queue_depths(batch_queue_depth: Callable[[], int], inference_pending: Callable[[], int]) -> None:
+    """Read the queue gauges from these callables whenever metrics are scraped."""
+    BATCH_QUEUE_DEPTH.set_function(batch_queue_depth)
+    INFERENCE_PENDING.set_function(inference_pending)
+
+
+def render() -> Tuple[bytes, str]:
+    """Current metrics in the Prometheus text format, with their content type."""
+    return generate_latest(), CONTENT_TYPE_LATEST
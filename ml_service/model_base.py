@@ -0,0 +1,138 @@
+"""
+Framework-independent pieces of the brain tumor models.
+
+Kept free of TensorFlow and PyTorch imports so that backends which do not
+need them (ONNX Runtime) and the ensemble can be imported without paying
+for either framework.
+"""
+
+from __future__ import annotations
+
+import logging
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from preprocessing import IMAGENET_MEAN, IMAGENET_STD, PreprocessSpec, preprocess_batch
+
+logger = logging.getLogger(__name__)
+
+NO_TUMOR_CLASS_NAMES = {"notumor", "no_tumor", "no-tumor", "no", "none"}
+
+# Inputs of the two ensemble members, shared by every backend that runs them
+MODEL1_PREPROCESS_SPEC = PreprocessSpec(size=(224, 224))
+MODEL2_PREPROCESS_SPEC = PreprocessSpec(
+    size=(224, 224),
+    mean=IMAGENET_MEAN,
+    std=IMAGENET_STD,
+    channels_first=True,
+)
+MODEL2_CLASS_NAMES = ["glioma", "meningioma", "notumor", "pituitary"]
+
+
+class BrainTumorModelBase:
+    """Base class for brain tumor detection models.
+
+    Models that set ``preprocess_spec`` only implement ``predict_preprocessed``;
+    the ensemble can then share one preprocessing pass between models.
+    """
+
+    preprocess_spec: Optional[PreprocessSpec] = None
+    backend = "native"
+    precision = "fp32"
+
+    def __init__(self, model_name: str) -> None:
+        self.model_name = model_name
+        self.model = None
+        self.is_loaded = False
+        self.num_threads: Optional[int] = None
+
+    def set_num_threads(self, num_threads: int) -> None:
+        """Limit intra-op threads used by this model's forward pass."""
+        self.num_threads = num_threads
+
+    def preprocess_image(self, image: np.ndarray):
+        raise NotImplementedError
+
+    def predict(self, image: np.ndarray) -> Tuple[float, Dict]:
+        raise NotImplementedError
+
+    def predict_batch(self, images: List[np.ndarray]) -> List[Tuple[float, Dict]]:
+        """Predict several images; subclasses run them as one stacked forward pass."""
+        if self.preprocess_spec is None:
+            return [self.predict(image) for image in images]
+        return self.predict_preprocessed(preprocess_batch(images, self.preprocess_spec))
+
+    def predict_preprocessed(self, batch: np.ndarray) -> List[Tuple[float, Dict]]:
+        """Predict a batch already preprocessed according to ``preprocess_spec``."""
+        raise NotImplementedError
+
+    def load_model(self, *args, **kwargs) -> None:  # pragma: no cover - interface definition
+        raise NotImplementedError
+
+
+def resolve_no_tumor_index(class_names: Sequence[str]) -> int:
+    """Index of the 'no tumor' class, falling back to the last class."""
+    for idx, name in enumerate(class_names):
+        if name.lower() in NO_TUMOR_CLASS_NAMES:
+            return idx
+
+    logger.warning(
+        "No explicit 'no tumor' class found in class names %s. Using last class as non-tumor.",
+        class_names,
+    )
+    return len(class_names) - 1
+
+
+def build_binary_result(
+    model_name: str,
+    input_size: Tuple[int, int],
+    prediction: np.ndarray,
+) -> Tuple[float, Dict]:
+    """Result for a two-class ``[no_tumor, tumor]`` probability vector (Model 1)."""
+    tumor_prob = float(prediction[1])
+    predicted_class = "tumor" if tumor_prob >= 0.5 else "no_tumor"
+    metadata = {
+        "model_name": model_name,
+        "input_shape": input_size,
+        "raw_prediction": prediction.tolist(),
+        "tumor_probability": tumor_prob,
+        "no_tumor_probability": float(prediction[0]),
+        "predicted_class": predicted_class,
+        "class_probabilities": {
+            "no_tumor": float(prediction[0]),
+            "tumor": tumor_prob,
+        },
+    }
+
+    return tumor_prob, metadata
+
+
+def build_multiclass_result(
+    model_name: str,
+    input_size: Tuple[int, int],
+    class_names: Sequence[str],
+    no_tumor_index: int,
+    probs: np.ndarray,
+) -> Tuple[float, Dict]:
+    """Result for a per-class softmax vector with one 'no tumor' class (Model 2)."""
+    class_probabilities = {
+        class_name: float(probs[idx])
+        for idx, class_name in enumerate(class_names)
+    }
+
+    no_tumor_prob = probs[no_tumor_index]
+    tumor_prob = float(1.0 - no_tumor_prob)
+    predicted_index = int(np.argmax(probs))
+    predicted_class = class_names[predicted_index]
+
+    metadata = {
+        "model_name": model_name,
+        "input_shape": input_size,
+        "class_probabilities": class_probabilities,
+        "predicted_class": predicted_class,
+        "no_tumor_probability": float(no_tumor_prob),
+        "tumor_probability": tumor_prob,
+    }
+
+    return tumor_prob, metadata
@@ -0,0 +1,102 @@
+"""
+Per-model load state and cold-start timings reported by /health/
+"""
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, Optional
+
+
+class ModelReadiness:
+    """
+    Thread-safe record of each model's load progress
+
+    Every model moves from 'loading' through 'warming_up' to 'ready', or to
+    'failed'. Phases such as download, load and warm-up are timed per model; service-wide phases (framework
+    import, first model ready) are recorded under ``startup``. All times are
+    seconds, offsets are measured from construction.
+    """
+    LOADING = "loading"
+    WARMING_UP = "warming_up"
+    READY = "ready"
+    FAILED = "failed"
+
+    def __init__(self, clock: Callable[[], float] = time.perf_counter):
+        self._clock = clock
+        self._started = clock()
+        self._models: Dict[str, Dict] = {}
+        self._startup: Dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    def loading(self, name: str) -> None:
+        with self._lock:
+            self._models[name] = {"status": self.LOADING, "timings": {}}
+
+    def warming_up(self, name: str) -> None:
+        with self._lock:
+            self._models[name]["status"] = self.WARMING_UP
+
+    def ready(self, name: str) -> None:
+        with self._lock:
+            self._models[name]["status"] = self.READY
+            self._models[name]["ready_after_s"] = self._elapsed()
+            self._startup.setdefault("first_model_ready_s", self._elapsed())
+            if not self._pending():
+                self._startup["all_models_done_s"] = self._elapsed()
+
+    def failed(self, name: str, error: Exception) -> None:
+        with self._lock:
+            self._models[name]["status"] = self.FAILED
+            self._models[name]["error"] = str(error)
+            if not self._pending():
+                self._startup["all_models_done_s"] = self._elapsed()
+
+    @contextmanager
+    def phase(self, name: Optional[str], phase: str):
+        """Time a block as ``phase`` of model ``name``, or of startup when name is None."""
+        started = self._clock()
+        try:
+            yield
+        finally:
+            seconds = round(self._clock() - started, 3)
+            with self._lock:
+                if name is None:
+                    self._startup[f"{phase}_s"] = seconds
+                else:
+                    self._models[name]["timings"][f"{phase}_s"] = seconds
+
+    def count(self, status: str) -> int:
+        with self._lock:
+            return sum(1 for entry in self._models.values() if entry["status"] == status)
+
+    def status(self) -> str:
+        """
+        'ready' once every model is warmed up and serving, 'partial' while serving
+        a subset, otherwise 'warming_up', 'loading' or 'models_not_loaded'.
+        """
+        with self._lock:
+            statuses = [entry["status"] for entry in self._models.values()]
+        ready = statuses.count(self.READY)
+        if ready and ready == len(statuses):
+            return "ready"
+        if ready:
+            return "partial"
+        if self.WARMING_UP in statuses:
+            return "warming_up"
+        return "loading" if self.LOADING in statuses else "models_not_loaded"
+
+    def snapshot(self) -> Dict:
+        with self._lock:
+            return {
+                "models": {
+                    name: {**entry, "timings": dict(entry["timings"])}
+                    for name, entry in self._models.items()
+                },
+                "startup": dict(self._startup),
+            }
+
+    def _pending(self) -> bool:
+        return any(entry["status"] in (self.LOADING, self.WARMING_UP) for entry in self._models.values())
+
+    def _elapsed(self) -> float:
+        return round(self._clock() - self._started, 3)
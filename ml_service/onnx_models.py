@@ -0,0 +1,102 @@
+"""
+ONNX Runtime backend for the brain tumor models.
+
+Runs the graphs written by ``export_onnx.py`` on CPU without importing
+TensorFlow or PyTorch. Inputs and result metadata match the native models,
+so the ensemble and the API response do not change with the backend.
+"""
+
+from __future__ import annotations
+
+import logging
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import onnxruntime as ort
+
+from model_base import (
+    MODEL1_PREPROCESS_SPEC,
+    MODEL2_CLASS_NAMES,
+    MODEL2_PREPROCESS_SPEC,
+    BrainTumorModelBase,
+    build_binary_result,
+    build_multiclass_result,
+    resolve_no_tumor_index,
+)
+from preprocessing import PreprocessSpec, preprocess_batch
+
+logger = logging.getLogger(__name__)
+
+
+class OnnxBrainTumorModel(BrainTumorModelBase):
+    """Runs an exported ensemble member with onnxruntime's CPU provider.
+
+    The exported graphs output class probabilities with a dynamic batch axis;
+    subclasses only turn one probability row into a result.
+    """
+
+    backend = "onnxruntime"
+
+    def __init__(self, model_name: str, preprocess_spec: PreprocessSpec) -> None:
+        super().__init__(model_name)
+        self.preprocess_spec = preprocess_spec
+        self.input_size = preprocess_spec.size
+        self.input_name: Optional[str] = None
+
+    def load_model(self, model_path: Path) -> None:
+        options = ort.SessionOptions()
+        if self.num_threads:
+            # Session threads are fixed at creation, so set_num_threads must come first
+            options.intra_op_num_threads = self.num_threads
+            options.inter_op_num_threads = 1
+
+        self.model = ort.InferenceSession(
+            str(model_path),
+            sess_options=options,
+            providers=["CPUExecutionProvider"],
+        )
+        self.input_name = self.model.get_inputs()[0].name
+        self.is_loaded = True
+        logger.info("%s loaded from %s (onnxruntime)", self.model_name, model_path)
+
+    def preprocess_image(self, image: np.ndarray) -> np.ndarray:
+        return preprocess_batch([image], self.preprocess_spec)
+
+    def predict(self, image: np.ndarray) -> Tuple[float, Dict]:
+        return self.predict_batch([image])[0]
+
+    def predict_preprocessed(self, batch: np.ndarray) -> List[Tuple[float, Dict]]:
+        if not self.is_loaded:
+            raise RuntimeError(f"{self.model_name} is not loaded")
+
+        probs = self.model.run(None, {self.input_name: np.ascontiguousarray(batch, dtype=np.float32)})[0]
+
+        return [self._build_result(row) for row in probs]
+
+    def _build_result(self, probs: np.ndarray) -> Tuple[float, Dict]:
+        raise NotImplementedError
+
+
+class OnnxBrainTumorModel1(OnnxBrainTumorModel):
+    """Exported Keras model (``BrainTumorModel1``), ``[no_tumor, tumor]`` output."""
+
+    def __init__(self) -> None:
+        super().__init__("BrainTumorModel1", MODEL1_PREPROCESS_SPEC)
+
+    def _build_result(self, probs: np.ndarray) -> Tuple[float, Dict]:
+        return build_binary_result(self.model_name, self.input_size, probs)
+
+
+class OnnxBrainTumorModel2(OnnxBrainTumorModel):
+    """Exported ResNet18 (``BrainTumorModel2``); softmax is part of the graph."""
+
+    def __init__(self, class_names: Optional[List[str]] = None) -> None:
+        super().__init__("BrainTumorModel2", MODEL2_PREPROCESS_SPEC)
+        self.class_names = class_names or list(MODEL2_CLASS_NAMES)
+        self.no_tumor_index = resolve_no_tumor_index(self.class_names)
+
+    def _build_result(self, probs: np.ndarray) -> Tuple[float, Dict]:
+        return build_multiclass_result(
+            self.model_name, self.input_size, self.class_names, self.no_tumor_index, probs
+        )
@@ -0,0 +1,258 @@
+"""
+Content-addressed prediction cache
+Results are keyed by a hash of the image file bytes plus everything that can
+change the prediction: model version, ensemble strategy and model checksums
+"""
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Callable, Dict, Iterable, Optional, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+def file_checksum(path: Path, chunk_size: int = 1024 * 1024) -> str:
+    """SHA-256 of a file, read in chunks so large checkpoints are not loaded at once."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as handle:
+        for chunk in iter(lambda: handle.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def build_namespace(model_version: str, strategy: str, checksums: Iterable[str]) -> str:
+    """Cache namespace; any change invalidates every previously cached result."""
+    return "|".join([model_version, strategy, *sorted(checksums)])
+
+
+def _to_json(value):
+    if isinstance(value, np.generic):
+        return value.item()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+class PredictionCache:
+    """
+    Two-tier prediction cache
+
+    The in-process tier is an LRU bounded by ``max_entries`` and ``ttl_seconds``.
+    The optional disk tier stores one JSON file per key under ``disk_dir`` so
+    results survive restarts; it honours the same TTL. Entries of earlier
+    namespaces are never read again, so the disk tier is swept at start, every
+    ``sweep_interval`` seconds and whenever it outgrows ``disk_max_bytes``:
+    expired files are removed, then the oldest until it fits.
+    """
+
+    def __init__(
+        self,
+        namespace: str,
+        max_entries: int = 1024,
+        ttl_seconds: float = 24 * 3600,
+        disk_dir: Optional[str] = None,
+        disk_max_bytes: int = 512 * 1024 * 1024,
+        sweep_interval: float = 600.0,
+        clock: Callable[[], float] = time.time,
+    ):
+        """
+        Initialize prediction cache
+
+        Args:
+            namespace: Model version, strategy and checksums (see ``build_namespace``)
+            max_entries: Maximum number of results kept in memory
+            ttl_seconds: Maximum age of a cached result
+            disk_dir: Directory for the persistent tier (disabled when empty)
+            disk_max_bytes: Size the persistent tier is trimmed to
+            sweep_interval: Seconds between sweeps of the persistent tier
+            clock: Time source, injectable for tests
+        """
+        self.namespace = namespace
+        self.max_entries = max(max_entries, 1)
+        self.ttl_seconds = ttl_seconds
+        self.disk_dir = Path(disk_dir) if disk_dir else None
+        self.disk_max_bytes = disk_max_bytes
+        self.sweep_interval = sweep_interval
+        self._clock = clock
+        self._entries: "OrderedDict[str, Tuple[float, Dict]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._sweep_lock = threading.Lock()
+        self._disk_bytes = 0
+        self._last_sweep = 0.0
+        self._stats = {
+            "hits": 0, "disk_hits": 0, "misses": 0, "evictions": 0, "expirations": 0, "disk_evictions": 0,
+        }
+
+        if self.disk_dir is not None:
+            self.disk_dir.mkdir(parents=True, exist_ok=True)
+            self.sweep_disk()
+
+        logger.info(
+            f"PredictionCache initialized: max_entries={self.max_entries}, "
+            f"ttl_seconds={ttl_seconds}, disk_dir={self.disk_dir}, disk_max_bytes={disk_max_bytes}"
+        )
+
+    def key(self, content: bytes, decoder: str = "", content_digest: Optional[bytes] = None) -> str:
+        """
+        Build the cache key for raw image file bytes
+
+        Args:
+            content: Image file bytes as uploaded or downloaded
+            decoder: Name of the decoder the request path uses
+            content_digest: SHA-256 digest of ``content`` when already computed,
+                so the frames of one file hash its bytes only once
+        """
+        if content_digest is None:
+            content_digest = hashlib.sha256(content).digest()
+        digest = hashlib.sha256()
+        digest.update(self.namespace.encode())
+        digest.update(b"\0")
+        digest.update(decoder.encode())
+        digest.update(b"\0")
+        digest.update(content_digest)
+        return digest.hexdigest()
+
+    def get(self, key: str) -> Optional[Dict]:
+        now = self._clock()
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                stored_at, result = entry
+                if now - stored_at <= self.ttl_seconds:
+                    self._entries.move_to_end(key)
+                    self._stats["hits"] += 1
+                    return result
+                del self._entries[key]
+                self._stats["expirations"] += 1
+
+        entry = self._read_disk(key, now)
+        with self._lock:
+            if entry is None:
+                self._stats["misses"] += 1
+                return None
+            self._stats["disk_hits"] += 1
+            self._store(key, *entry)
+        return entry[1]
+
+    def set(self, key: str, result: Dict) -> None:
+        now = self._clock()
+        with self._lock:
+            self._store(key, now, result)
+        self._write_disk(key, now, result)
+
+    def stats(self) -> Dict:
+        with self._lock:
+            stats = dict(self._stats)
+            stats["entries"] = len(self._entries)
+            stats["disk_bytes"] = self._disk_bytes
+        stats["max_entries"] = self.max_entries
+        stats["disk_enabled"] = self.disk_dir is not None
+        return stats
+
+    def sweep_disk(self) -> None:
+        """Remove expired disk entries, then the oldest ones until the tier fits ``disk_max_bytes``."""
+        if self.disk_dir is None or not self._sweep_lock.acquire(blocking=False):
+            return
+        try:
+            now = self._clock()
+            expired = evicted = 0
+            files = []
+            # Entries are stamped with their stored_at as mtime (see _write_disk)
+            for path in self.disk_dir.glob("*/*"):
+                try:
+                    stat = path.stat()
+                except FileNotFoundError:
+                    continue
+                if now - stat.st_mtime > self.ttl_seconds:
+                    path.unlink(missing_ok=True)
+                    expired += 1
+                else:
+                    files.append((stat.st_mtime, stat.st_size, path))
+
+            files.sort()
+            total = sum(size for _, size, _ in files)
+            for _, size, path in files:
+                if total <= self.disk_max_bytes:
+                    break
+                path.unlink(missing_ok=True)
+                total -= size
+                evicted += 1
+
+            with self._lock:
+                self._disk_bytes = total
+                self._last_sweep = now
+                self._stats["expirations"] += expired
+                self._stats["disk_evictions"] += evicted
+            if expired or evicted:
+                logger.info(f"Prediction cache sweep removed {expired} expired and {evicted} old disk entries")
+        finally:
+            self._sweep_lock.release()
+
+    def _store(self, key: str, stored_at: float, result: Dict) -> None:
+        self._entries[key] = (stored_at, result)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self._stats["evictions"] += 1
+
+    def _disk_path(self, key: str) -> Path:
+        return self.disk_dir / key[:2] / f"{key}.json"
+
+    def _read_disk(self, key: str, now: float) -> Optional[Tuple[float, Dict]]:
+        if self.disk_dir is None:
+            return None
+
+        path = self._disk_path(key)
+        try:
+            with open(path, "r") as handle:
+                payload = json.load(handle)
+            stored_at, result = float(payload["stored_at"]), payload["result"]
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError, KeyError, TypeError) as e:
+            logger.warning(f"Discarding unreadable cache file {path}: {e}")
+            path.unlink(missing_ok=True)
+            return None
+
+        if now - stored_at > self.ttl_seconds:
+            path.unlink(missing_ok=True)
+            with self._lock:
+                self._stats["expirations"] += 1
+            return None
+        return stored_at, result
+
+    def _write_disk(self, key: str, stored_at: float, result: Dict) -> None:
+        if self.disk_dir is None:
+            return
+
+        path = self._disk_path(key)
+        tmp_path = None
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            # Write then rename so a crash never leaves a truncated entry behind
+            fd, tmp_path = tempfile.mkstemp(dir=path.parent, suffix=".tmp")
+            with os.fdopen(fd, "w") as handle:
+                json.dump({"stored_at": stored_at, "result": result}, handle, default=_to_json)
+            os.utime(tmp_path, (stored_at, stored_at))
+            size = os.path.getsize(tmp_path)
+            os.replace(tmp_path, path)
+            tmp_path = None
+        except (OSError, TypeError) as e:
+            logger.warning(f"Could not persist cache entry {key}: {e}")
+            return
+        finally:
+            if tmp_path is not None:
+                Path(tmp_path).unlink(missing_ok=True)
+
+        with self._lock:
+            self._disk_bytes += size
+            due = self._disk_bytes > self.disk_max_bytes or stored_at - self._last_sweep >= self.sweep_interval
+        if due:
+            self.sweep_disk()
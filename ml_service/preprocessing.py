@@ -0,0 +1,162 @@
+"""
+Shared image preprocessing for the brain tumor models
+Each distinct (size, colour order, normalization) variant of a batch is
+computed once and handed to every model that needs it as a read-only view
+"""
+import threading
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import cv2
+import numpy as np
+
+IMAGENET_MEAN = (0.485, 0.456, 0.406)
+IMAGENET_STD = (0.229, 0.224, 0.225)
+
+
+@dataclass(frozen=True)
+class PreprocessSpec:
+    """
+    Model input description
+
+    Attributes:
+        size: Target (width, height) passed to ``cv2.resize``
+        color_order: Channel order the model expects ('RGB' or 'BGR')
+        mean: Per-channel mean subtracted after scaling to [0, 1]
+        std: Per-channel std divided out after subtracting ``mean``
+        channels_first: Return NCHW instead of NHWC
+    """
+    size: Tuple[int, int] = (224, 224)
+    color_order: str = "RGB"
+    mean: Optional[Tuple[float, float, float]] = None
+    std: Optional[Tuple[float, float, float]] = None
+    channels_first: bool = False
+
+
+class Preprocessor:
+    """
+    Batch preprocessor that shares intermediate results between specs
+
+    Resize + colour conversion is done once per (size, colour order), scaling
+    to float32 once per (size, colour order), and normalization once per spec.
+    With ``reuse_buffers`` the float32 outputs live in per-thread buffers that
+    are overwritten by the next call on the same thread.
+    """
+
+    def __init__(self, reuse_buffers: bool = True):
+        self.reuse_buffers = reuse_buffers
+        self._local = threading.local()
+
+    def run(self, images: List[np.ndarray], specs: Iterable[PreprocessSpec]) -> Dict[PreprocessSpec, np.ndarray]:
+        """
+        Preprocess a batch for several model input specs
+
+        Args:
+            images: Decoded images (BGR, BGRA or grayscale), uint8 or float32
+                already scaled to [0, 1] (windowed DICOM frames)
+            specs: Input specs of the models that will consume the batch
+
+        Returns:
+            Mapping of spec to a batch array (NHWC or NCHW float32), read-only
+            when it is a view of a reused buffer
+        """
+        scaled: Dict[Tuple[Tuple[int, int], str], np.ndarray] = {}
+        outputs: Dict[PreprocessSpec, np.ndarray] = {}
+
+        for spec in specs:
+            if spec in outputs:
+                continue
+
+            stage_key = (spec.size, spec.color_order)
+            if stage_key not in scaled:
+                scaled[stage_key] = self._resize_and_scale(images, spec.size, spec.color_order)
+            batch = scaled[stage_key]
+
+            if spec.mean is not None or spec.channels_first:
+                batch = self._normalize(batch, spec)
+
+            if self.reuse_buffers:
+                batch = batch.view()
+                batch.flags.writeable = False
+            outputs[spec] = batch
+
+        return outputs
+
+    def _buffer(self, key: Tuple, shape: Tuple[int, ...], dtype) -> np.ndarray:
+        if not self.reuse_buffers:
+            return np.empty(shape, dtype=dtype)
+
+        buffers = getattr(self._local, "buffers", None)
+        if buffers is None:
+            buffers = self._local.buffers = {}
+
+        buffer = buffers.get(key)
+        if buffer is None or buffer.shape[0] < shape[0]:
+            buffer = buffers[key] = np.empty(shape, dtype=dtype)
+        return buffer[:shape[0]]
+
+    def _resize_and_scale(self, images: List[np.ndarray], size: Tuple[int, int], color_order: str) -> np.ndarray:
+        width, height = size
+        pixels = self._buffer(("pixels", size, color_order), (len(images), height, width, 3), np.uint8)
+        float_images = []
+
+        for index, image in enumerate(images):
+            if image.dtype != np.uint8:
+                float_images.append(index)
+                continue
+            target = pixels[index]
+            needs_resize = image.shape[:2] != (height, width)
+
+            if needs_resize and image.ndim == 3 and image.shape[2] == 3:
+                # Resize straight into the buffer, then swap channels in place
+                cv2.resize(image, size, dst=target)
+                _convert_color(target, color_order, target)
+            else:
+                if needs_resize:
+                    image = cv2.resize(image, size)
+                _convert_color(image, color_order, target)
+
+        scaled = self._buffer(("scaled", size, color_order), pixels.shape, np.float32)
+        np.divide(pixels, np.float32(255.0), out=scaled)
+
+        for index in float_images:
+            # Resized in float32 straight into the output, keeping their full bit depth
+            image = images[index].astype(np.float32, copy=False)
+            if image.shape[:2] != (height, width):
+                image = cv2.resize(image, size)
+            _convert_color(image, color_order, scaled[index])
+        return scaled
+
+    def _normalize(self, batch: np.ndarray, spec: PreprocessSpec) -> np.ndarray:
+        count, height, width, channels = batch.shape
+        shape = (count, channels, height, width) if spec.channels_first else batch.shape
+        output = self._buffer(("normalized", spec), shape, np.float32)
+
+        mean = np.zeros(channels, dtype=np.float32) if spec.mean is None else np.asarray(spec.mean, dtype=np.float32)
+        std = np.ones(channels, dtype=np.float32) if spec.std is None else np.asarray(spec.std, dtype=np.float32)
+
+        for channel in range(channels):
+            target = output[:, channel] if spec.channels_first else output[..., channel]
+            np.subtract(batch[..., channel], mean[channel], out=target)
+            np.divide(target, std[channel], out=target)
+        return output
+
+
+def _convert_color(image: np.ndarray, color_order: str, out: np.ndarray) -> None:
+    """Write ``image`` into the HxWx3 ``out`` of the same dtype in the requested channel order."""
+    if image.ndim == 2:
+        cv2.cvtColor(image, cv2.COLOR_GRAY2RGB, dst=out)
+    elif image.shape[2] == 4:
+        cv2.cvtColor(image, cv2.COLOR_BGRA2RGB if color_order == "RGB" else cv2.COLOR_BGRA2BGR, dst=out)
+    elif color_order == "RGB":
+        cv2.cvtColor(image, cv2.COLOR_BGR2RGB, dst=out)
+    elif image is not out:
+        out[...] = image
+
+
+_standalone = Preprocessor(reuse_buffers=False)
+
+
+def preprocess_batch(images: List[np.ndarray], spec: PreprocessSpec) -> np.ndarray:
+    """Preprocess a batch for a single spec into a freshly allocated array."""
+    return _standalone.run(images, [spec])[spec]
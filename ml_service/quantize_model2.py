@@ -0,0 +1,199 @@
+#!/usr/bin/env python3
+"""
+Post-training static INT8 quantization of BrainTumorModel2 (ResNet18)
+
+Calibrates activation ranges on stored scans, converts the model to int8
+and compares it with the fp32 model on a held-out labelled set. The int8
+state_dict is written with a JSON report next to it (same name, .json);
+the service loads both with MODEL2_PRECISION=int8 and shows the report in
+/health/.
+
+The held-out directory has one sub-directory per class name (glioma,
+meningioma, notumor, pituitary). Calibration scans are unlabelled and must
+not overlap the held-out set.
+
+Usage:
+    python quantize_model2.py --fp32 best_model_test6.pth --calibration-dir scans/ --eval-dir heldout/
+    python quantize_model2.py --from-s3 --calibration-prefix patient_images/ --eval-dir heldout/ --upload
+"""
+import argparse
+import json
+import logging
+import random
+import time
+from pathlib import Path
+from typing import Dict, Iterator, List, Tuple
+
+import cv2
+import numpy as np
+import torch
+
+from brain_tumor_models import BrainTumorModel2, QuantizedBrainTumorModel2
+from preprocessing import preprocess_batch
+
+logger = logging.getLogger(__name__)
+
+IMAGE_SUFFIXES = {".jpg", ".jpeg", ".png"}
+CALIBRATION_BATCH_SIZE = 16
+
+
+def list_images(directory: Path) -> List[Path]:
+    return sorted(path for path in Path(directory).rglob("*") if path.suffix.lower() in IMAGE_SUFFIXES)
+
+
+def read_images(paths: List[Path]) -> List[np.ndarray]:
+    """Decode images the way the service does (BGR), skipping unreadable files."""
+    images = []
+    for path in paths:
+        image = cv2.imread(str(path), cv2.IMREAD_COLOR)
+        if image is None:
+            logger.warning("Skipping unreadable image %s", path)
+            continue
+        images.append(image)
+    return images
+
+
+def load_labelled_images(directory: Path, class_names: List[str]) -> Tuple[List[np.ndarray], List[int]]:
+    """Images and class indices from one sub-directory per class."""
+    images, labels = [], []
+    for index, class_name in enumerate(class_names):
+        class_images = read_images(list_images(Path(directory) / class_name))
+        images.extend(class_images)
+        labels.extend([index] * len(class_images))
+    return images, labels
+
+
+def download_calibration_scans(s3_loader, prefix: str, limit: int, seed: int = 0) -> List[Path]:
+    """Download a random sample of stored scans under ``prefix``."""
+    keys = [key for key in s3_loader.list_models(prefix) if Path(key).suffix.lower() in IMAGE_SUFFIXES]
+    random.Random(seed).shuffle(keys)
+    return [s3_loader.download_model(key) for key in keys[:limit]]
+
+
+def iter_batches(model: BrainTumorModel2, images: List[np.ndarray], batch_size: int) -> Iterator[np.ndarray]:
+    for start in range(0, len(images), batch_size):
+        yield preprocess_batch(images[start:start + batch_size], model.preprocess_spec)
+
+
+def evaluate(model: BrainTumorModel2, images: List[np.ndarray], labels: List[int]) -> Dict:
+    """Accuracy, predicted class indices and latency per image on a labelled set."""
+    started = time.perf_counter()
+    results = []
+    for batch in iter_batches(model, images, CALIBRATION_BATCH_SIZE):
+        results.extend(model.predict_preprocessed(batch))
+    elapsed = time.perf_counter() - started
+
+    predicted = [model.class_names.index(metadata["predicted_class"]) for _, metadata in results]
+    return {
+        "accuracy": float(np.mean(np.array(predicted) == np.array(labels))),
+        "predicted": predicted,
+        "tumor_probabilities": [tumor_prob for tumor_prob, _ in results],
+        "ms_per_image": elapsed * 1000.0 / len(images),
+    }
+
+
+def quantize_and_evaluate(
+    fp32_path: Path,
+    calibration_images: List[np.ndarray],
+    eval_images: List[np.ndarray],
+    eval_labels: List[int],
+    output_path: Path,
+) -> Dict:
+    """
+    Quantize the fp32 checkpoint and write the int8 state_dict and report
+
+    Args:
+        fp32_path: BrainTumorModel2 fp32 state_dict
+        calibration_images: Decoded scans used to calibrate activation ranges
+        eval_images: Decoded held-out scans
+        eval_labels: Class index of each held-out scan
+        output_path: Destination of the int8 state_dict
+
+    Returns:
+        The report also written to ``output_path`` with a .json suffix
+    """
+    if not calibration_images or not eval_images:
+        raise ValueError("Calibration and held-out sets must not be empty")
+
+    fp32_model = BrainTumorModel2()
+    fp32_model.device = torch.device("cpu")
+    fp32_model.model.cpu()
+    fp32_model.load_model(fp32_path)
+
+    int8_model = QuantizedBrainTumorModel2()
+    int8_model.quantize(
+        fp32_model.model.state_dict(),
+        iter_batches(int8_model, calibration_images, CALIBRATION_BATCH_SIZE),
+    )
+
+    fp32_eval = evaluate(fp32_model, eval_images, eval_labels)
+    int8_eval = evaluate(int8_model, eval_images, eval_labels)
+
+    report = {
+        "precision": "int8",
+        "engine": int8_model.engine,
+        "calibration_images": len(calibration_images),
+        "eval_images": len(eval_images),
+        "fp32_accuracy": round(fp32_eval["accuracy"], 4),
+        "int8_accuracy": round(int8_eval["accuracy"], 4),
+        "accuracy_delta": round(int8_eval["accuracy"] - fp32_eval["accuracy"], 4),
+        "prediction_agreement": round(float(np.mean(
+            np.array(fp32_eval["predicted"]) == np.array(int8_eval["predicted"])
+        )), 4),
+        "max_tumor_probability_diff": round(float(np.max(np.abs(
+            np.array(fp32_eval["tumor_probabilities"]) - np.array(int8_eval["tumor_probabilities"])
+        ))), 4),
+        "fp32_ms_per_image": round(fp32_eval["ms_per_image"], 1),
+        "int8_ms_per_image": round(int8_eval["ms_per_image"], 1),
+    }
+
+    output_path = Path(output_path)
+    output_path.parent.mkdir(parents=True, exist_ok=True)
+    torch.save(int8_model.model.state_dict(), output_path)
+    output_path.with_suffix(".json").write_text(json.dumps(report, indent=2))
+    return report
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--fp32", type=Path, help="BrainTumorModel2 fp32 state_dict")
+    parser.add_argument("--calibration-dir", type=Path, help="Directory of unlabelled scans")
+    parser.add_argument("--calibration-prefix", default="patient_images/", help="S3 prefix of stored scans (--from-s3)")
+    parser.add_argument("--calibration-size", type=int, default=200)
+    parser.add_argument("--eval-dir", type=Path, required=True, help="Held-out scans, one sub-directory per class")
+    parser.add_argument("--from-s3", action="store_true", help="Take the fp32 model and calibration scans from S3")
+    parser.add_argument("--upload", action="store_true", help="Upload to MODEL2_INT8_KEY/MODEL2_INT8_REPORT_KEY")
+    parser.add_argument("--output", type=Path, default=Path("best_model_test6_int8.pth"))
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+
+    s3_loader = None
+    if args.from_s3 or args.upload:
+        import main as service  # reads .env and the model key settings
+        from s3_model_loader import S3ModelLoader
+        s3_loader = S3ModelLoader(bucket_name=service.S3_BUCKET, region_name=service.AWS_REGION)
+
+    if args.from_s3:
+        args.fp32 = s3_loader.download_model(service.MODEL2_KEY)
+        calibration_paths = download_calibration_scans(s3_loader, args.calibration_prefix, args.calibration_size)
+    elif args.fp32 and args.calibration_dir:
+        calibration_paths = list_images(args.calibration_dir)
+        random.Random(0).shuffle(calibration_paths)
+        calibration_paths = calibration_paths[:args.calibration_size]
+    else:
+        parser.error("--fp32 and --calibration-dir are required unless --from-s3 is given")
+
+    eval_images, eval_labels = load_labelled_images(args.eval_dir, BrainTumorModel2().class_names)
+    report = quantize_and_evaluate(
+        args.fp32, read_images(calibration_paths), eval_images, eval_labels, args.output
+    )
+    print(json.dumps(report, indent=2))
+
+    if args.upload:
+        s3_loader.upload_model(str(args.output), service.MODEL2_INT8_KEY)
+        s3_loader.upload_model(str(args.output.with_suffix(".json")), service.MODEL2_INT8_REPORT_KEY)
+
+
+if __name__ == "__main__":
+    main()
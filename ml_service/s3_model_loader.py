@@ -1,17 +1,86 @@
 """
 S3 Model Loader for downloading and caching ML models from AWS S3
+
+Cached files are only trusted together with a sidecar manifest recording
+the object's ETag, size and SHA-256. Downloads go to a temporary file that
+is verified and then renamed into place, so a crash never leaves a
+truncated model under the cached name. Large objects are fetched as
+parallel ranged GETs whose progress is recorded, so an interrupted
+download resumes with the missing parts only.
 """
+import hashlib
+import json
 import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Optional
+
 import boto3
-from botocore.exceptions import ClientError
+from botocore.exceptions import BotoCoreError, ClientError
 from pathlib import Path
 import logging
 
 logger = logging.getLogger(__name__)
 
+DEFAULT_PART_SIZE = 8 * 1024 * 1024
+HASH_CHUNK_SIZE = 1024 * 1024
+
+
+class ModelIntegrityError(Exception):
+    """Downloaded bytes do not match the S3 object they were read from"""
+
+
+def _write_json_atomic(path: Path, data: Dict) -> None:
+    temp_path = path.with_name(path.name + ".tmp")
+    temp_path.write_text(json.dumps(data))
+    os.replace(temp_path, path)
+
+
+def _read_json(path: Path) -> Optional[Dict]:
+    try:
+        return json.loads(path.read_text())
+    except (OSError, ValueError):
+        return None
+
+
+def _file_digests(path: Path, etag_part_size: Optional[int] = None) -> Dict[str, str]:
+    """
+    MD5 and SHA-256 in one pass, plus the multipart ETag when ``etag_part_size`` is given.
+    
+    A single-part ETag is the MD5 of the object. A multipart ETag is the MD5
+    of the concatenated binary MD5s of each uploaded part, followed by
+    ``-<number of parts>``.
+    """
+    md5 = hashlib.md5()
+    sha256 = hashlib.sha256()
+    part_digests = []
+    part_md5 = hashlib.md5()
+    part_filled = 0
+    with open(path, "rb") as handle:
+        for chunk in iter(lambda: handle.read(HASH_CHUNK_SIZE), b""):
+            md5.update(chunk)
+            sha256.update(chunk)
+            if etag_part_size:
+                view = memoryview(chunk)
+                while view:
+                    take = min(len(view), etag_part_size - part_filled)
+                    part_md5.update(view[:take])
+                    part_filled += take
+                    view = view[take:]
+                    if part_filled == etag_part_size:
+                        part_digests.append(part_md5.digest())
+                        part_md5 = hashlib.md5()
+                        part_filled = 0
+    digests = {"md5": md5.hexdigest(), "sha256": sha256.hexdigest()}
+    if etag_part_size:
+        if part_filled:
+            part_digests.append(part_md5.digest())
+        digests["etag"] = f"{hashlib.md5(b''.join(part_digests)).hexdigest()}-{len(part_digests)}"
+    return digests
+
 
 class S3ModelLoader:
-    """Load models from S3 with local caching"""
+    """Load models from S3 with a verified local cache"""
     
     def __init__(
         self,
@@ -19,7 +88,10 @@ class S3ModelLoader:
         aws_access_key_id: str = None,
         aws_secret_access_key: str = None,
         region_name: str = "us-east-1",
-        cache_dir: str = "/tmp/models"
+        cache_dir: str = "/tmp/models",
+        endpoint_url: str = None,
+        part_size: int = DEFAULT_PART_SIZE,
+        max_workers: int = 4,
     ):
         """
         Initialize S3 Model Loader
@@ -30,57 +102,210 @@ class S3ModelLoader:
             aws_secret_access_key: AWS secret key (optional, uses env vars if not provided)
             region_name: AWS region
             cache_dir: Local directory to cache downloaded models
+            endpoint_url: S3-compatible endpoint such as a local moto server or MinIO
+                (optional, uses AWS_S3_ENDPOINT_URL if not provided)
+            part_size: Objects larger than this are downloaded as ranged parts of this size
+            max_workers: Parts downloaded at the same time
         """
         self.bucket_name = bucket_name
         self.cache_dir = Path(cache_dir)
         self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self.part_size = part_size
+        self.max_workers = max_workers
+        self._key_locks: Dict[str, threading.Lock] = {}
+        self._key_locks_guard = threading.Lock()
         
         # Initialize S3 client
         self.s3_client = boto3.client(
             's3',
             aws_access_key_id=aws_access_key_id or os.getenv('AWS_ACCESS_KEY_ID'),
             aws_secret_access_key=aws_secret_access_key or os.getenv('AWS_SECRET_ACCESS_KEY'),
-            region_name=region_name or os.getenv('AWS_S3_REGION_NAME', 'us-east-1')
+            region_name=region_name or os.getenv('AWS_S3_REGION_NAME', 'us-east-1'),
+            endpoint_url=endpoint_url or os.getenv('AWS_S3_ENDPOINT_URL') or None,
         )
         
         logger.info(f"S3ModelLoader initialized with bucket: {bucket_name}")
     
-    def download_model(self, s3_key: str, force_download: bool = False) -> Path:
+    def download_model(self, s3_key: str) -> Path:
         """
-        Download model from S3 to local cache
+        Download model from S3 to local cache, unless the cached copy is current
+        
+        A cached copy is used when its manifest matches the size and SHA-256 of
+        the file on disk and S3 answers the conditional request (If-None-Match
+        on the cached ETag) with 304 Not Modified. If S3 cannot be reached, a
+        valid cached copy is used.
         
         Args:
             s3_key: S3 object key (path in bucket)
-            force_download: Force re-download even if cached
             
         Returns:
             Path to downloaded model file
         """
-        # Create local file path
         local_path = self.cache_dir / s3_key.replace('/', '_')
         
-        # Check if already cached
-        if local_path.exists() and not force_download:
-            logger.info(f"Model found in cache: {local_path}")
+        with self._key_lock(s3_key):
+            manifest = self._valid_manifest(local_path)
+            
+            try:
+                head_args = {"Bucket": self.bucket_name, "Key": s3_key}
+                if manifest is not None:
+                    head_args["IfNoneMatch"] = manifest["etag"]
+                head = self.s3_client.head_object(**head_args)
+            except ClientError as e:
+                error_code = e.response['Error']['Code']
+                if error_code == '304':
+                    logger.info(f"Model found in cache and unchanged in S3: {local_path}")
+                    return local_path
+                if error_code in ('404', 'NoSuchKey'):
+                    raise FileNotFoundError(f"Model not found in S3: s3://{self.bucket_name}/{s3_key}")
+                if manifest is not None:
+                    logger.warning(f"Could not check s3://{self.bucket_name}/{s3_key} ({e}); using cached {local_path}")
+                    return local_path
+                raise Exception(f"Error downloading model from S3: {e}")
+            except BotoCoreError as e:
+                if manifest is not None:
+                    logger.warning(f"Could not reach S3 ({e}); using cached {local_path}")
+                    return local_path
+                raise Exception(f"Error downloading model from S3: {e}")
+            
+            if manifest is not None:
+                logger.info(f"Model changed in S3 (ETag {manifest['etag']} -> {head['ETag']}), re-downloading")
+            
+            self._download(s3_key, local_path, head['ETag'], head['ContentLength'])
             return local_path
+    
+    def manifest_path(self, local_path: Path) -> Path:
+        return local_path.with_name(local_path.name + ".manifest.json")
+    
+    def manifest_sha256(self, local_path: Path) -> Optional[str]:
+        """
+        SHA-256 recorded for a file returned by ``download_model``
         
-        # Download from S3
-        try:
-            logger.info(f"Downloading model from s3://{self.bucket_name}/{s3_key}")
-            self.s3_client.download_file(
-                self.bucket_name,
-                s3_key,
-                str(local_path)
+        The manifest is only kept once the file has been hashed against it,
+        so callers can use this instead of hashing the file again.
+        """
+        manifest = _read_json(self.manifest_path(local_path))
+        return manifest.get("sha256") if manifest else None
+    
+    def _key_lock(self, s3_key: str) -> threading.Lock:
+        with self._key_locks_guard:
+            return self._key_locks.setdefault(s3_key, threading.Lock())
+    
+    def _valid_manifest(self, local_path: Path) -> Optional[Dict]:
+        """Manifest of the cached file, or None when the file cannot be trusted."""
+        manifest = _read_json(self.manifest_path(local_path))
+        if manifest is None or not local_path.exists():
+            return None
+        if (
+            local_path.stat().st_size != manifest.get("size")
+            or _file_digests(local_path)["sha256"] != manifest.get("sha256")
+        ):
+            logger.warning(f"Cached model {local_path} does not match its manifest, discarding")
+            return None
+        return manifest
+    
+    def _download(self, s3_key: str, local_path: Path, etag: str, size: int) -> None:
+        """Download to ``<name>.part`` (resuming if possible), verify, then rename into place."""
+        temp_path = local_path.with_name(local_path.name + ".part")
+        progress_path = local_path.with_name(local_path.name + ".part.json")
+        
+        parts = [
+            (start, min(start + self.part_size, size) - 1)
+            for start in range(0, size, self.part_size)
+        ]
+        progress = _read_json(progress_path)
+        if (
+            progress is None
+            or progress.get("etag") != etag
+            or progress.get("size") != size
+            or progress.get("part_size") != self.part_size
+            or not temp_path.exists()
+        ):
+            progress = {"etag": etag, "size": size, "part_size": self.part_size, "done": []}
+            with open(temp_path, "wb") as handle:
+                handle.truncate(size)
+            _write_json_atomic(progress_path, progress)
+        
+        done = set(progress["done"])
+        pending = [index for index in range(len(parts)) if index not in done]
+        if done:
+            logger.info(f"Resuming s3://{self.bucket_name}/{s3_key}: {len(done)}/{len(parts)} parts already downloaded")
+        logger.info(f"Downloading model from s3://{self.bucket_name}/{s3_key} ({size} bytes, {len(pending)} parts)")
+        
+        progress_lock = threading.Lock()
+        
+        def fetch(index: int) -> None:
+            start, end = parts[index]
+            try:
+                # If-Match makes S3 refuse parts of a newer object uploaded mid-download
+                response = self.s3_client.get_object(
+                    Bucket=self.bucket_name,
+                    Key=s3_key,
+                    Range=f"bytes={start}-{end}",
+                    IfMatch=etag,
+                )
+            except ClientError as e:
+                if e.response['Error']['Code'] in ('412', 'PreconditionFailed'):
+                    raise ModelIntegrityError(f"s3://{self.bucket_name}/{s3_key} changed during download")
+                raise
+            data = response['Body'].read()
+            if len(data) != end - start + 1:
+                raise ModelIntegrityError(f"Short read for bytes {start}-{end} of s3://{self.bucket_name}/{s3_key}")
+            with open(temp_path, "r+b") as handle:
+                handle.seek(start)
+                handle.write(data)
+            with progress_lock:
+                progress["done"].append(index)
+                _write_json_atomic(progress_path, progress)
+        
+        if len(pending) == 1:
+            fetch(pending[0])
+        elif pending:
+            with ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="s3-part") as pool:
+                futures = [pool.submit(fetch, index) for index in pending]
+                try:
+                    for future in futures:
+                        future.result()
+                except Exception:
+                    # Fail fast; finished parts stay recorded for the next attempt
+                    for future in futures:
+                        future.cancel()
+                    raise
+        
+        # Covers parts resumed from an earlier attempt as well as those just fetched
+        expected_etag = etag.strip('"')
+        if "-" in expected_etag:
+            digests = _file_digests(temp_path, self._upload_part_size(s3_key))
+            actual_etag = digests["etag"]
+        else:
+            digests = _file_digests(temp_path)
+            actual_etag = digests["md5"]
+        if actual_etag != expected_etag:
+            temp_path.unlink()
+            progress_path.unlink(missing_ok=True)
+            raise ModelIntegrityError(
+                f"Checksum mismatch for s3://{self.bucket_name}/{s3_key}: computed ETag {actual_etag}, S3 ETag {etag}"
             )
-            logger.info(f"Model downloaded successfully to {local_path}")
-            return local_path
-            
-        except ClientError as e:
-            error_code = e.response['Error']['Code']
-            if error_code == '404':
-                raise FileNotFoundError(f"Model not found in S3: s3://{self.bucket_name}/{s3_key}")
-            else:
-                raise Exception(f"Error downloading model from S3: {e}")
+        
+        os.replace(temp_path, local_path)
+        _write_json_atomic(self.manifest_path(local_path), {
+            "key": s3_key,
+            "etag": etag,
+            "size": size,
+            "sha256": digests["sha256"],
+        })
+        progress_path.unlink(missing_ok=True)
+        logger.info(f"Model downloaded successfully to {local_path}")
+    
+    def _upload_part_size(self, s3_key: str) -> int:
+        """
+        Part size the object was uploaded with, needed to rebuild its multipart ETag.
+        
+        If the object was replaced since the download started, the rebuilt ETag
+        simply will not match, so no If-Match is needed here.
+        """
+        head = self.s3_client.head_object(Bucket=self.bucket_name, Key=s3_key, PartNumber=1)
+        return head['ContentLength']
     
     def list_models(self, prefix: str = "") -> list:
         """
@@ -0,0 +1,122 @@
+"""
+Deterministic stand-ins for the brain tumor models, for load tests and benchmarks.
+
+Selected with INFERENCE_BACKEND=stub. Nothing is downloaded from S3 and no
+framework is imported. Outputs are a fixed function of the preprocessed
+pixels, so the same image always gets the same prediction, and each forward
+pass sleeps for a configurable time to stand in for CPU inference. The
+sleep releases the GIL like TensorFlow/PyTorch kernels do.
+"""
+
+from __future__ import annotations
+
+import logging
+import time
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from model_base import (
+    MODEL1_PREPROCESS_SPEC,
+    MODEL2_CLASS_NAMES,
+    MODEL2_PREPROCESS_SPEC,
+    BrainTumorModelBase,
+    build_binary_result,
+    build_multiclass_result,
+    resolve_no_tumor_index,
+)
+from preprocessing import PreprocessSpec, preprocess_batch
+
+logger = logging.getLogger(__name__)
+
+# Pixels are average-pooled onto this grid before the fixed projection
+POOLED_SIDE = 8
+
+
+class StubBrainTumorModel(BrainTumorModelBase):
+    """Seeded random projection of the pooled input followed by a softmax.
+
+    Args:
+        batch_latency_ms: Simulated cost of one forward pass
+        image_latency_ms: Simulated extra cost per image in the batch
+        seed: Seed of the projection weights
+    """
+
+    backend = "stub"
+
+    def __init__(
+        self,
+        model_name: str,
+        preprocess_spec: PreprocessSpec,
+        num_classes: int,
+        batch_latency_ms: float = 0.0,
+        image_latency_ms: float = 0.0,
+        seed: int = 0,
+    ) -> None:
+        super().__init__(model_name)
+        self.preprocess_spec = preprocess_spec
+        self.input_size = preprocess_spec.size
+        self.num_classes = num_classes
+        self.batch_latency = batch_latency_ms / 1000.0
+        self.image_latency = image_latency_ms / 1000.0
+        self.seed = seed
+
+    def load_model(self, *paths) -> None:
+        features = POOLED_SIDE * POOLED_SIDE * 3
+        rng = np.random.default_rng(self.seed)
+        self.model = rng.normal(0.0, 4.0 / np.sqrt(features), size=(features, self.num_classes)).astype(np.float32)
+        self.is_loaded = True
+        logger.info("%s loaded (stub, seed %d)", self.model_name, self.seed)
+
+    def preprocess_image(self, image: np.ndarray) -> np.ndarray:
+        return preprocess_batch([image], self.preprocess_spec)
+
+    def predict(self, image: np.ndarray) -> Tuple[float, Dict]:
+        return self.predict_batch([image])[0]
+
+    def predict_preprocessed(self, batch: np.ndarray) -> List[Tuple[float, Dict]]:
+        if not self.is_loaded:
+            raise RuntimeError(f"{self.model_name} is not loaded")
+
+        started = time.perf_counter()
+        if self.preprocess_spec.channels_first:
+            batch = batch.transpose(0, 2, 3, 1)
+        height, width = batch.shape[1:3]
+        pooled = batch.reshape(
+            len(batch), POOLED_SIDE, height // POOLED_SIDE, POOLED_SIDE, width // POOLED_SIDE, 3
+        ).mean(axis=(2, 4))
+        logits = pooled.reshape(len(batch), -1) @ self.model
+        probs = np.exp(logits - logits.max(axis=1, keepdims=True))
+        probs /= probs.sum(axis=1, keepdims=True)
+
+        remaining = self.batch_latency + self.image_latency * len(batch) - (time.perf_counter() - started)
+        if remaining > 0:
+            time.sleep(remaining)
+        return [self._build_result(row) for row in probs]
+
+    def _build_result(self, probs: np.ndarray) -> Tuple[float, Dict]:
+        raise NotImplementedError
+
+
+class StubBrainTumorModel1(StubBrainTumorModel):
+    """Stands in for the Keras model: ``[no_tumor, tumor]`` output."""
+
+    def __init__(self, **kwargs) -> None:
+        super().__init__("BrainTumorModel1", MODEL1_PREPROCESS_SPEC, 2, seed=1, **kwargs)
+
+    def _build_result(self, probs: np.ndarray) -> Tuple[float, Dict]:
+        return build_binary_result(self.model_name, self.input_size, probs)
+
+
+class StubBrainTumorModel2(StubBrainTumorModel):
+    """Stands in for ResNet18: four-class softmax output."""
+
+    def __init__(self, class_names: Optional[List[str]] = None, **kwargs) -> None:
+        self.class_names = class_names or list(MODEL2_CLASS_NAMES)
+        super().__init__("BrainTumorModel2", MODEL2_PREPROCESS_SPEC, len(self.class_names), seed=2, **kwargs)
+        self.no_tumor_index = resolve_no_tumor_index(self.class_names)
+
+    def _build_result(self, probs: np.ndarray) -> Tuple[float, Dict]:
+        return build_multiclass_result(
+            self.model_name, self.input_size, self.class_names, self.no_tumor_index, probs
+        )
@@ -0,0 +1,201 @@
+import asyncio
+from unittest.mock import patch
+
+import cv2
+import numpy as np
+import pytest
+from httpx import AsyncClient
+
+import main
+
+from brain_tumor_models import BrainTumorModelBase
+from ensemble_predictor import EnsemblePredictor
+from batch_scheduler import BatchScheduler
+from inference_executor import InferenceExecutor, InferenceQueueFull
+from prediction_cache import PredictionCache
+
+
+class RecordingModel(BrainTumorModelBase):
+    """Deterministic stand-in model that records the batch sizes it receives."""
+
+    def __init__(self, name="RecordingModel"):
+        super().__init__(name)
+        self.is_loaded = True
+        self.batch_sizes = []
+
+    def predict(self, image):
+        tumor_prob = float(image.mean()) / 255.0
+        return tumor_prob, {
+            "predicted_class": "tumor" if tumor_prob >= 0.5 else "no_tumor",
+            "class_probabilities": {"no_tumor": 1.0 - tumor_prob, "tumor": tumor_prob},
+        }
+
+    def predict_batch(self, images):
+        self.batch_sizes.append(len(images))
+        return super().predict_batch(images)
+
+
+def make_image(value):
+    return np.full((224, 224, 3), value, dtype=np.uint8)
+
+
+def test_predict_batch_matches_single_predictions():
+    predictor = EnsemblePredictor(models=[RecordingModel("A"), RecordingModel("B")])
+    images = [make_image(v) for v in (10, 200, 128)]
+
+    batched = predictor.predict_batch(images)
+    single = [predictor.predict(image) for image in images]
+
+    assert [r["tumor_probability"] for r in batched] == [r["tumor_probability"] for r in single]
+    assert [r["diagnosis"] for r in batched] == ["No Tumor", "Tumor Detected", "Tumor Detected"]
+    assert [p["model_name"] for p in batched[0]["all_predictions"]] == ["A", "B"]
+
+
+def test_concurrent_requests_are_batched():
+    model = RecordingModel()
+    predictor = EnsemblePredictor(models=[model])
+
+    async def scenario():
+        scheduler = BatchScheduler(predictor, InferenceExecutor(), max_batch_size=4, max_delay_ms=50)
+        await scheduler.start()
+        try:
+            return await asyncio.gather(*(scheduler.submit(make_image(v)) for v in (0, 64, 191, 255)))
+        finally:
+            await scheduler.stop()
+
+    results = asyncio.run(scenario())
+
+    assert model.batch_sizes == [4]
+    assert [r["has_tumor"] for r in results] == [False, False, True, True]
+
+
+def test_batch_is_dispatched_after_max_delay():
+    model = RecordingModel()
+    predictor = EnsemblePredictor(models=[model])
+
+    async def scenario():
+        scheduler = BatchScheduler(predictor, InferenceExecutor(), max_batch_size=8, max_delay_ms=5)
+        await scheduler.start()
+        try:
+            return await asyncio.wait_for(scheduler.submit(make_image(0)), timeout=2)
+        finally:
+            await scheduler.stop()
+
+    result = asyncio.run(scenario())
+
+    assert model.batch_sizes == [1]
+    assert result["diagnosis"] == "No Tumor"
+
+
+def test_batch_errors_propagate_to_every_request():
+    class FailingModel(RecordingModel):
+        def predict_batch(self, images):
+            raise RuntimeError("boom")
+
+    predictor = EnsemblePredictor(models=[FailingModel()])
+
+    async def scenario():
+        scheduler = BatchScheduler(predictor, InferenceExecutor(), max_batch_size=2, max_delay_ms=20)
+        await scheduler.start()
+        try:
+            return await asyncio.gather(
+                scheduler.submit(make_image(0)),
+                scheduler.submit(make_image(0)),
+                return_exceptions=True,
+            )
+        finally:
+            await scheduler.stop()
+
+    results = asyncio.run(scenario())
+
+    assert all(isinstance(r, RuntimeError) for r in results)
+
+
+def test_submit_requires_running_scheduler():
+    scheduler = BatchScheduler(EnsemblePredictor(models=[RecordingModel()]), InferenceExecutor())
+
+    with pytest.raises(RuntimeError):
+        asyncio.run(scheduler.submit(make_image(0)))
+
+
+def test_submit_rejects_when_queue_is_full():
+    predictor = EnsemblePredictor(models=[RecordingModel()])
+
+    async def scenario():
+        scheduler = BatchScheduler(
+            predictor, InferenceExecutor(), max_batch_size=1, max_delay_ms=0, max_queue_size=1
+        )
+        await scheduler.start()
+        try:
+            # Nothing yields to the batching loop between these submissions
+            first = asyncio.ensure_future(scheduler.submit(make_image(0)))
+            second = asyncio.ensure_future(scheduler.submit(make_image(0)))
+            return await asyncio.gather(first, second, return_exceptions=True)
+        finally:
+            await scheduler.stop()
+
+    first, second = asyncio.run(scenario())
+
+    assert first["diagnosis"] == "No Tumor"
+    assert isinstance(second, InferenceQueueFull)
+
+
+def png_bytes(value):
+    ok, encoded = cv2.imencode(".png", np.full((32, 32, 3), value, dtype=np.uint8))
+    assert ok
+    return encoded.tobytes()
+
+
+def post_study(values):
+    async def scenario():
+        async with AsyncClient(app=main.app, base_url="http://test") as client:
+            files = [("files", (f"slice{i}.png", png_bytes(v), "image/png")) for i, v in enumerate(values)]
+            return await client.post("/predict/brain-tumor/batch/", files=files)
+
+    return asyncio.run(scenario())
+
+
+def test_batch_endpoint_chunks_study_and_keeps_slice_order():
+    model = RecordingModel()
+    predictor = EnsemblePredictor(models=[model])
+
+    with patch.object(main, "ensemble_predictor", predictor), \
+            patch.object(main, "prediction_cache", None), \
+            patch.object(main, "BATCH_MAX_SIZE", 2):
+        response = post_study([10, 250, 20])
+
+    assert response.status_code == 200
+    body = response.json()
+    assert body["batch_size"] == 3
+    assert [r["has_tumor"] for r in body["results"]] == [False, True, False]
+    assert model.batch_sizes == [2, 1]
+
+
+def test_batch_endpoint_serves_cached_slices_without_inference():
+    model = RecordingModel()
+    predictor = EnsemblePredictor(models=[model])
+
+    with patch.object(main, "ensemble_predictor", predictor), \
+            patch.object(main, "prediction_cache", PredictionCache("ns")):
+        post_study([10, 250])
+        response = post_study([10, 250, 30])
+
+    assert [r["cached"] for r in response.json()["results"]] == [True, True, False]
+    assert model.batch_sizes == [2, 1]
+
+
+def test_batch_endpoint_rejects_undecodable_slice():
+    with patch.object(main, "ensemble_predictor", EnsemblePredictor(models=[RecordingModel()])), \
+            patch.object(main, "prediction_cache", None):
+        async def scenario():
+            async with AsyncClient(app=main.app, base_url="http://test") as client:
+                files = [
+                    ("files", ("ok.png", png_bytes(10), "image/png")),
+                    ("files", ("bad.png", b"not an image", "image/png")),
+                ]
+                return await client.post("/predict/brain-tumor/batch/", files=files)
+
+        response = asyncio.run(scenario())
+
+    assert response.status_code == 400
+    assert "[1]" in response.json()["detail"]
@@ -0,0 +1,150 @@
+import asyncio
+from io import BytesIO
+from unittest.mock import patch
+
+import cv2
+import numpy as np
+import pytest
+from httpx import AsyncClient
+
+pydicom = pytest.importorskip("pydicom")
+from pydicom.dataset import FileDataset, FileMetaDataset
+from pydicom.uid import ExplicitVRLittleEndian, MRImageStorage, generate_uid
+
+import main
+from dicom_input import Window, decode_dicom
+from ensemble_predictor import EnsemblePredictor
+from image_ingestion import ImageHeader, read_image_stream
+from model_base import MODEL1_PREPROCESS_SPEC, BrainTumorModelBase
+from preprocessing import preprocess_batch
+
+
+def make_dicom(frames, window=None, intercept=0, photometric="MONOCHROME2"):
+    """Uncompressed 16-bit MR DICOM file with one frame per array in ``frames``."""
+    meta = FileMetaDataset()
+    meta.MediaStorageSOPClassUID = MRImageStorage
+    meta.MediaStorageSOPInstanceUID = generate_uid()
+    meta.TransferSyntaxUID = ExplicitVRLittleEndian
+
+    dataset = FileDataset("scan.dcm", {}, file_meta=meta, preamble=b"\0" * 128)
+    dataset.SOPClassUID = MRImageStorage
+    dataset.Modality = "MR"
+    dataset.Rows, dataset.Columns = frames[0].shape
+    if len(frames) > 1:
+        dataset.NumberOfFrames = len(frames)
+    dataset.SamplesPerPixel = 1
+    dataset.PhotometricInterpretation = photometric
+    dataset.BitsAllocated = 16
+    dataset.BitsStored = 12
+    dataset.HighBit = 11
+    dataset.PixelRepresentation = 0
+    dataset.RescaleIntercept = intercept
+    dataset.RescaleSlope = 1
+    if window is not None:
+        dataset.WindowCenter, dataset.WindowWidth = window
+    dataset.PixelData = np.stack(frames).astype(np.uint16).tobytes()
+
+    buffer = BytesIO()
+    dataset.save_as(buffer, write_like_original=False)
+    return buffer.getvalue()
+
+
+def ramp(low, high, shape=(64, 64)):
+    return np.linspace(low, high, shape[0] * shape[1]).reshape(shape)
+
+
+def test_frames_are_windowed_to_float_after_the_modality_lut():
+    frame = np.array([[0, 500, 1000], [1500, 2000, 4095]])
+    # Stored 1000 + intercept -500 = 500 is the window centre
+    content = make_dicom([frame], window=(500, 1000), intercept=-500)
+
+    (image,) = decode_dicom(content)
+
+    assert image.dtype == np.float32
+    np.testing.assert_allclose(image, [[0.0, 0.0, 0.5], [1.0, 1.0, 1.0]])
+    np.testing.assert_allclose(decode_dicom(content, Window(1500, 3000))[0][0], [0.0, 0.0, 1 / 6], atol=1e-6)
+
+
+def test_monochrome1_is_inverted_and_full_range_is_used_without_a_window():
+    (image,) = decode_dicom(make_dicom([np.array([[100, 300]])], photometric="MONOCHROME1"))
+
+    np.testing.assert_allclose(image, [[1.0, 0.0]])
+
+
+def test_bit_depth_survives_preprocessing():
+    # 12-bit values one apart collapse to the same 8-bit level after windowing to 0-4095
+    frame = np.tile(np.array([2000, 2001, 2002, 2003] * 56), (224, 1))
+    (image,) = decode_dicom(make_dicom([frame], window=(2048, 4096)))
+
+    batch = preprocess_batch([image], MODEL1_PREPROCESS_SPEC)
+
+    assert len(np.unique(batch[0, 0, :4, 0])) == 4
+    assert len(np.unique(np.round(batch[0, 0, :4, 0] * 255))) == 1
+
+
+def test_series_header_is_sniffed_from_the_stream():
+    content = make_dicom([ramp(0, 100), ramp(100, 200), ramp(200, 300)])
+
+    async def chunks():
+        for start in range(0, len(content), 1024):
+            yield content[start:start + 1024]
+
+    data, header = asyncio.run(read_image_stream(chunks(), len(content), 10_000))
+
+    assert data == content
+    assert header == ImageHeader("DICOM", 64, 64, frames=3)
+
+
+class MeanModel(BrainTumorModelBase):
+    """Stand-in whose tumor probability is the mean preprocessed intensity."""
+
+    def __init__(self):
+        super().__init__("MeanModel")
+        self.is_loaded = True
+        self.preprocess_spec = MODEL1_PREPROCESS_SPEC
+        self.batch_sizes = []
+
+    def predict_preprocessed(self, batch):
+        self.batch_sizes.append(len(batch))
+        return [
+            (float(image.mean()), {"predicted_class": "tumor" if image.mean() > 0.5 else "no_tumor"})
+            for image in batch
+        ]
+
+
+def test_series_is_predicted_as_one_batch_and_single_endpoint_takes_one_frame():
+    model = MeanModel()
+    series = make_dicom([ramp(0, 400), ramp(0, 1600), ramp(3600, 4000)], window=(2000, 4000))
+    png = cv2.imencode(".png", np.full((32, 32, 3), 255, dtype=np.uint8))[1].tobytes()
+
+    async def scenario():
+        async with AsyncClient(app=main.app, base_url="http://test") as client:
+            batch = await client.post("/predict/brain-tumor/batch/", files=[
+                ("files", ("series.dcm", series, "application/dicom")),
+                ("files", ("slice.png", png, "image/png")),
+            ])
+            multi_frame_single = await client.post(
+                "/predict/brain-tumor/", files={"file": ("series.dcm", series, "application/dicom")}
+            )
+            single_frame = await client.post(
+                "/predict/brain-tumor/",
+                files={"file": ("one.dcm", make_dicom([ramp(3600, 4000)], window=(2000, 4000)), "application/dicom")},
+            )
+            return batch, multi_frame_single, single_frame
+
+    with patch.object(main, "ensemble_predictor", EnsemblePredictor(models=[model])), \
+            patch.object(main, "batch_scheduler", None), \
+            patch.object(main, "prediction_cache", None):
+        batch, multi_frame_single, single_frame = asyncio.run(scenario())
+
+    assert batch.status_code == 200
+    results = batch.json()["results"]
+    assert [(r["source_file"], r["frame"]) for r in results] == [(0, 0), (0, 1), (0, 2), (1, None)]
+    probabilities = [r["tumor_probability"] for r in results]
+    assert probabilities[0] < probabilities[1] < 0.5 < probabilities[2]
+    assert probabilities[3] == pytest.approx(1.0)
+    assert model.batch_sizes[0] == 4  # the whole series and the PNG in one forward pass
+
+    assert multi_frame_single.status_code == 400
+    assert single_frame.status_code == 200
+    assert single_frame.json()["tumor_probability"] == pytest.approx(probabilities[2])
@@ -0,0 +1,101 @@
+import threading
+import time
+
+import numpy as np
+
+from brain_tumor_models import BrainTumorModelBase
+from ensemble_predictor import EnsemblePredictor, split_thread_budget
+
+
+class SleepingModel(BrainTumorModelBase):
+    """Stand-in model with a fixed, GIL-releasing forward pass."""
+
+    def __init__(self, name, tumor_prob, delay=0.2, fail=False):
+        super().__init__(name)
+        self.is_loaded = True
+        self.tumor_prob = tumor_prob
+        self.delay = delay
+        self.fail = fail
+
+    def predict(self, image):
+        time.sleep(self.delay)
+        if self.fail:
+            raise RuntimeError("model crashed")
+        return self.tumor_prob, {
+            "predicted_class": "tumor" if self.tumor_prob >= 0.5 else "no_tumor",
+            "class_probabilities": {"no_tumor": 1 - self.tumor_prob, "tumor": self.tumor_prob},
+        }
+
+
+IMAGE = np.zeros((224, 224, 3), dtype=np.uint8)
+
+
+def test_parallel_mode_runs_members_concurrently_and_keeps_order():
+    # The slow model is listed first so it finishes last
+    models = [SleepingModel("Slow", 0.9, delay=0.3), SleepingModel("Fast", 0.2, delay=0.2)]
+    predictor = EnsemblePredictor(models=models, parallel=True)
+
+    started = time.perf_counter()
+    result = predictor.predict(IMAGE)
+    elapsed = time.perf_counter() - started
+
+    assert elapsed < 0.45
+    assert [p["model_name"] for p in result["all_predictions"]] == ["Slow", "Fast"]
+    timings = [p["metadata"]["inference_time"] for p in result["all_predictions"]]
+    assert timings[0] >= 0.3 and timings[1] >= 0.2
+    assert result["selected_model"] == "Slow"
+
+
+def test_sequential_mode_records_per_model_timing():
+    models = [SleepingModel("A", 0.9, delay=0.05), SleepingModel("B", 0.2, delay=0.05)]
+    predictor = EnsemblePredictor(models=models)
+
+    result = predictor.predict(IMAGE)
+
+    for prediction in result["all_predictions"]:
+        assert prediction["metadata"]["inference_time"] >= 0.05
+        assert prediction["metadata"]["batch_size"] == 1
+
+
+def test_parallel_mode_skips_failed_member():
+    models = [SleepingModel("Broken", 0.9, delay=0.01, fail=True), SleepingModel("Ok", 0.2, delay=0.01)]
+    predictor = EnsemblePredictor(models=models, parallel=True)
+
+    result = predictor.predict(IMAGE)
+
+    assert [p["model_name"] for p in result["all_predictions"]] == ["Ok"]
+    assert result["num_models"] == 1
+
+
+def test_split_thread_budget():
+    assert split_thread_budget(2, total_threads=8) == 4
+    assert split_thread_budget(2, total_threads=1) == 1
+    assert split_thread_budget(3, total_threads=8) == 2
+
+
+def test_added_model_joins_later_batches():
+    predictor = EnsemblePredictor(models=[SleepingModel("First", 0.2, delay=0.01)], parallel=True)
+    assert [p["model_name"] for p in predictor.predict(IMAGE)["all_predictions"]] == ["First"]
+
+    predictor.add_model(SleepingModel("Second", 0.9, delay=0.01))
+    result = predictor.predict(IMAGE)
+
+    assert [p["model_name"] for p in result["all_predictions"]] == ["First", "Second"]
+    assert result["selected_model"] == "Second"
+
+
+def test_replaced_model_serves_new_batches_while_in_flight_batch_finishes_on_old():
+    predictor = EnsemblePredictor(models=[SleepingModel("Model", 0.2, delay=0.3)], version="v1")
+    in_flight = {}
+    thread = threading.Thread(target=lambda: in_flight.update(predictor.predict(IMAGE)))
+    thread.start()
+    time.sleep(0.1)
+
+    old_model = predictor.replace_model(SleepingModel("Model", 0.9, delay=0.01), version="v2")
+    after_swap = predictor.predict(IMAGE)
+    thread.join()
+
+    assert old_model.tumor_prob == 0.2
+    assert (in_flight["tumor_probability"], in_flight["model_version"]) == (0.2, "v1")
+    assert (after_swap["tumor_probability"], after_swap["model_version"]) == (0.9, "v2")
+    assert predictor.version == "v2"
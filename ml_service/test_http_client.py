@@ -0,0 +1,76 @@
+import asyncio
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest.mock import patch
+
+import cv2
+import numpy as np
+from httpx import AsyncClient
+
+import main
+
+_, PNG = cv2.imencode(".png", np.zeros((32, 32, 3), dtype=np.uint8))
+
+
+class ImageHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        self.send_response(200)
+        self.send_header("Content-Type", "image/png")
+        self.send_header("Content-Length", str(len(PNG)))
+        self.end_headers()
+        self.wfile.write(PNG.tobytes())
+
+    def log_message(self, *args):
+        pass
+
+
+class StubPredictor:
+    version = "v2.0"
+
+    def get_model_info(self):
+        return []
+
+
+async def fake_prediction(image):
+    return {
+        "diagnosis": "No Tumor",
+        "has_tumor": False,
+        "tumor_probability": 0.1,
+        "confidence": 0.9,
+        "selected_model": "Stub",
+        "all_predictions": [],
+        "strategy": "max_confidence",
+    }
+
+
+def test_url_predictions_reuse_pooled_connection():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), ImageHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    image_url = f"http://127.0.0.1:{server.server_address[1]}/scan.png"
+
+    async def scenario():
+        async with AsyncClient(app=main.app, base_url="http://test") as client:
+            responses = [
+                await client.post("/predict/brain-tumor-url/", json={"image_url": image_url})
+                for _ in range(5)
+            ]
+            health = await client.get("/health/")
+        await main.http_client.aclose()
+        return responses, health
+
+    try:
+        with patch.object(main, "ensemble_predictor", StubPredictor()), \
+                patch.object(main, "http_client", None), \
+                patch.dict(main.http_client_stats, {"requests": 0, "connections_opened": 0}), \
+                patch.object(main, "prediction_cache", None), \
+                patch.object(main, "run_ensemble_prediction", fake_prediction):
+            responses, health = asyncio.run(scenario())
+    finally:
+        server.shutdown()
+        server.server_close()
+
+    assert [r.status_code for r in responses] == [200] * 5
+    assert health.json()["http_client"] == {"requests": 5, "connections_opened": 1}
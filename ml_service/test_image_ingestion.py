@@ -0,0 +1,136 @@
+import asyncio
+from io import BytesIO
+from unittest.mock import patch
+
+import cv2
+import numpy as np
+import pytest
+from fastapi import HTTPException, UploadFile
+from httpx import AsyncClient
+
+import main
+from image_ingestion import (
+    ImageHeader,
+    ImageRejected,
+    ImageTooLarge,
+    decode_cv2_reduced,
+    decode_pil_reduced,
+    read_image_stream,
+    reduction_factor,
+)
+
+
+def encode(extension, width, height):
+    image = np.random.default_rng(0).integers(0, 256, size=(height, width, 3), dtype=np.uint8)
+    return cv2.imencode(extension, image)[1].tobytes()
+
+
+def stream(data, chunk_size, consumed):
+    async def chunks():
+        for start in range(0, len(data), chunk_size):
+            consumed.append(start)
+            yield data[start:start + chunk_size]
+    return chunks()
+
+
+def read(data, consumed=None, chunk_size=1024, max_bytes=10_000_000, max_pixels=10_000_000, **kwargs):
+    chunks = stream(data, chunk_size, [] if consumed is None else consumed)
+    return asyncio.run(read_image_stream(chunks, max_bytes, max_pixels, **kwargs))
+
+
+def test_stream_returns_payload_and_header():
+    data = encode(".png", 300, 200)
+
+    content, header = read(data)
+
+    assert content == data
+    assert header == ImageHeader("PNG", 300, 200)
+
+
+def test_non_image_is_rejected_on_the_first_chunk():
+    consumed = []
+    with pytest.raises(ImageRejected):
+        read(b"%PDF-1.7" + b"\0" * 100_000, consumed)
+    assert len(consumed) == 1
+
+
+def test_too_many_pixels_are_rejected_from_the_header_before_the_body_is_read():
+    data = encode(".jpg", 2000, 1500)
+
+    consumed = []
+    with pytest.raises(ImageTooLarge):
+        read(data, consumed, max_pixels=1_000_000)
+    assert len(consumed) < len(data) // 1024 // 2
+
+
+def test_byte_limit_stops_reading_the_stream():
+    data = encode(".png", 600, 600)
+
+    consumed = []
+    with pytest.raises(ImageTooLarge):
+        read(data, consumed, max_bytes=4096)
+    assert len(consumed) == 5
+
+    consumed = []
+    with pytest.raises(ImageTooLarge):
+        read(data, consumed, declared_length=len(data), max_bytes=4096)
+    assert consumed == []
+
+
+def test_large_images_decode_at_reduced_resolution():
+    data = encode(".jpg", 2000, 1200)
+    header = ImageHeader("JPEG", 2000, 1200)
+
+    assert reduction_factor(header, 224) == 4
+    assert reduction_factor(ImageHeader("JPEG", 400, 300), 224) == 1
+    assert decode_cv2_reduced(data, header, 224).shape == (300, 500, 3)
+    assert decode_pil_reduced(data, header, 224).shape == (300, 500, 3)
+
+
+def test_endpoints_refuse_oversized_and_non_image_uploads():
+    async def scenario():
+        async with AsyncClient(app=main.app, base_url="http://test") as client:
+            oversized = await client.post(
+                "/predict/brain-tumor/", files={"file": ("scan.png", encode(".png", 600, 600), "image/png")}
+            )
+            not_an_image = await client.post(
+                "/predict/brain-tumor/", files={"file": ("scan.png", b"not an image at all", "image/png")}
+            )
+            return oversized, not_an_image
+
+    with patch.object(main, "ensemble_predictor", object()), \
+            patch.object(main, "MAX_IMAGE_BYTES", 1024), \
+            patch.object(main, "MULTIPART_OVERHEAD_BYTES", 512):
+        oversized, not_an_image = asyncio.run(scenario())
+
+    assert oversized.status_code == 413
+    assert not_an_image.status_code == 400
+
+
+def test_batch_body_limit_applies_to_the_whole_request():
+    slice_png = encode(".png", 64, 64)
+
+    async def scenario():
+        async with AsyncClient(app=main.app, base_url="http://test") as client:
+            return await client.post(
+                "/predict/brain-tumor/batch/",
+                files=[("files", (f"slice{i}.png", slice_png, "image/png")) for i in range(4)],
+            )
+
+    with patch.object(main, "ensemble_predictor", object()), \
+            patch.object(main, "BATCH_MAX_BODY_BYTES", len(slice_png) * 3):
+        response = asyncio.run(scenario())
+
+    assert response.status_code == 413
+
+
+def test_batch_reader_stops_once_the_batch_budget_is_spent():
+    data = encode(".png", 64, 64)
+    upload = UploadFile(BytesIO(data), filename="slice.png")
+
+    with pytest.raises(HTTPException) as error:
+        asyncio.run(main.read_upload(upload, batch_remaining=len(data) - 1))
+
+    assert error.value.status_code == 413
+    assert "Batch is larger" in error.value.detail
+    assert asyncio.run(main.read_upload(UploadFile(BytesIO(data)), batch_remaining=len(data)))[0] == data
@@ -0,0 +1,85 @@
+import asyncio
+import time
+from unittest.mock import patch
+
+import cv2
+import numpy as np
+import pytest
+from httpx import AsyncClient
+
+import main
+from brain_tumor_models import BrainTumorModelBase
+from ensemble_predictor import EnsemblePredictor
+from inference_executor import InferenceExecutor, InferenceQueueFull
+
+
+class SlowModel(BrainTumorModelBase):
+    """Stand-in model whose forward pass blocks like a real framework call."""
+
+    def __init__(self, delay=0.3):
+        super().__init__("SlowModel")
+        self.is_loaded = True
+        self.delay = delay
+
+    def predict(self, image):
+        time.sleep(self.delay)
+        return 0.1, {"predicted_class": "no_tumor", "class_probabilities": {"no_tumor": 0.9, "tumor": 0.1}}
+
+
+def png_bytes():
+    ok, encoded = cv2.imencode(".png", np.zeros((32, 32, 3), dtype=np.uint8))
+    assert ok
+    return encoded.tobytes()
+
+
+def test_executor_rejects_beyond_capacity():
+    executor = InferenceExecutor(max_workers=1, max_pending=2)
+
+    async def scenario():
+        calls = [asyncio.ensure_future(executor.run(time.sleep, 0.1)) for _ in range(3)]
+        return await asyncio.gather(*calls, return_exceptions=True)
+
+    results = asyncio.run(scenario())
+
+    assert results[:2] == [None, None]
+    assert isinstance(results[2], InferenceQueueFull)
+    assert executor.pending == 0
+    executor.shutdown()
+
+
+def test_health_stays_responsive_while_inference_is_saturated():
+    executor = InferenceExecutor(max_workers=1, max_pending=2)
+    predictor = EnsemblePredictor(models=[SlowModel()])
+
+    async def scenario():
+        async with AsyncClient(app=main.app, base_url="http://test") as client:
+            uploads = [
+                asyncio.ensure_future(
+                    client.post("/predict/brain-tumor/", files={"file": ("scan.png", png_bytes(), "image/png")})
+                )
+                for _ in range(3)
+            ]
+            for _ in range(100):
+                if executor.pending == 2:
+                    break
+                await asyncio.sleep(0.01)
+
+            started = time.perf_counter()
+            health = await client.get("/health/")
+            health_latency = time.perf_counter() - started
+
+            return health, health_latency, await asyncio.gather(*uploads)
+
+    with patch.object(main, "ensemble_predictor", predictor), \
+         patch.object(main, "batch_scheduler", None), \
+         patch.object(main, "inference_executor", executor):
+        health, health_latency, responses = asyncio.run(scenario())
+
+    assert health.status_code == 200
+    assert health.json()["inference"]["pending"] == 2
+    assert health_latency < 0.1
+    codes = sorted(r.status_code for r in responses)
+    assert codes == [200, 200, 503]
+    rejected = next(r for r in responses if r.status_code == 503)
+    assert rejected.headers["Retry-After"] == str(main.INFERENCE_RETRY_AFTER_SECONDS)
+    executor.shutdown()
@@ -0,0 +1,61 @@
+import asyncio
+from unittest.mock import patch
+
+import cv2
+import numpy as np
+from httpx import AsyncClient
+from prometheus_client import REGISTRY
+
+import main
+from ensemble_predictor import EnsemblePredictor
+from model_base import MODEL1_PREPROCESS_SPEC, BrainTumorModelBase
+
+
+class StubModel(BrainTumorModelBase):
+    def __init__(self):
+        super().__init__("MetricsStub")
+        self.is_loaded = True
+        self.preprocess_spec = MODEL1_PREPROCESS_SPEC
+
+    def predict_preprocessed(self, batch):
+        return [(0.2, {"predicted_class": "no_tumor"}) for _ in batch]
+
+
+def sample(name, **labels):
+    return REGISTRY.get_sample_value(name, labels) or 0.0
+
+
+def test_prediction_stages_are_recorded_and_exposed():
+    png = cv2.imencode(".png", np.zeros((64, 64, 3), dtype=np.uint8))[1].tobytes()
+    stages = ("upload", "decode", "preprocess", "combine")
+    before = {stage: sample("ml_stage_duration_seconds_count", stage=stage) for stage in stages}
+    inference_before = sample("ml_model_inference_seconds_count", model="MetricsStub")
+    requests_before = sample("ml_request_duration_seconds_count", endpoint="/predict/brain-tumor/batch/")
+
+    async def scenario():
+        async with AsyncClient(app=main.app, base_url="http://test") as client:
+            prediction = await client.post("/predict/brain-tumor/batch/", files=[
+                ("files", ("a.png", png, "image/png")),
+                ("files", ("b.png", png, "image/png")),
+            ])
+            return prediction, await client.get("/metrics")
+
+    with patch.object(main, "ensemble_predictor", EnsemblePredictor(models=[StubModel()])), \
+            patch.object(main, "batch_scheduler", None), \
+            patch.object(main, "prediction_cache", None):
+        prediction, scrape = asyncio.run(scenario())
+
+    assert prediction.status_code == 200
+    assert sample("ml_stage_duration_seconds_count", stage="upload") == before["upload"] + 2
+    for stage in ("decode", "preprocess", "combine"):
+        assert sample("ml_stage_duration_seconds_count", stage=stage) == before[stage] + 1
+    assert sample("ml_model_inference_seconds_count", model="MetricsStub") == inference_before + 1
+    assert sample("ml_request_duration_seconds_count", endpoint="/predict/brain-tumor/batch/") == requests_before + 1
+    assert sample("ml_requests_in_flight") == 0
+
+    assert scrape.status_code == 200
+    assert scrape.headers["content-type"].startswith("text/plain")
+    body = scrape.text
+    assert 'ml_stage_duration_seconds_bucket{le="0.001",stage="decode"}' in body
+    assert "ml_batch_queue_depth 0.0" in body
+    assert "ml_inference_pending 0.0" in body
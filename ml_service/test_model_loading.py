@@ -0,0 +1,335 @@
+import asyncio
+import hashlib
+import time
+from pathlib import Path
+from unittest.mock import patch
+
+import cv2
+import numpy as np
+from httpx import AsyncClient
+
+import main
+from model_base import BrainTumorModelBase
+from model_readiness import ModelReadiness
+
+DOWNLOAD_DELAY = 0.2
+IMPORT_DELAY = 0.2
+
+
+class StubLoader:
+    def __init__(self, directory):
+        self.directory = directory
+
+    def download_model(self, key):
+        time.sleep(DOWNLOAD_DELAY)
+        if key.startswith("missing"):
+            raise FileNotFoundError(key)
+        path = self.directory / key
+        path.write_text(key)
+        return path
+
+    def manifest_sha256(self, path):
+        # Files named local-* stand in for models without a download manifest
+        return None if path.name.startswith("local-") else f"manifest-{path.name}"
+
+
+class StubModel(BrainTumorModelBase):
+    load_delay = 0.0
+    batch_delay = 0.0
+    fail = False
+
+    def __init__(self):
+        super().__init__(type(self).__name__.replace("Model", ""))
+
+    def load_model(self, path, report_path=None):
+        time.sleep(self.load_delay)
+        if self.fail:
+            raise RuntimeError("corrupt weights")
+        self.weights = Path(path).read_text()
+        self.predictions = 0
+        self.batch_sizes = []
+        self.is_loaded = True
+
+    def predict_batch(self, images):
+        time.sleep(self.batch_delay)
+        self.batch_sizes.append(len(images))
+        return super().predict_batch(images)
+
+    def predict(self, image):
+        self.predictions += 1
+        tumor_prob = 0.9 if "v2" in self.weights else 0.2
+        return tumor_prob, {"predicted_class": "tumor" if tumor_prob > 0.5 else "no_tumor"}
+
+
+class FastModel(StubModel):
+    load_delay = 0.05
+
+
+class SlowModel(StubModel):
+    load_delay = 0.4
+
+
+class BrokenModel(StubModel):
+    fail = True
+
+
+class ColdModel(StubModel):
+    batch_delay = 0.1
+
+
+def fake_import():
+    time.sleep(IMPORT_DELAY)
+    return {"Fast": FastModel, "Slow": SlowModel, "Broken": BrokenModel, "Cold": ColdModel}
+
+
+def loading_patches(tmp_path):
+    return [
+        patch.object(main, "s3_loader", StubLoader(tmp_path)),
+        patch.object(main, "import_model_classes", fake_import),
+        patch.object(main, "model_readiness", ModelReadiness()),
+        patch.object(main, "model_checksums", {}),
+        patch.object(main, "ensemble_predictor", None),
+        patch.object(main, "batch_scheduler", None),
+        patch.object(main, "prediction_cache", None),
+        patch.object(main, "BATCHING_ENABLED", False),
+        patch.object(main, "PREDICTION_CACHE_ENABLED", True),
+        patch.object(main, "PREDICTION_CACHE_DIR", ""),
+    ]
+
+
+def run_with_patches(tmp_path, scenario):
+    patches = loading_patches(tmp_path)
+    for p in patches:
+        p.start()
+    try:
+        return asyncio.run(scenario())
+    finally:
+        for p in reversed(patches):
+            p.stop()
+
+
+def test_models_load_in_parallel_and_join_the_ensemble_when_ready(tmp_path):
+    sources = {
+        "Slow": [("slow.bin", True)],
+        "Fast": [("fast.bin", True), ("missing-report.json", False)],
+    }
+
+    async def scenario():
+        async with AsyncClient(app=main.app, base_url="http://test") as client:
+            loading = (await client.get("/health/")).json()
+            task = asyncio.create_task(main.load_models(sources))
+            while main.ensemble_predictor is None:
+                await asyncio.sleep(0.01)
+            partial = (await client.get("/health/")).json()
+            partial_namespace = main.prediction_cache.namespace
+            await task
+            ready = (await client.get("/health/")).json()
+        return loading, partial, partial_namespace, ready, main.prediction_cache.namespace
+
+    loading, partial, partial_namespace, ready, ready_namespace = run_with_patches(tmp_path, scenario)
+
+    assert loading["status"] == "models_not_loaded"
+
+    assert partial["status"] == "partial"
+    assert partial["models_loaded"] == 1
+    assert partial["models_status"]["Fast"]["status"] == "ready"
+    assert partial["models_status"]["Slow"]["status"] == "loading"
+
+    assert ready["status"] == "ready"
+    assert [model["model_name"] for model in ready["models_info"]] == ["Fast", "Slow"]
+    fast = ready["models_status"]["Fast"]
+    assert set(fast["timings"]) == {"download_s", "import_wait_s", "load_s", "checksum_s", "warmup_s"}
+    # Both downloads (the second Fast file is optional and missing) overlap the import;
+    # one after another this would take well over a second
+    startup = ready["startup"]
+    assert startup["import_s"] >= IMPORT_DELAY
+    assert startup["first_model_ready_s"] < 0.65
+    assert startup["all_models_done_s"] < 0.9
+    # Results of the one-model ensemble must not be served once both models answer
+    assert partial_namespace != ready_namespace
+
+
+def test_failed_model_is_reported_and_others_keep_serving(tmp_path):
+    sources = {
+        "Fast": [("fast.bin", True)],
+        "Broken": [("broken.bin", True)],
+        "Slow": [("missing-weights.bin", True)],
+    }
+
+    async def scenario():
+        await main.load_models(sources)
+        async with AsyncClient(app=main.app, base_url="http://test") as client:
+            return (await client.get("/health/")).json()
+
+    health = run_with_patches(tmp_path, scenario)
+
+    assert health["status"] == "partial"
+    assert health["models_loaded"] == 1
+    assert health["models_status"]["Fast"]["status"] == "ready"
+    assert health["models_status"]["Broken"]["status"] == "failed"
+    assert health["models_status"]["Broken"]["error"] == "corrupt weights"
+    assert health["models_status"]["Slow"]["status"] == "failed"
+    assert "load_s" not in health["models_status"]["Slow"]["timings"]
+
+
+def test_cache_namespace_reuses_the_download_manifest_checksum(tmp_path):
+    sources = {
+        "Fast": [("fast.bin", True)],
+        "Slow": [("local-slow.bin", True)],
+    }
+
+    async def scenario():
+        with patch.object(main, "file_checksum", wraps=main.file_checksum) as file_checksum:
+            await main.load_models(sources)
+        return dict(main.model_checksums), [call.args[0].name for call in file_checksum.call_args_list]
+
+    checksums, hashed = run_with_patches(tmp_path, scenario)
+
+    assert checksums["Fast"] == ["manifest-fast.bin"]
+    assert checksums["Slow"] == [hashlib.sha256(b"local-slow.bin").hexdigest()]
+    assert hashed == ["local-slow.bin"]  # the downloaded file was already hashed against its manifest
+
+
+def test_model_serves_only_after_warm_up_at_the_batching_sizes(tmp_path):
+    sources = {"Cold": [("cold.bin", True)]}
+
+    async def scenario():
+        async with AsyncClient(app=main.app, base_url="http://test") as client:
+            task = asyncio.create_task(main.load_models(sources))
+            while (warming := (await client.get("/health/")).json())["status"] != "warming_up":
+                await asyncio.sleep(0.01)
+            serving_while_warming = main.ensemble_predictor is not None
+            await task
+            ready = (await client.get("/health/")).json()
+        return warming, serving_while_warming, ready, main.ensemble_predictor.models[0]
+
+    with patch.object(main, "BATCH_MAX_SIZE", 6), patch.object(main, "MODEL_WARMUP_ITERATIONS", 1):
+        warming, serving_while_warming, ready, model = run_with_patches(tmp_path, scenario)
+
+    assert warming["models_status"]["Cold"]["status"] == "warming_up"
+    assert not serving_while_warming
+    assert ready["status"] == "ready"
+    assert model.batch_sizes == [1, 2, 4, 6]
+    assert ready["models_status"]["Cold"]["timings"]["warmup_s"] >= 4 * ColdModel.batch_delay
+
+
+ADMIN = {"X-Admin-Token": "secret"}
+PNG = cv2.imencode(".png", np.zeros((32, 32, 3), dtype=np.uint8))[1].tobytes()
+
+
+def run_reload_scenario(tmp_path, scenario):
+    sources = {"Fast": [("fast.bin", True)]}
+    reload_patches = [
+        patch.object(main, "model_sources", lambda: sources),
+        patch.object(main, "model_reloads", {}),
+        patch.object(main, "model_reload_tasks", {}),
+        patch.object(main, "ML_ADMIN_TOKEN", "secret"),
+        patch.object(main, "MODEL_WARMUP_BATCH_SIZES", "1"),
+        patch.object(main, "MODEL_WARMUP_ITERATIONS", 2),
+    ]
+    for p in reload_patches:
+        p.start()
+
+    async def with_models_loaded():
+        await main.load_models(sources)
+        async with AsyncClient(app=main.app, base_url="http://test") as client:
+            return await scenario(client)
+
+    try:
+        return run_with_patches(tmp_path, with_models_loaded)
+    finally:
+        for p in reversed(reload_patches):
+            p.stop()
+
+
+async def predict(client):
+    response = await client.post("/predict/brain-tumor/", files={"file": ("scan.png", PNG, "image/png")})
+    return response.json()
+
+
+def test_reload_warms_up_new_version_and_swaps_it_in(tmp_path):
+    async def scenario(client):
+        before = await predict(client)
+        namespace_before = main.prediction_cache.namespace
+        unauthorized = await client.post("/admin/models/reload/", json={"model": "Fast"})
+        accepted = await client.post(
+            "/admin/models/reload/", headers=ADMIN,
+            json={"model": "Fast", "s3_key": "fast-v2.bin", "version": "v2.1"},
+        )
+        duplicate = await client.post("/admin/models/reload/", headers=ADMIN, json={"model": "Fast"})
+        during = await predict(client)
+        await main.model_reload_tasks["Fast"]
+        after = await predict(client)
+        health = (await client.get("/health/")).json()
+        served = main.ensemble_predictor.models[0]
+        return (before, unauthorized, accepted, duplicate, during, after, health,
+                served, namespace_before != main.prediction_cache.namespace)
+
+    before, unauthorized, accepted, duplicate, during, after, health, served, namespace_changed = (
+        run_reload_scenario(tmp_path, scenario)
+    )
+
+    assert unauthorized.status_code == 401
+    assert accepted.status_code == 202
+    assert duplicate.status_code == 409
+    # The old version answers until the new one is warmed up
+    assert (before["tumor_probability"], before["model_version"]) == (0.2, "v2.0")
+    assert (during["tumor_probability"], during["model_version"]) == (0.2, "v2.0")
+    assert (after["tumor_probability"], after["model_version"]) == (0.9, "v2.1")
+    assert after["cached"] is False and namespace_changed
+    assert served.predictions == 3  # two warm-up batches of one image, then the request
+    assert health["version"] == "v2.1"
+    assert health["reloads"]["Fast"]["status"] == "swapped"
+    assert set(health["reloads"]["Fast"]["timings"]) == {"load_s", "warmup_s"}
+
+
+def test_failed_reload_keeps_serving_the_current_version(tmp_path):
+    async def scenario(client):
+        await client.post("/admin/models/reload/", headers=ADMIN, json={"model": "Fast", "s3_key": "missing-v3.bin"})
+        await main.model_reload_tasks["Fast"]
+        unknown = await client.post("/admin/models/reload/", headers=ADMIN, json={"model": "Other"})
+        return unknown, await predict(client), (await client.get("/health/")).json()
+
+    unknown, result, health = run_reload_scenario(tmp_path, scenario)
+
+    assert unknown.status_code == 404
+    assert (result["tumor_probability"], result["model_version"]) == (0.2, "v2.0")
+    assert health["reloads"]["Fast"]["status"] == "failed"
+    assert health["version"] == "v2.0"
+
+
+def test_stub_backend_serves_deterministic_predictions_without_s3(tmp_path):
+    image = cv2.imencode(".png", np.random.default_rng(3).integers(0, 256, (96, 96, 3), dtype=np.uint8))[1].tobytes()
+
+    async def scenario():
+        await main.load_models(main.model_sources())
+        async with AsyncClient(app=main.app, base_url="http://test") as client:
+            health = (await client.get("/health/")).json()
+            predictions = [
+                (await client.post("/predict/brain-tumor/", files={"file": ("scan.png", image, "image/png")})).json()
+                for _ in range(2)
+            ]
+        return health, predictions
+
+    overrides = {
+        "s3_loader": None,
+        "INFERENCE_BACKEND": "stub",
+        "STUB_BATCH_LATENCY_MS": 0.0,
+        "PREDICTION_CACHE_ENABLED": False,
+    }
+    patches = [
+        p for p in loading_patches(tmp_path) if p.attribute not in overrides and p.attribute != "import_model_classes"
+    ] + [patch.object(main, name, value) for name, value in overrides.items()]
+    for p in patches:
+        p.start()
+    try:
+        health, (first, second) = asyncio.run(scenario())
+    finally:
+        for p in reversed(patches):
+            p.stop()
+
+    assert health["status"] == "ready"
+    assert [model["backend"] for model in health["models_info"]] == ["stub", "stub"]
+    assert first["tumor_probability"] == second["tumor_probability"]
+    assert first["diagnosis"] == second["diagnosis"]
+    assert len(first["all_predictions"]) == 2
@@ -0,0 +1,73 @@
+import numpy as np
+import pytest
+
+pytest.importorskip("onnxruntime")
+pytest.importorskip("tf2onnx")
+
+import keras
+import torch
+
+from brain_tumor_models import BrainTumorModel1, BrainTumorModel2
+from export_onnx import export_keras_model, export_torch_model
+from onnx_models import OnnxBrainTumorModel1, OnnxBrainTumorModel2
+
+# Exported graphs may fuse ops differently; probabilities must still agree closely
+TOLERANCE = 1e-4
+
+
+def make_images(count, seed=0):
+    rng = np.random.default_rng(seed)
+    return [rng.integers(0, 256, size=(180 + 20 * i, 200, 3), dtype=np.uint8) for i in range(count)]
+
+
+def assert_same_results(native_results, onnx_results):
+    assert len(native_results) == len(onnx_results)
+    for (native_prob, native_meta), (onnx_prob, onnx_meta) in zip(native_results, onnx_results):
+        assert onnx_prob == pytest.approx(native_prob, abs=TOLERANCE)
+        assert onnx_meta["predicted_class"] == native_meta["predicted_class"]
+        assert onnx_meta.keys() == native_meta.keys()
+        for name, prob in native_meta["class_probabilities"].items():
+            assert onnx_meta["class_probabilities"][name] == pytest.approx(prob, abs=TOLERANCE)
+
+
+def test_keras_model_export_matches_native(tmp_path):
+    # Small stand-in with the production input/output contract; real weights live in S3
+    keras.utils.set_random_seed(0)
+    stand_in = keras.Sequential([
+        keras.Input((224, 224, 3)),
+        keras.layers.Conv2D(8, 3, strides=2, activation="relu"),
+        keras.layers.GlobalAveragePooling2D(),
+        keras.layers.Dense(2, activation="softmax"),
+    ])
+    stand_in.save(tmp_path / "img_clf.keras")
+
+    native = BrainTumorModel1()
+    native.load_model(tmp_path / "img_clf.keras")
+    onnx_model = OnnxBrainTumorModel1()
+    onnx_model.load_model(export_keras_model(native.model, tmp_path / "img_clf.onnx"))
+
+    images = make_images(3)
+    assert onnx_model.preprocess_spec == native.preprocess_spec
+    assert_same_results(native.predict_batch(images), onnx_model.predict_batch(images))
+    assert_same_results([native.predict(images[0])], [onnx_model.predict(images[0])])
+
+
+def test_resnet_export_matches_native(tmp_path):
+    torch.manual_seed(0)
+    torch.save(BrainTumorModel2().model.state_dict(), tmp_path / "resnet.pth")
+
+    native = BrainTumorModel2()
+    native.load_model(tmp_path / "resnet.pth")
+    onnx_model = OnnxBrainTumorModel2()
+    onnx_model.set_num_threads(2)
+    onnx_model.load_model(export_torch_model(native.model, tmp_path / "resnet.onnx"))
+
+    images = make_images(4, seed=1)
+    assert onnx_model.preprocess_spec == native.preprocess_spec
+    assert_same_results(native.predict_batch(images), onnx_model.predict_batch(images))
+    assert onnx_model.model.get_session_options().intra_op_num_threads == 2
+
+
+def test_unloaded_onnx_model_raises():
+    with pytest.raises(RuntimeError):
+        OnnxBrainTumorModel2().predict(make_images(1)[0])
@@ -0,0 +1,210 @@
+import asyncio
+import threading
+from unittest.mock import patch
+
+import cv2
+import numpy as np
+from httpx import AsyncClient
+
+import main
+from prediction_cache import PredictionCache, build_namespace
+
+RESULT = {"diagnosis": "No Tumor", "confidence": np.float32(0.9), "all_predictions": []}
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_lru_evicts_least_recently_used():
+    cache = PredictionCache("ns", max_entries=2)
+    cache.set("a", {"n": 1})
+    cache.set("b", {"n": 2})
+    cache.get("a")
+    cache.set("c", {"n": 3})
+
+    assert cache.get("b") is None
+    assert cache.get("a") == {"n": 1}
+    assert cache.get("c") == {"n": 3}
+    assert cache.stats()["evictions"] == 1
+
+
+def test_entries_expire_after_ttl():
+    clock = FakeClock()
+    cache = PredictionCache("ns", ttl_seconds=60, clock=clock)
+    cache.set("a", {"n": 1})
+
+    clock.now += 60
+    assert cache.get("a") == {"n": 1}
+    clock.now += 1
+    assert cache.get("a") is None
+    assert cache.stats()["expirations"] == 1
+
+
+def test_disk_tier_survives_new_instance_and_keeps_ttl(tmp_path):
+    clock = FakeClock()
+    first = PredictionCache("ns", ttl_seconds=60, disk_dir=str(tmp_path), clock=clock)
+    key = first.key(b"image-bytes")
+    first.set(key, RESULT)
+
+    clock.now += 30
+    second = PredictionCache("ns", ttl_seconds=60, disk_dir=str(tmp_path), clock=clock)
+    assert second.get(key)["confidence"] == np.float32(0.9)
+    assert second.stats()["disk_hits"] == 1
+
+    # Promotion to memory must not reset the age of the entry
+    clock.now += 31
+    assert second.get(key) is None
+
+
+def test_unreadable_disk_entry_is_discarded(tmp_path):
+    cache = PredictionCache("ns", disk_dir=str(tmp_path))
+    key = cache.key(b"image-bytes")
+    path = tmp_path / key[:2] / f"{key}.json"
+    path.parent.mkdir()
+    path.write_text("{truncated")
+
+    assert cache.get(key) is None
+    assert not path.exists()
+
+
+def disk_files(path):
+    return sorted(file.stem for file in path.glob("*/*.json"))
+
+
+def test_disk_tier_is_trimmed_to_max_bytes_oldest_first(tmp_path):
+    clock = FakeClock()
+    keys = [f"{index:02d}" + "0" * 62 for index in range(4)]
+    probe = PredictionCache("ns", disk_dir=str(tmp_path / "probe"), clock=clock)
+    probe.set(keys[0], RESULT)
+    entry_size = probe.stats()["disk_bytes"]
+
+    cache = PredictionCache("ns", disk_dir=str(tmp_path / "cache"), disk_max_bytes=entry_size * 2, clock=clock)
+    for key in keys:
+        clock.now += 1
+        cache.set(key, RESULT)
+
+    assert disk_files(tmp_path / "cache") == keys[2:]
+    assert cache.stats()["disk_evictions"] == 2
+    assert cache.stats()["disk_bytes"] == entry_size * 2
+
+
+def test_sweep_removes_expired_entries_of_earlier_namespaces(tmp_path):
+    clock = FakeClock()
+    old = PredictionCache("old-model", ttl_seconds=60, disk_dir=str(tmp_path), sweep_interval=300, clock=clock)
+    old_key = old.key(b"image-bytes")
+    old.set(old_key, RESULT)
+
+    # Never read again once the namespace changes; only the sweep removes it
+    current = PredictionCache("new-model", ttl_seconds=60, disk_dir=str(tmp_path), sweep_interval=300, clock=clock)
+    new_key = current.key(b"image-bytes")
+    current.set(new_key, RESULT)
+    assert disk_files(tmp_path) == sorted([old_key, new_key])
+
+    clock.now += 301
+    current.set(current.key(b"other-bytes"), RESULT)
+
+    assert disk_files(tmp_path) == [current.key(b"other-bytes")]
+    assert current.stats()["expirations"] == 2
+
+
+def test_key_depends_on_namespace_and_decoder():
+    checksums = ["aaa", "bbb"]
+    base = PredictionCache(build_namespace("v2.0", "max_confidence", checksums))
+    retrained = PredictionCache(build_namespace("v2.0", "max_confidence", ["aaa", "ccc"]))
+    other_strategy = PredictionCache(build_namespace("v2.0", "average", checksums))
+
+    key = base.key(b"image-bytes", "cv2")
+    assert key == base.key(b"image-bytes", "cv2")
+    assert key != base.key(b"image-bytes", "pil")
+    assert key != retrained.key(b"image-bytes", "cv2")
+    assert key != other_strategy.key(b"image-bytes", "cv2")
+
+
+def test_repeated_upload_skips_decode_and_inference():
+    ok, encoded = cv2.imencode(".png", np.zeros((32, 32, 3), dtype=np.uint8))
+    content = encoded.tobytes()
+    calls = []
+
+    async def fake_prediction(image):
+        calls.append(image.shape)
+        return {
+            "diagnosis": "No Tumor",
+            "has_tumor": False,
+            "tumor_probability": 0.1,
+            "confidence": 0.9,
+            "selected_model": "Stub",
+            "all_predictions": [],
+            "strategy": "max_confidence",
+        }
+
+    async def scenario():
+        async with AsyncClient(app=main.app, base_url="http://test") as client:
+            return [
+                await client.post("/predict/brain-tumor/", files={"file": ("scan.png", content, "image/png")})
+                for _ in range(2)
+            ]
+
+    with patch.object(main, "ensemble_predictor", object()), \
+            patch.object(main, "prediction_cache", PredictionCache("ns")), \
+            patch.object(main, "run_ensemble_prediction", fake_prediction), \
+            patch.object(main, "decode_cv2_image", wraps=main.decode_cv2_image) as decoder:
+        first, second = asyncio.run(scenario())
+
+    assert first.status_code == second.status_code == 200
+    assert first.json()["cached"] is False
+    assert second.json()["cached"] is True
+    assert len(calls) == 1
+    assert decoder.call_count == 1
+
+
+def test_cache_lookups_run_off_the_event_loop():
+    ok, encoded = cv2.imencode(".png", np.zeros((32, 32, 3), dtype=np.uint8))
+    content = encoded.tobytes()
+    threads = []
+
+    class RecordingCache(PredictionCache):
+        def key(self, *args, **kwargs):
+            threads.append(threading.current_thread())
+            return super().key(*args, **kwargs)
+
+        def get(self, key):
+            threads.append(threading.current_thread())
+            return super().get(key)
+
+    async def fake_prediction(image):
+        return {
+            "diagnosis": "No Tumor",
+            "has_tumor": False,
+            "tumor_probability": 0.1,
+            "confidence": 0.9,
+            "selected_model": "Stub",
+            "all_predictions": [],
+            "strategy": "max_confidence",
+        }
+
+    async def fake_batch(images):
+        return [await fake_prediction(image) for image in images]
+
+    async def scenario():
+        async with AsyncClient(app=main.app, base_url="http://test") as client:
+            single = await client.post("/predict/brain-tumor/", files={"file": ("scan.png", content, "image/png")})
+            batch = await client.post(
+                "/predict/brain-tumor/batch/",
+                files=[("files", (f"slice{i}.png", content, "image/png")) for i in range(2)],
+            )
+            return single, batch
+
+    with patch.object(main, "ensemble_predictor", object()), \
+            patch.object(main, "prediction_cache", RecordingCache("ns")), \
+            patch.object(main, "run_ensemble_prediction", fake_prediction), \
+            patch.object(main, "run_ensemble_batch", fake_batch):
+        single, batch = asyncio.run(scenario())
+
+    assert single.status_code == batch.status_code == 200
+    assert len(threads) == 6
+    assert threading.main_thread() not in threads
@@ -0,0 +1,83 @@
+import threading
+
+import cv2
+import numpy as np
+import pytest
+import torch
+
+from preprocessing import IMAGENET_MEAN, IMAGENET_STD, Preprocessor, PreprocessSpec, preprocess_batch
+
+KERAS_SPEC = PreprocessSpec(size=(224, 224))
+TORCH_SPEC = PreprocessSpec(size=(224, 224), mean=IMAGENET_MEAN, std=IMAGENET_STD, channels_first=True)
+
+
+def legacy_keras_preprocess(image):
+    """Per-model preprocessing previously done in BrainTumorModel1."""
+    if image.shape[:2] != (224, 224):
+        image = cv2.resize(image, (224, 224))
+    if len(image.shape) == 2:
+        image = cv2.cvtColor(image, cv2.COLOR_GRAY2RGB)
+    else:
+        image = cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
+    return np.expand_dims(image.astype(np.float32) / 255.0, axis=0)
+
+
+def legacy_torch_preprocess(image):
+    """Per-model preprocessing previously done in BrainTumorModel2."""
+    tensor = torch.from_numpy(legacy_keras_preprocess(image)[0]).permute(2, 0, 1)
+    mean = torch.tensor([0.485, 0.456, 0.406]).view(3, 1, 1)
+    std = torch.tensor([0.229, 0.224, 0.225]).view(3, 1, 1)
+    return ((tensor - mean) / std).unsqueeze(0).numpy()
+
+
+@pytest.fixture
+def images():
+    rng = np.random.default_rng(0)
+    return [
+        rng.integers(0, 256, (512, 384, 3), dtype=np.uint8),
+        rng.integers(0, 256, (224, 224, 3), dtype=np.uint8),
+        rng.integers(0, 256, (300, 300), dtype=np.uint8),
+    ]
+
+
+def test_matches_legacy_per_model_preprocessing(images):
+    batches = Preprocessor().run(images, [KERAS_SPEC, TORCH_SPEC])
+
+    expected_keras = np.concatenate([legacy_keras_preprocess(image) for image in images])
+    expected_torch = np.concatenate([legacy_torch_preprocess(image) for image in images])
+
+    np.testing.assert_array_equal(batches[KERAS_SPEC], expected_keras)
+    np.testing.assert_allclose(batches[TORCH_SPEC], expected_torch, rtol=0, atol=1e-6)
+
+
+def test_outputs_are_read_only_views_of_reused_buffers(images):
+    preprocessor = Preprocessor()
+
+    first = preprocessor.run(images, [KERAS_SPEC])[KERAS_SPEC]
+    second = preprocessor.run(images[:2], [KERAS_SPEC])[KERAS_SPEC]
+
+    assert not first.flags.writeable
+    with pytest.raises(ValueError):
+        first[0, 0, 0, 0] = 1.0
+    assert second.shape[0] == 2
+    assert np.shares_memory(first, second)
+
+
+def test_buffers_are_per_thread(images):
+    preprocessor = Preprocessor()
+    main_batch = preprocessor.run(images, [KERAS_SPEC])[KERAS_SPEC]
+    other = {}
+
+    thread = threading.Thread(target=lambda: other.update(preprocessor.run(images, [KERAS_SPEC])))
+    thread.start()
+    thread.join()
+
+    assert not np.shares_memory(main_batch, other[KERAS_SPEC])
+
+
+def test_standalone_batches_are_fresh_and_writable(images):
+    first = preprocess_batch(images, KERAS_SPEC)
+    second = preprocess_batch(images, KERAS_SPEC)
+
+    assert first.flags.writeable
+    assert not np.shares_memory(first, second)
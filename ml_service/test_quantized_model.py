@@ -0,0 +1,65 @@
+import json
+
+import cv2
+import numpy as np
+import pytest
+import torch
+
+from brain_tumor_models import BrainTumorModel2, QuantizedBrainTumorModel2
+from ensemble_predictor import EnsemblePredictor
+from quantize_model2 import load_labelled_images, quantize_and_evaluate
+
+
+def make_images(count, seed=0):
+    rng = np.random.default_rng(seed)
+    return [rng.integers(0, 256, size=(224, 224, 3), dtype=np.uint8) for _ in range(count)]
+
+
+@pytest.fixture(scope="module")
+def quantized(tmp_path_factory):
+    tmp_path = tmp_path_factory.mktemp("quantized")
+    torch.manual_seed(0)
+    torch.save(BrainTumorModel2().model.state_dict(), tmp_path / "fp32.pth")
+
+    eval_dir = tmp_path / "heldout"
+    for index, class_name in enumerate(["glioma", "notumor"]):
+        (eval_dir / class_name).mkdir(parents=True)
+        for number, image in enumerate(make_images(2, seed=10 + index)):
+            cv2.imwrite(str(eval_dir / class_name / f"{number}.png"), image)
+
+    eval_images, eval_labels = load_labelled_images(eval_dir, BrainTumorModel2().class_names)
+    report = quantize_and_evaluate(
+        tmp_path / "fp32.pth", make_images(8), eval_images, eval_labels, tmp_path / "int8.pth"
+    )
+    return tmp_path, report, eval_labels
+
+
+def test_report_compares_int8_with_fp32(quantized):
+    tmp_path, report, eval_labels = quantized
+
+    assert eval_labels == [0, 0, 2, 2]
+    assert report["eval_images"] == 4
+    assert report["calibration_images"] == 8
+    assert report["accuracy_delta"] == pytest.approx(report["int8_accuracy"] - report["fp32_accuracy"], abs=1e-3)
+    assert report["max_tumor_probability_diff"] < 0.1
+    assert json.loads((tmp_path / "int8.json").read_text()) == report
+
+
+def test_saved_int8_model_matches_fp32_and_reports_precision(quantized):
+    tmp_path, report, _ = quantized
+    fp32_model = BrainTumorModel2()
+    fp32_model.load_model(tmp_path / "fp32.pth")
+    int8_model = QuantizedBrainTumorModel2()
+    int8_model.load_model(tmp_path / "int8.pth", tmp_path / "int8.json")
+
+    images = make_images(3, seed=5)
+    for (fp32_prob, _), (int8_prob, int8_meta) in zip(
+        fp32_model.predict_batch(images), int8_model.predict_batch(images)
+    ):
+        assert int8_prob == pytest.approx(fp32_prob, abs=0.1)
+        assert int8_meta["model_name"] == "BrainTumorModel2"
+
+    info = EnsemblePredictor(models=[fp32_model, int8_model]).get_model_info()
+    assert [model["precision"] for model in info] == ["fp32", "int8"]
+    assert "quantization" not in info[0]
+    assert info[1]["quantization"]["accuracy_delta"] == report["accuracy_delta"]
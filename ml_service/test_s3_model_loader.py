@@ -0,0 +1,223 @@
+import hashlib
+import json
+import os
+from unittest.mock import patch
+
+import boto3
+import pytest
+from botocore.exceptions import EndpointConnectionError
+
+moto = pytest.importorskip("moto")
+
+from s3_model_loader import ModelIntegrityError, S3ModelLoader
+
+BUCKET = "models-test"
+KEY = "models/brain_tumor/model2/weights.pth"
+PART_SIZE = 1024
+
+
+@pytest.fixture
+def s3():
+    with patch.dict(os.environ, {
+        "AWS_ACCESS_KEY_ID": "testing",
+        "AWS_SECRET_ACCESS_KEY": "testing",
+        "AWS_S3_ENDPOINT_URL": "",
+    }), moto.mock_s3():
+        client = boto3.client("s3", region_name="us-east-1")
+        client.create_bucket(Bucket=BUCKET)
+        yield client
+
+
+def make_loader(tmp_path, **kwargs):
+    kwargs.setdefault("part_size", PART_SIZE)
+    return S3ModelLoader(BUCKET, region_name="us-east-1", cache_dir=str(tmp_path), **kwargs)
+
+
+def payload(size, seed=0):
+    return bytes((i * 7 + seed) % 251 for i in range(size))
+
+
+def count_gets(loader):
+    return patch.object(loader.s3_client, "get_object", wraps=loader.s3_client.get_object)
+
+
+def test_download_writes_verified_file_and_manifest(s3, tmp_path):
+    data = payload(5000)
+    s3.put_object(Bucket=BUCKET, Key=KEY, Body=data)
+    loader = make_loader(tmp_path)
+
+    with count_gets(loader) as get_object:
+        path = loader.download_model(KEY)
+
+    assert path.read_bytes() == data
+    assert get_object.call_count == 5  # ranged parts of PART_SIZE
+    manifest = json.loads(loader.manifest_path(path).read_text())
+    assert manifest["size"] == 5000
+    assert manifest["sha256"] == hashlib.sha256(data).hexdigest()
+    assert loader.manifest_sha256(path) == manifest["sha256"]
+    assert sorted(p.name for p in tmp_path.iterdir()) == [path.name, loader.manifest_path(path).name]
+
+
+def test_unchanged_object_is_not_downloaded_again(s3, tmp_path):
+    s3.put_object(Bucket=BUCKET, Key=KEY, Body=payload(3000))
+    loader = make_loader(tmp_path)
+    loader.download_model(KEY)
+
+    with count_gets(loader) as get_object:
+        path = loader.download_model(KEY)
+
+    get_object.assert_not_called()
+    assert path.read_bytes() == payload(3000)
+
+
+def test_newer_object_in_s3_is_refetched(s3, tmp_path):
+    s3.put_object(Bucket=BUCKET, Key=KEY, Body=payload(3000))
+    loader = make_loader(tmp_path)
+    loader.download_model(KEY)
+
+    s3.put_object(Bucket=BUCKET, Key=KEY, Body=payload(2500, seed=3))
+    path = loader.download_model(KEY)
+
+    assert path.read_bytes() == payload(2500, seed=3)
+
+
+def test_file_without_manifest_or_wrong_size_is_not_trusted(s3, tmp_path):
+    s3.put_object(Bucket=BUCKET, Key=KEY, Body=payload(3000))
+    loader = make_loader(tmp_path)
+    cached = tmp_path / KEY.replace("/", "_")
+    cached.write_bytes(b"truncated by a crash")
+
+    assert loader.download_model(KEY).read_bytes() == payload(3000)
+
+    cached.write_bytes(payload(100))  # manifest now disagrees with the file
+    assert loader.download_model(KEY).read_bytes() == payload(3000)
+
+
+def test_cached_file_with_a_corrupted_byte_is_not_trusted(s3, tmp_path):
+    s3.put_object(Bucket=BUCKET, Key=KEY, Body=payload(3000))
+    loader = make_loader(tmp_path)
+    cached = loader.download_model(KEY)
+    corrupted = bytearray(cached.read_bytes())
+    corrupted[1234] ^= 0xFF
+    cached.write_bytes(bytes(corrupted))  # same size, so only the hash can tell
+
+    with patch.object(loader.s3_client, "head_object", side_effect=EndpointConnectionError(endpoint_url="http://s3")):
+        with pytest.raises(Exception, match="Error downloading model"):
+            loader.download_model(KEY)
+
+    assert loader.download_model(KEY).read_bytes() == payload(3000)
+
+
+def test_interrupted_download_resumes_with_missing_parts(s3, tmp_path):
+    s3.put_object(Bucket=BUCKET, Key=KEY, Body=payload(6000))
+    loader = make_loader(tmp_path, max_workers=1)
+    real_get = loader.s3_client.get_object
+    calls = []
+
+    def flaky_get(**kwargs):
+        calls.append(kwargs["Range"])
+        if len(calls) == 4:
+            raise EndpointConnectionError(endpoint_url="http://s3")
+        return real_get(**kwargs)
+
+    with patch.object(loader.s3_client, "get_object", side_effect=flaky_get):
+        with pytest.raises(EndpointConnectionError):
+            loader.download_model(KEY)
+
+    cached = tmp_path / KEY.replace("/", "_")
+    assert not cached.exists()
+    done = json.loads((tmp_path / (cached.name + ".part.json")).read_text())["done"]
+    assert {0, 1, 2} <= set(done) and 3 not in done
+
+    with count_gets(loader) as get_object:
+        path = loader.download_model(KEY)
+
+    assert get_object.call_count == 6 - len(done)  # only the parts that were missing
+    assert path.read_bytes() == payload(6000)
+
+
+def test_etag_mismatch_is_rejected(s3, tmp_path):
+    s3.put_object(Bucket=BUCKET, Key=KEY, Body=payload(2000))
+    loader = make_loader(tmp_path)
+    real_get = loader.s3_client.get_object
+
+    def corrupting_get(**kwargs):
+        response = real_get(**kwargs)
+        body = bytearray(response["Body"].read())
+        body[0] ^= 0xFF
+        response["Body"] = type("Body", (), {"read": lambda self: bytes(body)})()
+        return response
+
+    with patch.object(loader.s3_client, "get_object", side_effect=corrupting_get):
+        with pytest.raises(ModelIntegrityError):
+            loader.download_model(KEY)
+
+    assert list(tmp_path.iterdir()) == []
+
+
+def upload_in_parts(s3, parts):
+    upload = s3.create_multipart_upload(Bucket=BUCKET, Key=KEY)
+    uploaded = [
+        {"PartNumber": number, "ETag": s3.upload_part(
+            Bucket=BUCKET, Key=KEY, UploadId=upload["UploadId"], PartNumber=number, Body=body
+        )["ETag"]}
+        for number, body in enumerate(parts, start=1)
+    ]
+    s3.complete_multipart_upload(
+        Bucket=BUCKET, Key=KEY, UploadId=upload["UploadId"], MultipartUpload={"Parts": uploaded}
+    )
+    return b"".join(parts)
+
+
+def test_multipart_object_is_verified_against_its_etag(s3, tmp_path):
+    data = upload_in_parts(s3, [payload(5 * 1024 * 1024), payload(3000, seed=1)])
+    loader = make_loader(tmp_path, part_size=1024 * 1024)
+
+    path = loader.download_model(KEY)
+
+    assert path.read_bytes() == data
+    assert s3.head_object(Bucket=BUCKET, Key=KEY)["ETag"].endswith('-2"')
+
+
+def test_corrupted_resumed_part_of_multipart_object_is_rejected(s3, tmp_path):
+    data = upload_in_parts(s3, [payload(5 * 1024 * 1024), payload(3000, seed=1)])
+    loader = make_loader(tmp_path, part_size=1024 * 1024, max_workers=1)
+    real_get = loader.s3_client.get_object
+    calls = []
+
+    def flaky_get(**kwargs):
+        calls.append(kwargs["Range"])
+        if len(calls) == 3:
+            raise EndpointConnectionError(endpoint_url="http://s3")
+        return real_get(**kwargs)
+
+    with patch.object(loader.s3_client, "get_object", side_effect=flaky_get):
+        with pytest.raises(EndpointConnectionError):
+            loader.download_model(KEY)
+
+    temp_path = tmp_path / (KEY.replace("/", "_") + ".part")
+    with open(temp_path, "r+b") as handle:  # bit rot in a part that will not be fetched again
+        handle.seek(1234)
+        byte = handle.read(1)
+        handle.seek(1234)
+        handle.write(bytes([byte[0] ^ 0xFF]))
+
+    with pytest.raises(ModelIntegrityError):
+        loader.download_model(KEY)
+    assert list(tmp_path.iterdir()) == []
+
+    assert loader.download_model(KEY).read_bytes() == data
+
+
+def test_cached_model_is_used_when_s3_is_unreachable(s3, tmp_path):
+    s3.put_object(Bucket=BUCKET, Key=KEY, Body=payload(1500))
+    loader = make_loader(tmp_path)
+    loader.download_model(KEY)
+
+    with patch.object(loader.s3_client, "head_object", side_effect=EndpointConnectionError(endpoint_url="http://s3")):
+        assert loader.download_model(KEY).read_bytes() == payload(1500)
+
+
+def test_missing_object_raises_file_not_found(s3, tmp_path):
+    with pytest.raises(FileNotFoundError):
+        make_loader(tmp_path).download_model("models/missing.pth")
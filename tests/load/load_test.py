@@ -0,0 +1,300 @@
+#!/usr/bin/env python3
+"""
+Load test for the backend and ML service with a JSON latency baseline
+
+Drives each scenario with ``--concurrency`` closed-loop workers until
+``--requests`` operations have completed, after ``--warmup`` untimed ones:
+
+    upload   POST /api/v1/upload/ on the backend (synthetic PNG scans)
+    predict  POST /predict/brain-tumor/ on the ML service
+    chat     chat WebSocket round trip: send a message, wait for its broadcast
+    metrics  GET /api/v1/metrics/summary|daily|diagnosis-distribution/
+    reports  GET /api/v1/reports/summary/
+
+Scans come from a seeded generator and accounts, patients and rooms from the
+fixtures printed by ``manage.py seed_benchmark``. The same seed gives the same
+workload. Run the ML service with INFERENCE_BACKEND=stub so inference is
+deterministic and needs neither S3 nor a GPU.
+
+Each scenario reports p50/p95/p99 latency and throughput. ``--output`` writes
+them as a JSON baseline, and ``--compare`` diffs this run against an earlier
+baseline, exiting 1 when p95 or throughput regressed by more than
+``--max-regression`` percent.
+
+Usage:
+    python manage.py seed_benchmark --reset > fixtures.json      # in backend/
+    python tests/load/load_test.py --fixtures backend/fixtures.json \\
+        --concurrency 8 --requests 200 --output baseline.json
+    python tests/load/load_test.py --fixtures backend/fixtures.json --compare baseline.json
+"""
+import argparse
+import asyncio
+import io
+import itertools
+import json
+import platform
+import random
+import subprocess
+import sys
+import time
+from datetime import datetime, timezone
+from typing import Awaitable, Callable, Dict, List, Optional
+
+import httpx
+import websockets
+from PIL import Image
+
+SCENARIOS = ("upload", "predict", "chat", "metrics", "reports")
+METRICS_PATHS = (
+    "/api/v1/metrics/summary/",
+    "/api/v1/metrics/daily/",
+    "/api/v1/metrics/diagnosis-distribution/",
+)
+
+
+def synthetic_scans(seed: int, count: int, side: int) -> List[bytes]:
+    """PNG scans of seeded noise over a bright blob, so images differ but are reproducible."""
+    rng = random.Random(seed)
+    scans = []
+    for _ in range(count):
+        image = Image.effect_noise((side, side), rng.uniform(20, 80)).convert("RGB")
+        cx, cy, radius = rng.randrange(side), rng.randrange(side), rng.randrange(side // 16, side // 4)
+        blob = Image.new("RGB", (side, side), (rng.randrange(150, 256),) * 3)
+        mask = Image.new("L", (side, side), 0)
+        mask.paste(255, (cx - radius, cy - radius, cx + radius, cy + radius))
+        image.paste(blob, mask=mask)
+        buffer = io.BytesIO()
+        image.save(buffer, format="PNG")
+        scans.append(buffer.getvalue())
+    return scans
+
+
+def percentile(values: List[float], pct: float) -> float:
+    """Linear interpolation between closest ranks, like numpy's default."""
+    ordered = sorted(values)
+    position = (len(ordered) - 1) * pct / 100
+    lower = int(position)
+    upper = min(lower + 1, len(ordered) - 1)
+    return ordered[lower] + (ordered[upper] - ordered[lower]) * (position - lower)
+
+
+def summarize(latencies: List[float], errors: int, elapsed: float) -> Dict:
+    if not latencies:
+        return {"requests": 0, "errors": errors, "throughput_rps": 0.0}
+    ms = [latency * 1000 for latency in latencies]
+    return {
+        "requests": len(ms),
+        "errors": errors,
+        "throughput_rps": round(len(ms) / elapsed, 2),
+        "mean_ms": round(sum(ms) / len(ms), 2),
+        "p50_ms": round(percentile(ms, 50), 2),
+        "p95_ms": round(percentile(ms, 95), 2),
+        "p99_ms": round(percentile(ms, 99), 2),
+        "max_ms": round(max(ms), 2),
+    }
+
+
+async def run_closed_loop(
+    operation: Callable[[int, int], Awaitable[None]],
+    concurrency: int,
+    requests: int,
+    warmup: int,
+) -> Dict:
+    """
+    Run ``operation(worker, index)`` from ``concurrency`` workers
+
+    The first ``warmup`` operations are not timed. Failed operations count as
+    errors and are left out of the latency percentiles.
+    """
+    counter = itertools.count()
+    latencies: List[float] = []
+    errors = 0
+    started = None
+
+    async def worker(worker_index: int):
+        nonlocal errors, started
+        while True:
+            index = next(counter)
+            if index >= warmup + requests:
+                return
+            if index == warmup and started is None:
+                started = time.perf_counter()
+            op_started = time.perf_counter()
+            try:
+                await operation(worker_index, index)
+            except Exception as e:
+                if index >= warmup:
+                    errors += 1
+                    if errors <= 3:
+                        print(f"  error: {type(e).__name__}: {e}", file=sys.stderr)
+                continue
+            if index >= warmup:
+                latencies.append(time.perf_counter() - op_started)
+
+    await asyncio.gather(*(worker(i) for i in range(concurrency)))
+    return summarize(latencies, errors, time.perf_counter() - (started or time.perf_counter()))
+
+
+class LoadTest:
+    def __init__(self, args, fixtures: Dict):
+        self.args = args
+        self.fixtures = fixtures
+        # One scan per operation by default, so the ML prediction cache never answers
+        self.scans = synthetic_scans(args.seed, args.images or args.warmup + args.requests, args.image_size)
+        limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+        self.client = httpx.AsyncClient(timeout=args.timeout, limits=limits)
+
+    def token(self, worker: int) -> str:
+        users = self.fixtures["users"]
+        return users[worker % len(users)]["token"]
+
+    def auth(self, worker: int) -> Dict[str, str]:
+        return {"Authorization": f"Token {self.token(worker)}"}
+
+    async def upload(self, worker: int, index: int) -> None:
+        patient_ids = self.fixtures["patient_ids"]
+        response = await self.client.post(
+            f"{self.args.backend_url}/api/v1/upload/",
+            headers=self.auth(worker),
+            data={"patient_id": str(patient_ids[index % len(patient_ids)])},
+            files={"image": (f"scan{index}.png", self.scans[index % len(self.scans)], "image/png")},
+        )
+        response.raise_for_status()
+
+    async def predict(self, worker: int, index: int) -> None:
+        response = await self.client.post(
+            f"{self.args.ml_url}/predict/brain-tumor/",
+            files={"file": (f"scan{index}.png", self.scans[index % len(self.scans)], "image/png")},
+        )
+        response.raise_for_status()
+
+    async def metrics(self, worker: int, index: int) -> None:
+        path = METRICS_PATHS[index % len(METRICS_PATHS)]
+        response = await self.client.get(f"{self.args.backend_url}{path}", headers=self.auth(worker))
+        response.raise_for_status()
+
+    async def reports(self, worker: int, index: int) -> None:
+        response = await self.client.get(
+            f"{self.args.backend_url}/api/v1/reports/summary/", headers=self.auth(worker)
+        )
+        response.raise_for_status()
+
+    async def run_chat(self) -> Dict:
+        """One WebSocket per worker, kept open; each operation is one message round trip."""
+        room_ids = self.fixtures["room_ids"]
+        ws_url = self.args.backend_url.replace("http", "ws", 1)
+        sockets = []
+        for worker in range(self.args.concurrency):
+            room = room_ids[worker % len(room_ids)]
+            sockets.append(await websockets.connect(f"{ws_url}/ws/chat/{room}/?token={self.token(worker)}"))
+
+        async def round_trip(worker: int, index: int) -> None:
+            socket = sockets[worker]
+            content = f"load test {self.args.seed}-{worker}-{index}"
+            await socket.send(json.dumps({"type": "message", "content": content}))
+            while True:
+                event = json.loads(await asyncio.wait_for(socket.recv(), self.args.timeout))
+                if event.get("type") == "message" and event["message"]["content"] == content:
+                    return
+
+        try:
+            return await run_closed_loop(round_trip, self.args.concurrency, self.args.requests, self.args.warmup)
+        finally:
+            await asyncio.gather(*(socket.close() for socket in sockets))
+
+    async def run(self, scenario: str) -> Dict:
+        if scenario == "chat":
+            return await self.run_chat()
+        return await run_closed_loop(
+            getattr(self, scenario), self.args.concurrency, self.args.requests, self.args.warmup
+        )
+
+    async def close(self) -> None:
+        await self.client.aclose()
+
+
+def git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(current: Dict, baseline: Dict, max_regression: float) -> List[str]:
+    """Print the change per scenario and return the regressions over ``max_regression`` percent."""
+    regressions = []
+    print(f"{'scenario':<10}{'metric':<16}{'baseline':>12}{'current':>12}{'change':>10}")
+    for scenario, result in current["scenarios"].items():
+        previous = baseline.get("scenarios", {}).get(scenario)
+        if not previous or not previous.get("requests") or not result.get("requests"):
+            continue
+        for metric in ("p50_ms", "p95_ms", "p99_ms", "throughput_rps"):
+            change = (result[metric] - previous[metric]) / previous[metric] * 100 if previous[metric] else 0.0
+            print(f"{scenario:<10}{metric:<16}{previous[metric]:>12.2f}{result[metric]:>12.2f}{change:>+9.1f}%")
+            worse = -change if metric == "throughput_rps" else change
+            if metric in ("p95_ms", "throughput_rps") and worse > max_regression:
+                regressions.append(f"{scenario} {metric} {change:+.1f}%")
+    return regressions
+
+
+async def main(args) -> int:
+    with open(args.fixtures) as handle:
+        fixtures = json.load(handle)
+
+    load_test = LoadTest(args, fixtures)
+    results = {}
+    try:
+        for scenario in args.scenarios:
+            print(f"Running {scenario} ({args.concurrency} workers, {args.requests} requests)", file=sys.stderr)
+            results[scenario] = await load_test.run(scenario)
+    finally:
+        await load_test.close()
+
+    report = {
+        "meta": {
+            "created_at": datetime.now(timezone.utc).isoformat(),
+            "git_commit": git_commit(),
+            "host": platform.node(),
+            "python": platform.python_version(),
+            "seed": args.seed,
+            "fixtures_seed": fixtures.get("seed"),
+            "concurrency": args.concurrency,
+            "requests": args.requests,
+            "warmup": args.warmup,
+            "image_size": args.image_size,
+        },
+        "scenarios": results,
+    }
+    print(json.dumps(report, indent=2))
+    if args.output:
+        with open(args.output, "w") as handle:
+            json.dump(report, handle, indent=2)
+
+    if args.compare:
+        with open(args.compare) as handle:
+            regressions = compare(report, json.load(handle), args.max_regression)
+        if regressions:
+            print(f"Regressions over {args.max_regression}%: {', '.join(regressions)}", file=sys.stderr)
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--fixtures", required=True, help="JSON printed by manage.py seed_benchmark")
+    parser.add_argument("--backend-url", default="http://localhost:8000")
+    parser.add_argument("--ml-url", default="http://localhost:5001")
+    parser.add_argument("--scenarios", nargs="+", choices=SCENARIOS, default=list(SCENARIOS))
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--requests", type=int, default=200, help="Timed operations per scenario")
+    parser.add_argument("--warmup", type=int, default=20, help="Untimed operations per scenario")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--images", type=int, default=0, help="Distinct synthetic scans (0 = one per operation)")
+    parser.add_argument("--image-size", type=int, default=512)
+    parser.add_argument("--timeout", type=float, default=60.0)
+    parser.add_argument("--output", help="Write the results to this baseline file")
+    parser.add_argument("--compare", help="Baseline file to diff this run against")
+    parser.add_argument("--max-regression", type=float, default=10.0, help="Allowed p95/throughput change in percent")
+    sys.exit(asyncio.run(main(parser.parse_args())))